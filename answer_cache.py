@@ -0,0 +1,110 @@
+# answer_cache.py
+import hashlib
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def context_fingerprint(context_docs):
+    """Stable hash of the exact context passed to the RAG agent"""
+    digest = hashlib.sha256()
+    for doc in context_docs:
+        digest.update(doc.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SemanticAnswerCache:
+    """Cache of generated answers keyed on query embedding + context fingerprint.
+
+    A lookup hits when an unexpired entry has the same context fingerprint
+    and a cosine similarity of at least `threshold` with the query vector.
+    Entries are evicted least-recently-used beyond `max_entries`, expire
+    after `ttl` seconds, and can be dropped per source URL when that
+    source's content changes.
+    """
+
+    def __init__(self, threshold=0.95, ttl=3600, max_entries=1000):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._by_fingerprint = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._avg_generation_seconds = 0.0
+        self.stats = {"hits": 0, "misses": 0, "saved_seconds": 0.0, "invalidated": 0}
+
+    def _remove(self, entry_id):
+        # Caller holds self._lock
+        entry = self._entries.pop(entry_id)
+        ids = self._by_fingerprint[entry["fingerprint"]]
+        ids.remove(entry_id)
+        if not ids:
+            del self._by_fingerprint[entry["fingerprint"]]
+
+    def lookup(self, vector, fingerprint):
+        """Return a cached answer or None"""
+        vector = np.asarray(vector, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        now = time.time()
+        with self._lock:
+            ids = list(self._by_fingerprint.get(fingerprint, ()))
+            for entry_id in ids:
+                if now - self._entries[entry_id]["created"] > self.ttl:
+                    self._remove(entry_id)
+            ids = self._by_fingerprint.get(fingerprint, [])
+
+            if ids:
+                scores = np.stack([self._entries[i]["vector"] for i in ids]) @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry_id = ids[best]
+                    self._entries.move_to_end(entry_id)
+                    self.stats["hits"] += 1
+                    self.stats["saved_seconds"] += self._avg_generation_seconds
+                    return self._entries[entry_id]["answer"]
+
+            self.stats["misses"] += 1
+            return None
+
+    def store(self, vector, fingerprint, answer, generation_seconds=0.0, sources=()):
+        vector = np.asarray(vector, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        with self._lock:
+            entry_id = next(self._ids)
+            self._entries[entry_id] = {
+                "vector": vector,
+                "fingerprint": fingerprint,
+                "answer": answer,
+                "sources": set(sources),
+                "created": time.time(),
+            }
+            self._by_fingerprint.setdefault(fingerprint, []).append(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+            # Running average of what a miss costs, used to estimate the time hits save
+            if generation_seconds:
+                self._avg_generation_seconds = (
+                    generation_seconds if not self._avg_generation_seconds
+                    else 0.9 * self._avg_generation_seconds + 0.1 * generation_seconds
+                )
+
+    def invalidate_source(self, source):
+        """Drop every answer that was generated from `source` (e.g. a catalog URL whose content changed)"""
+        with self._lock:
+            stale = [entry_id for entry_id, entry in self._entries.items() if source in entry["sources"]]
+            for entry_id in stale:
+                self._remove(entry_id)
+            self.stats["invalidated"] += len(stale)
+
+    def cache_stats(self):
+        with self._lock:
+            stats = dict(self.stats, entries=len(self._entries))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
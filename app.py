@@ -9,18 +9,19 @@ if sys.platform in ("linux", "darwin") and sys.version_info >= (3, 12):
 # Imports
 # -------------------------------
 import streamlit as st
-from chatbot_backend import process_chat
+import config
+from chatbot_backend import chat_turn_kind, process_chat, session_memory, warm_catalog_cache
 from chat_db import (
     init_db,
-    save_message,
+    save_messages,
     load_chat,
-    get_all_sessions,
-    get_session_preview,
+    list_sessions,
     delete_chat
 )
+from llm_stream import INTERRUPTED_NOTE
 from pdf_qa import process_pdf, answer_question
+from tracing import start_metrics_server
 import uuid
-import time
 import os
 
 # Set OpenAI API key from environment variable or Streamlit secrets
@@ -38,6 +39,17 @@ st.title("MIE Chatbot — Northeastern University")
 # -------------------------------
 init_db()
 
+# -------------------------------
+# Background warm-up (once per process): embedding model, index and catalog pages
+# -------------------------------
+@st.cache_resource
+def start_background_warmup():
+    config.preload()
+    start_metrics_server()
+    return warm_catalog_cache()
+
+start_background_warmup()
+
 # -------------------------------
 # Initialize Session State
 # -------------------------------
@@ -50,6 +62,10 @@ if "session_id" not in st.session_state:
     st.session_state.pdf_data = None
     st.session_state.pdf_mode = False
 
+# Keyset cursors for the "Past Chats" pages; the last entry is the page being shown
+if "session_page_cursors" not in st.session_state:
+    st.session_state.session_page_cursors = [None]
+
 # -------------------------------
 # SIDEBAR
 # -------------------------------
@@ -61,18 +77,22 @@ with st.sidebar:
     uploaded_file = st.file_uploader("Upload a PDF document", type=["pdf"])
     
     if uploaded_file:
-        with st.spinner("Processing PDF..."):
-            st.session_state.pdf_data = process_pdf(uploaded_file)
+        # Only process a newly uploaded file; reruns reuse the processed result
+        if st.session_state.get("pdf_upload_id") != uploaded_file.file_id:
+            with st.spinner("Processing PDF..."):
+                pdf_data = process_pdf(uploaded_file)
+            st.session_state.pdf_upload_id = uploaded_file.file_id
             st.session_state.pdf_filename = uploaded_file.name
-        
-        # Check if the document is related to Northeastern
-        if st.session_state.pdf_data.get("is_northeastern_related", False):
+
+            # Check if the document is related to Northeastern
+            is_related = pdf_data.get("is_northeastern_related", False)
+            st.session_state.pdf_data = pdf_data if is_related else None
+            st.session_state.pdf_mode = is_related
+
+        if st.session_state.pdf_data:
             st.success(f"Processed document: {uploaded_file.name}")
-            st.session_state.pdf_mode = True
         else:
             st.warning(f"The document '{uploaded_file.name}' does not appear to be related to Northeastern University. I can only answer questions about Northeastern-related documents.")
-            st.session_state.pdf_mode = False
-            st.session_state.pdf_data = None
     
     # Toggle between regular chat and PDF Q&A
     if st.session_state.pdf_data:
@@ -88,12 +108,13 @@ with st.sidebar:
         st.session_state.chat_history = []
         st.rerun()
 
-    # Past Sessions with Clickable Preview
+    # Past Sessions with Clickable Preview (one page per rerun, single query)
     st.subheader("Past Chats")
-    all_sessions = get_all_sessions()
+    page_sessions, next_cursor = list_sessions(before=st.session_state.session_page_cursors[-1])
     
-    for sid in all_sessions:
-        preview = get_session_preview(sid)
+    for session in page_sessions:
+        sid = session["session_id"]
+        preview = session["preview"]
         label = preview if len(preview) < 50 else preview[:47] + "..."
         
         # Create a columns layout for each session
@@ -113,6 +134,7 @@ with st.sidebar:
         with col2:
             if st.button("Delete", key=f"delete_{sid}"):
                 if delete_chat(sid):
+                    session_memory.clear(sid)
                     # If the deleted session was the current one, create a new session
                     if st.session_state.session_id == sid:
                         st.session_state.session_id = str(uuid.uuid4())
@@ -120,6 +142,17 @@ with st.sidebar:
                         st.session_state.chat_history = []
                     st.rerun()
 
+    # Page navigation
+    nav_newer, nav_older = st.columns(2)
+    with nav_newer:
+        if len(st.session_state.session_page_cursors) > 1 and st.button("← Newer", key="sessions_newer"):
+            st.session_state.session_page_cursors.pop()
+            st.rerun()
+    with nav_older:
+        if next_cursor is not None and st.button("Older →", key="sessions_older"):
+            st.session_state.session_page_cursors.append(next_cursor)
+            st.rerun()
+
     # Current Session History
     st.subheader("This Session")
     if st.session_state.chat_history:
@@ -152,26 +185,39 @@ if user_input:
     st.chat_message("user").markdown(user_input)
     st.session_state.messages.append({"role": "user", "content": user_input})
     st.session_state.chat_history.append(user_input)
-    save_message(st.session_state.session_id, "user", user_input)
 
-    # Process message based on mode
-    if st.session_state.pdf_mode and st.session_state.pdf_data:
-        # PDF Q&A mode with LLM
-        with st.spinner("Analyzing document..."):
-            response = answer_question(user_input, st.session_state.pdf_data)
-    else:
-        # Regular chatbot mode
-        response = process_chat(user_input, st.session_state.chat_history[:-1])
-
-    # Typing animation for assistant
-    with st.chat_message("assistant"):
-        placeholder = st.empty()
-        full_response = ""
-        for char in response:
-            full_response += char
-            placeholder.markdown(full_response + "▌")
-            time.sleep(0.01)
-        placeholder.markdown(full_response)
-
-    st.session_state.messages.append({"role": "assistant", "content": response})
-    save_message(st.session_state.session_id, "assistant", response)
\ No newline at end of file
+    pdf_turn = st.session_state.pdf_mode and st.session_state.pdf_data
+    streamed, completed = [], False
+
+    def record(stream):
+        for piece in stream:
+            streamed.append(piece)
+            yield piece
+
+    # Process message based on mode and stream the answer as it is generated
+    try:
+        with st.chat_message("assistant"):
+            if pdf_turn:
+                # PDF Q&A mode with LLM
+                with st.spinner("Analyzing document..."):
+                    response_stream = answer_question(user_input, st.session_state.pdf_data, stream=True)
+            else:
+                # Regular chatbot mode
+                with st.spinner("Thinking..."):
+                    response_stream = process_chat(
+                        user_input, stream=True, session_id=st.session_state.session_id
+                    )
+            response = st.write_stream(record(response_stream))
+        completed = True
+    finally:
+        # Keep the question even if answering failed or the run was stopped mid-stream. An
+        # interrupted turn never reached session memory, so it is stored outside the chat kind.
+        if not completed:
+            response = ("".join(streamed) + INTERRUPTED_NOTE).strip()
+            kind = "interrupted"
+        else:
+            # PDF Q&A is not part of the chat memory
+            kind = "pdf" if pdf_turn else chat_turn_kind(user_input)
+        st.session_state.messages.append({"role": "assistant", "content": response})
+        # Persist the user/assistant pair in one transaction
+        save_messages(st.session_state.session_id, [("user", user_input), ("assistant", response)], kind=kind)
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""Routing accuracy and latency: embedding router vs. the GPT catalog agent.
+
+"encode+sim" times route() on a router built over the bare SentenceTransformer,
+so every query pays for a real encode; "cached encode+sim" is the app's
+router repeating queries the embedding cache has already seen.
+
+Usage (from the repository root):
+    python benchmarks/bench_catalog_router.py          # router only
+    python benchmarks/bench_catalog_router.py --llm    # also run the GPT agent (costs API calls)
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chatbot_backend  # noqa: E402
+from catalog_router import CatalogRouter  # noqa: E402
+from config import CATALOG_ROUTER_MARGIN, get_embed_model  # noqa: E402
+from embedding_batcher import BatchingEncoder  # noqa: E402
+from embedding_cache import CachedEmbedder  # noqa: E402
+
+QUERIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog_routing_queries.json")
+
+
+def is_correct(url, program):
+    return f"/{program}/" in url
+
+
+def bare_encoder(encoder):
+    """The model under the embedding cache and the micro-batcher"""
+    while isinstance(encoder, (CachedEmbedder, BatchingEncoder)):
+        encoder = encoder.model
+    return encoder
+
+
+def summarize(name, correct, latencies, total):
+    latencies_ms = np.array(latencies) * 1000
+    print(f"{name:<28} accuracy {correct}/{total} ({correct / total:.1%})  "
+          f"p50 {np.percentile(latencies_ms, 50):8.3f} ms  p99 {np.percentile(latencies_ms, 99):8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm", action="store_true", help="also benchmark the GPT catalog agent")
+    args = parser.parse_args()
+
+    with open(QUERIES_FILE, "r", encoding="utf-8") as f:
+        labelled = json.load(f)
+
+    started = time.perf_counter()
+    router = chatbot_backend.get_catalog_router()
+    print(f"Router build (16 descriptions): {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    uncached_router = CatalogRouter(bare_encoder(get_embed_model()), chatbot_backend.course_catalog_programs)
+    vectors = get_embed_model().encode([item["query"] for item in labelled], normalize_embeddings=True)
+
+    sim_latencies, route_latencies, cached_latencies, margins = [], [], [], []
+    router_correct = confident_correct = confident = 0
+    for item, vector in zip(labelled, vectors):
+        started = time.perf_counter()
+        url, _, margin = router.route_vector(vector)
+        sim_latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        uncached_router.route(item["query"])
+        route_latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        router.route(item["query"])
+        cached_latencies.append(time.perf_counter() - started)
+
+        margins.append(margin)
+        hit = is_correct(url, item["program"])
+        router_correct += hit
+        if margin >= CATALOG_ROUTER_MARGIN:
+            confident += 1
+            confident_correct += hit
+        else:
+            print(f"  low margin {margin:.3f}: {item['query']!r}")
+
+    total = len(labelled)
+    summarize("router (similarity)", router_correct, sim_latencies, total)
+    summarize("router (encode+sim)", router_correct, route_latencies, total)
+    summarize("router (cached encode+sim)", router_correct, cached_latencies, total)
+    print(f"Confident routes (margin >= {CATALOG_ROUTER_MARGIN}): {confident}/{total}, "
+          f"accuracy {confident_correct}/{max(confident, 1)}; LLM calls avoided {confident / total:.1%}")
+
+    if args.llm:
+        llm_correct, llm_latencies = 0, []
+        for item in labelled:
+            started = time.perf_counter()
+            url = chatbot_backend.llm_course_catalog_agent(item["query"])
+            llm_latencies.append(time.perf_counter() - started)
+            llm_correct += is_correct(url, item["program"])
+        summarize("GPT agent", llm_correct, llm_latencies, total)
+
+        hybrid_correct, hybrid_latencies = 0, []
+        for item in labelled:
+            started = time.perf_counter()
+            url = chatbot_backend.course_catalog_agent(item["query"])
+            hybrid_latencies.append(time.perf_counter() - started)
+            hybrid_correct += is_correct(url, item["program"])
+        summarize("router + LLM fallback", hybrid_correct, hybrid_latencies, total)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Catalog sections: RAG prompt tokens and answer latency per program page, whole page vs. selected sections.
+
+Parses every catalog program page and asks a few questions about each
+(core requirements, electives, GPA, thesis option). Each question is
+answered twice through chatbot_backend.rag_agent:
+
+- page:      the whole scraped page as the context document (previous path)
+- sections:  only the heading-scoped sections closest to the question,
+             within CATALOG_CONTEXT_TOKENS (catalog_page_content)
+
+The LLM is the fake OpenAI server in fake_services.py, whose time to first
+token grows with the prompt (--prompt-latency seconds per 1,000 prompt
+tokens), so the latency column reflects prompt size plus the section
+selection overhead. "kept" is the share of questions whose expected phrase
+(e.g. "Electives", "3.000") is still in the sections sent, counted over
+the questions whose page contains it.
+
+Pages come from --catalog-dir (HTML saved with bench_e2e.py --save-catalog)
+or the synthetic catalog pages in fake_services.py with --courses course
+rows. Sections are embedded with the HashingEmbedder unless --real-embedder
+is given; the first question on a page pays for embedding its sections,
+the others reuse them.
+
+Usage (from the repository root):
+    python benchmarks/bench_catalog_sections.py
+    python benchmarks/bench_catalog_sections.py --catalog-dir benchmarks/catalog_pages --real-embedder
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_services import FakeOpenAIServer, HashingEmbedder, page_file_name, synthetic_catalog_page  # noqa: E402
+
+# (question template, phrase the answer depends on)
+QUESTIONS = [
+    ("What are the core requirements for the {program} program?", "Core Requirements"),
+    ("Which electives can I take in {program}?", "Electives"),
+    ("What is the minimum GPA for {program}?", "3.000"),
+    ("Can I do a thesis in {program}?", "thesis"),
+]
+
+
+def load_page(url, catalog_dir, courses):
+    path = urlsplit(url).path
+    if catalog_dir:
+        saved = os.path.join(catalog_dir, page_file_name(path))
+        if os.path.exists(saved):
+            with open(saved, "r", encoding="utf-8") as f:
+                return f.read()
+    return synthetic_catalog_page(path, courses=courses)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--catalog-dir", help="directory of saved catalog HTML")
+    parser.add_argument("--courses", type=int, default=150,
+                        help="course rows per synthetic page (full program pages list 100+)")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds before each LLM response")
+    parser.add_argument("--prompt-latency", type=float, default=0.2,
+                        help="extra seconds per 1,000 prompt tokens before the first token")
+    parser.add_argument("--real-embedder", action="store_true", help="use the configured SentenceTransformer")
+    args = parser.parse_args()
+
+    llm = FakeOpenAIServer(latency=args.llm_latency, token_latency=0.0, answer_words=40,
+                           prompt_latency=args.prompt_latency).start()
+    scratch = tempfile.mkdtemp(prefix="mie-sections-")
+    os.environ.update({
+        "OPENAI_API_KEY": "sk-offline",
+        "OPENAI_API_BASE": llm.api_base,
+        "CATALOG_CACHE_DIR": os.path.join(scratch, "catalog"),
+        "EMBED_CACHE_PATH": os.path.join(scratch, "embeddings.sqlite"),
+        "TRACE_FILE": os.path.join(scratch, "trace.jsonl"),
+        "METRICS_FILE": os.path.join(scratch, "metrics.prom"),
+    })
+
+    import config
+    import chatbot_backend
+    import prompt_budget
+    from config import CATALOG_CONTEXT_TOKENS, CATALOG_SECTION_TOKENS
+
+    if not args.real_embedder:
+        config.override_resources(embed_model=HashingEmbedder())
+
+    def prompt_tokens(query, doc):
+        request = chatbot_backend.build_rag_request(query, [doc])
+        return sum(prompt_budget.count_tokens(m["content"]) for m in request["messages"])
+
+    def answer(query, content, data):
+        doc = f"Title: {data['title']}\n\nContent: {content}\n\nSource: {data['url']}"
+        started = time.perf_counter()
+        chatbot_backend.rag_agent(query, [doc])
+        return prompt_tokens(query, doc), time.perf_counter() - started
+
+    tokenizer = "tiktoken" if prompt_budget.get_encoding() is not None else "len/4 estimate"
+    print(f"Section budget {CATALOG_CONTEXT_TOKENS} tokens, sections split above {CATALOG_SECTION_TOKENS}; "
+          f"LLM {args.llm_latency * 1000:.0f} ms + {args.prompt_latency * 1000:.0f} ms per 1k prompt tokens; "
+          f"token counts: {tokenizer}\n")
+    print(f"{'page':<44} {'sect':>4} {'tokens page/sect':>17} {'saved':>6} "
+          f"{'latency page/sect':>19} {'select':>8} {'kept':>5}")
+
+    totals = {"page_tokens": 0, "tokens": 0, "page_seconds": 0.0, "seconds": 0.0, "select": 0.0,
+              "questions": 0, "kept": 0, "expected": 0}
+    for url in chatbot_backend.course_catalog_urls:
+        data = chatbot_backend.parse_catalog_page(load_page(url, args.catalog_dir, args.courses), url)
+        row = {"page_tokens": 0, "tokens": 0, "page_seconds": 0.0, "seconds": 0.0, "select": 0.0,
+               "kept": 0, "expected": 0}
+        for template, phrase in QUESTIONS:
+            query = template.format(program=data["title"])
+            tokens, seconds = answer(query, data["content"], data)
+            row["page_tokens"] += tokens
+            row["page_seconds"] += seconds
+
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                content = chatbot_backend.catalog_page_content(query, data)
+            select_seconds = time.perf_counter() - started
+            tokens, seconds = answer(query, content, data)
+            row["tokens"] += tokens
+            row["seconds"] += seconds + select_seconds
+            row["select"] += select_seconds
+            if phrase.lower() in data["content"].lower():
+                row["expected"] += 1
+                row["kept"] += phrase.lower() in content.lower()
+
+        n = len(QUESTIONS)
+        name = urlsplit(url).path.rstrip("/").split("/")[-1]
+        kept = f"{row['kept']}/{row['expected']}"
+        print(f"{name[:44]:<44} {len(data.get('sections') or []):>4} "
+              f"{row['page_tokens'] / n:>8.0f} /{row['tokens'] / n:>7.0f} "
+              f"{1 - row['tokens'] / max(row['page_tokens'], 1):>6.0%} "
+              f"{row['page_seconds'] / n * 1000:>8.0f} /{row['seconds'] / n * 1000:>6.0f}ms "
+              f"{row['select'] / n * 1000:>6.1f}ms {kept:>5}")
+        for key in row:
+            totals[key] += row[key]
+        totals["questions"] += n
+
+    n = totals["questions"]
+    print(f"\n{'mean':<44} {'':>4} {totals['page_tokens'] / n:>8.0f} /{totals['tokens'] / n:>7.0f} "
+          f"{1 - totals['tokens'] / max(totals['page_tokens'], 1):>6.0%} "
+          f"{totals['page_seconds'] / n * 1000:>8.0f} /{totals['seconds'] / n * 1000:>6.0f}ms "
+          f"{totals['select'] / n * 1000:>6.1f}ms {totals['kept']:>2}/{totals['expected']}")
+    print(f"\nSection embeddings: {chatbot_backend.section_index.stats}")
+    llm.stop()
+
+
+if __name__ == "__main__":
+    main()
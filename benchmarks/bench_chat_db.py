@@ -0,0 +1,118 @@
+"""Cost of one Streamlit rerun's chat_db work: legacy per-call connections vs. the pooled layer.
+
+A rerun lists the sidebar's sessions with their previews and then saves one
+user/assistant pair. The legacy path below reproduces the original chat_db
+functions: a new connection per call, no index, one preview query per
+session.
+
+Usage (from the repository root):
+    python benchmarks/bench_chat_db.py --sessions 10000 --reruns 3
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chat_db  # noqa: E402
+
+
+# ---------------- Legacy implementation ----------------
+
+def legacy_save_message(db_file, session_id, role, content):
+    conn = sqlite3.connect(db_file)
+    conn.execute("INSERT INTO chats VALUES (?, ?, ?)", (session_id, role, content))
+    conn.commit()
+    conn.close()
+
+
+def legacy_get_all_sessions(db_file):
+    conn = sqlite3.connect(db_file)
+    sessions = [row[0] for row in conn.execute("SELECT DISTINCT session_id FROM chats ORDER BY rowid DESC")]
+    conn.close()
+    return sessions
+
+
+def legacy_get_session_preview(db_file, session_id):
+    conn = sqlite3.connect(db_file)
+    row = conn.execute(
+        "SELECT content FROM chats WHERE session_id = ? AND role = 'user' LIMIT 1", (session_id,)
+    ).fetchone()
+    conn.close()
+    return row[0] if row else "(no message)"
+
+
+def legacy_rerun(db_file, session_id):
+    for sid in legacy_get_all_sessions(db_file):
+        legacy_get_session_preview(db_file, sid)
+    legacy_save_message(db_file, session_id, "user", "question")
+    legacy_save_message(db_file, session_id, "assistant", "answer")
+
+
+def pooled_rerun(session_id):
+    # The sidebar now reads one keyset page from the sessions table
+    chat_db.list_sessions()
+    chat_db.save_messages(session_id, [("user", "question"), ("assistant", "answer")])
+
+
+# ---------------- Setup ----------------
+
+def populate(db_file, sessions, turns):
+    conn = sqlite3.connect(db_file)
+    conn.execute("CREATE TABLE IF NOT EXISTS chats (session_id TEXT, role TEXT, content TEXT)")
+    rows = []
+    for _ in range(sessions):
+        sid = str(uuid.uuid4())
+        for turn in range(turns):
+            rows.append((sid, "user", f"Question {turn} about the MSIE program requirements"))
+            rows.append((sid, "assistant", "An answer of moderate length. " * 10))
+    conn.executemany("INSERT INTO chats VALUES (?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, reruns):
+    timings = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), sum(timings) / len(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=2, help="user/assistant pairs per session")
+    parser.add_argument("--reruns", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_db = os.path.join(tmp, "legacy.db")
+        pooled_db = os.path.join(tmp, "pooled.db")
+        populate(legacy_db, args.sessions, args.turns)
+        populate(pooled_db, args.sessions, args.turns)
+
+        chat_db.DB_FILE = pooled_db
+        started = time.perf_counter()
+        chat_db.init_db()
+        migration = time.perf_counter() - started
+
+        current = str(uuid.uuid4())
+        legacy_best, legacy_mean = timed(lambda: legacy_rerun(legacy_db, current), args.reruns)
+        pooled_best, pooled_mean = timed(lambda: pooled_rerun(current), args.reruns)
+
+    print(f"{args.sessions} sessions x {args.turns} turns, {args.reruns} reruns")
+    print(f"one-time sessions migration: {migration:.3f} s")
+    print(f"{'path':<8} | {'best s':>8} | {'mean s':>8}")
+    print(f"{'legacy':<8} | {legacy_best:8.3f} | {legacy_mean:8.3f}")
+    print(f"{'pooled':<8} | {pooled_best:8.3f} | {pooled_mean:8.3f}")
+    print(f"speedup (mean): {legacy_mean / pooled_mean:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
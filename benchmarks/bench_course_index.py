@@ -0,0 +1,131 @@
+"""Course index: catalog course lookups answered from the index vs. from the whole program page.
+
+Parses every catalog program page into course records and builds the
+index, then replays three kinds of course questions:
+
+- direct:  "How many credits is IE 6200?" / "What is IE 6200?"
+           answered from the index, no LLM call
+- context: "What are the prerequisites for IE 6200?"
+           RAG call with only the matching course records as context
+- topic:   "Which courses cover machine learning?"
+           RAG call with the keyword search results as context
+
+and compares LLM calls and RAG prompt tokens with the previous path, which
+sent the whole scraped program page to the RAG agent. Pages come from
+--catalog-dir (HTML saved with bench_e2e.py --save-catalog) or the synthetic
+catalog pages in fake_services.py.
+
+Usage (from the repository root):
+    python benchmarks/bench_course_index.py
+    python benchmarks/bench_course_index.py --catalog-dir benchmarks/catalog_pages
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_services import page_file_name, synthetic_catalog_page  # noqa: E402
+
+TOPICS = ["machine learning", "supply chain", "robotics", "optimization", "human factors"]
+
+
+def load_page(url, catalog_dir):
+    path = urlsplit(url).path
+    if catalog_dir:
+        saved = os.path.join(catalog_dir, page_file_name(path))
+        if os.path.exists(saved):
+            with open(saved, "r", encoding="utf-8") as f:
+                return f.read()
+    return synthetic_catalog_page(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--catalog-dir", help="directory of saved catalog HTML")
+    parser.add_argument("--codes", type=int, default=20, help="course codes sampled for the code questions")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ["CATALOG_CACHE_DIR"] = tempfile.mkdtemp(prefix="mie-course-index-")
+    import chatbot_backend
+    import prompt_budget
+
+    started = time.perf_counter()
+    pages = {}
+    for url in chatbot_backend.course_catalog_urls:
+        pages[url] = chatbot_backend.parse_catalog_page(load_page(url, args.catalog_dir), url)
+    parse_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    for url, data in pages.items():
+        chatbot_backend.course_index.update_page(url, data["title"], data["courses"])
+    index_seconds = time.perf_counter() - started
+
+    records = [record for data in pages.values() for record in data["courses"]]
+    index_bytes = len(json.dumps(records).encode("utf-8"))
+    print(f"{len(pages)} pages parsed in {parse_seconds:.2f}s; {len(records)} course records, "
+          f"{len(chatbot_backend.course_index._by_code)} distinct codes")
+    print(f"Index built in {index_seconds * 1000:.1f} ms; records take {index_bytes:,} bytes as JSON\n")
+    if not records:
+        print("No course tables found in these pages.")
+        return
+
+    def page_prompt_tokens(query, url):
+        data = pages[url]
+        doc = f"Title: {data['title']}\n\nContent: {data['content']}\n\nSource: {data['url']}"
+        request = chatbot_backend.build_rag_request(query, [doc])
+        return sum(prompt_budget.count_tokens(m["content"]) for m in request["messages"])
+
+    rng = random.Random(args.seed)
+    codes = rng.sample(sorted({record["code"] for record in records}), min(args.codes, len(records)))
+    questions = []
+    for code in codes:
+        questions.append(("direct", f"How many credits is {code}?", code))
+        questions.append(("direct", f"What is {code}?", code))
+        questions.append(("context", f"What are the prerequisites for {code}?", code))
+    for topic in TOPICS:
+        questions.append(("topic", f"Which courses cover {topic}?", None))
+
+    results = {}
+    for kind, query, code in questions:
+        started = time.perf_counter()
+        indexed = chatbot_backend.lookup_course_index(query)
+        lookup_ms = (time.perf_counter() - started) * 1000
+        if indexed is None:
+            outcome, calls, tokens = "miss", None, None
+        elif "answer" in indexed:
+            outcome, calls, tokens = "answer", 0, 0
+        else:
+            request = chatbot_backend.build_rag_request(query, indexed["context_docs"])
+            outcome, calls = "context", 1
+            tokens = sum(prompt_budget.count_tokens(m["content"]) for m in request["messages"])
+        # Previous path: route to the program page and send all of it (router LLM call not counted)
+        url = chatbot_backend.course_index.by_code(code)[0]["url"] if code else rng.choice(list(pages))
+        legacy_tokens = page_prompt_tokens(query, url)
+        row = results.setdefault(kind, {"n": 0, "outcomes": {}, "calls": 0, "tokens": 0,
+                                         "legacy_tokens": 0, "lookup_ms": 0.0})
+        row["n"] += 1
+        row["outcomes"][outcome] = row["outcomes"].get(outcome, 0) + 1
+        row["calls"] += calls if calls is not None else 1
+        row["tokens"] += tokens if tokens is not None else legacy_tokens
+        row["legacy_tokens"] += legacy_tokens
+        row["lookup_ms"] += lookup_ms
+
+    print(f"{'kind':<8} {'n':>4} {'outcomes':<26} {'calls old/new':>14} {'prompt old/new':>16} {'lookup':>9}")
+    for kind, row in results.items():
+        outcomes = ", ".join(f"{k} {v}" for k, v in sorted(row["outcomes"].items()))
+        print(f"{kind:<8} {row['n']:>4} {outcomes:<26} {1.0:>6.2f} /{row['calls'] / row['n']:>5.2f} "
+              f"{row['legacy_tokens'] / row['n']:>8.0f} /{row['tokens'] / row['n']:>6.0f} "
+              f"{row['lookup_ms'] / row['n']:>7.2f}ms")
+    print(f"\nIndex stats: {chatbot_backend.course_index.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Upload relevance check: tiered local classifier vs one LLM call per upload.
+
+Each document in doc_classifier_samples.json is labelled as Northeastern /
+MIE related or not. The documents are short, so each one is padded with
+unrelated boilerplate to a handbook-like length, and the distinctive text is
+placed in the middle -- where the old first-3000-characters check would not
+see it. Reports which tier decided each document, precision and recall, and
+the fraction of LLM calls avoided. Without --llm, ambiguous documents are
+scored with the offline fallback (any explicit mention counts as related).
+Reference vectors are the corpus centroids written by export_index.py
+(DOC_CLASSIFY_REFERENCE_FILE, or --references), falling back to the
+hand-written texts in doc_classifier.py when that file doesn't exist.
+
+Usage (from the repository root):
+    python benchmarks/bench_doc_classifier.py
+    python benchmarks/bench_doc_classifier.py --llm    # ambiguous documents cost one API call each
+    python benchmarks/bench_doc_classifier.py --references .cache/doc_classifier_references.npy
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import doc_classifier  # noqa: E402
+import pdf_qa  # noqa: E402
+
+SAMPLES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "doc_classifier_samples.json")
+
+BOILERPLATE = (
+    "This page intentionally left blank. Table of contents. Revision history and document control. "
+    "Copyright notice: all rights reserved; no part of this document may be reproduced without permission. "
+)
+
+
+def pad(text, padding_chars):
+    filler = (BOILERPLATE * (padding_chars // len(BOILERPLATE) + 1))[:padding_chars]
+    return f"{filler}\n\n{text}\n\n{filler}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm", action="store_true", help="send ambiguous documents to the LLM")
+    parser.add_argument("--padding", type=int, default=6000, help="boilerplate characters before and after each document")
+    parser.add_argument("--references", help="reference vectors file written by export_index.py")
+    args = parser.parse_args()
+
+    if args.references:
+        doc_classifier.set_reference_vectors(doc_classifier.load_reference_vectors(args.references))
+
+    with open(SAMPLES_FILE, "r", encoding="utf-8") as f:
+        samples = json.load(f)
+
+    llm_check = pdf_qa.verify_northeastern_content if args.llm else None
+    true_pos = false_pos = false_neg = 0
+    for sample in samples:
+        verdict, tier = doc_classifier.classify_document(pad(sample["text"], args.padding), llm_check=llm_check)
+        true_pos += verdict and sample["label"]
+        false_pos += verdict and not sample["label"]
+        false_neg += (not verdict) and sample["label"]
+        mark = "ok" if verdict == sample["label"] else "WRONG"
+        print(f"  {sample['name']:<32} label={sample['label']!s:<5} verdict={verdict!s:<5} tier={tier:<9} {mark}")
+
+    total = len(samples)
+    stats = doc_classifier.classifier_stats
+    local = stats["lexical"] + stats["embedding"]
+    print(f"\nDocuments: {total}")
+    print(f"Precision: {true_pos / max(true_pos + false_pos, 1):.1%}   Recall: {true_pos / max(true_pos + false_neg, 1):.1%}")
+    print(f"Decided locally: {local}/{total} (lexical {stats['lexical']}, embedding {stats['embedding']})")
+    print(f"LLM calls avoided vs one call per upload: {local / total:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""End-to-end chat benchmark against local stand-ins: no network, no API keys.
+
+Starts a fake OpenAI server, a static catalog site and an in-memory vector
+index (see fake_services.py), points the app at them through OPENAI_API_BASE,
+CATALOG_MIRROR and config.override_resources, and replays the scripted
+sessions in e2e_workload.json. The sessions mix catalog questions, RAG
+questions answered from the index, questions that fall back to the LLM, and
+questions about an uploaded PDF. Each session runs its turns in order and
+sessions run concurrently.
+
+Reports p50/p95/p99 turn latency (and time to first token with --stream),
+throughput, LLM calls per turn and prompt tokens per turn. Prompt tokens are
+counted by the fake server as characters / 4. The per-kind LLM calls and
+prompt tokens are measured around each turn on the fake server's global
+counters, so they are only printed with --concurrency 1; the history
+summarizer's background calls are left out of them and reported separately.
+
+Usage (from the repository root):
+    python benchmarks/bench_e2e.py
+    python benchmarks/bench_e2e.py --concurrency 8 --repeat 5 --stream --llm-latency 0.5
+    python benchmarks/bench_e2e.py --concurrency 1    # LLM calls and prompt tokens per kind of turn
+    python benchmarks/bench_e2e.py --error-rate 0.05
+    python benchmarks/bench_e2e.py --save-catalog benchmarks/catalog_pages   # snapshot live pages (needs network)
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_services import (  # noqa: E402
+    FakeOpenAIServer, FakePineconeIndex, HashingEmbedder, StaticCatalogServer, page_file_name
+)
+
+WORKLOAD_FILE = os.path.join(BENCH_DIR, "e2e_workload.json")
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+def save_catalog(directory):
+    """Download every catalog page once so later runs can replay real HTML offline"""
+    import requests
+    from chatbot_backend import course_catalog_urls
+
+    os.makedirs(directory, exist_ok=True)
+    for url in course_catalog_urls:
+        response = requests.get(url, timeout=20)
+        response.raise_for_status()
+        with open(os.path.join(directory, page_file_name(urlsplit(url).path)), "w", encoding="utf-8") as f:
+            f.write(response.text)
+        print(f"Saved {url}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=4, help="sessions running at the same time")
+    parser.add_argument("--repeat", type=int, default=2, help="times each scripted session is replayed")
+    parser.add_argument("--stream", action="store_true", help="consume answers as token streams")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds before each LLM response")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="seconds per streamed token")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of LLM calls that fail with a 500")
+    parser.add_argument("--catalog-dir", help="directory of saved catalog HTML to replay")
+    parser.add_argument("--save-catalog", metavar="DIR", help="snapshot the live catalog pages into DIR and exit")
+    parser.add_argument("--real-embedder", action="store_true", help="use the configured SentenceTransformer")
+    args = parser.parse_args()
+
+    if args.save_catalog:
+        save_catalog(args.save_catalog)
+        return
+
+    llm = FakeOpenAIServer(latency=args.llm_latency, token_latency=args.token_latency,
+                           error_rate=args.error_rate).start()
+    site = StaticCatalogServer(args.catalog_dir).start()
+
+    # Point config at the stand-ins before any application module is imported
+    scratch = tempfile.mkdtemp(prefix="mie-e2e-")
+    os.environ.update({
+        "OPENAI_API_KEY": "sk-offline",
+        "OPENAI_API_BASE": llm.api_base,
+        "CATALOG_MIRROR": site.base_url,
+        "CATALOG_CACHE_DIR": os.path.join(scratch, "catalog"),
+        "PDF_CACHE_DIR": os.path.join(scratch, "pdf"),
+        "EMBED_CACHE_PATH": os.path.join(scratch, "embeddings.sqlite"),
+        "TRACE_FILE": os.path.join(scratch, "trace.jsonl"),
+        "METRICS_FILE": os.path.join(scratch, "metrics.prom"),
+    })
+
+    import config
+    import chat_db
+    import chatbot_backend
+    import pdf_qa
+    from bench_pdf_retrieval import make_handbook
+    from bench_pdf_extraction import Upload
+
+    chat_db.DB_FILE = os.path.join(scratch, "chat_history.db")
+    chat_db.init_db()
+
+    with open(WORKLOAD_FILE, "r", encoding="utf-8") as f:
+        workload = json.load(f)
+
+    embedder = config.get_embed_model() if args.real_embedder else HashingEmbedder()
+    index = FakePineconeIndex()
+    # FAQ-style records: indexed on the question, the Q/A pair is what retrieval returns
+    vectors = embedder.encode([doc["question"] for doc in workload["corpus"]])
+    index.upsert([
+        {"id": doc["id"], "values": vector,
+         "metadata": {"combined_text": f"Q: {doc['question']}\nA: {doc['answer']}"}}
+        for doc, vector in zip(workload["corpus"], vectors)
+    ])
+    config.override_resources(embed_model=embedder, index=index)
+
+    handbook, _ = make_handbook(60)
+    pdf_data = pdf_qa.process_pdf(Upload(handbook))
+    print(f"PDF processed ({len(pdf_data['chunks'])} chunks); setup used {llm.snapshot()['calls']} LLM calls\n")
+
+    def run_turn(turn, session_id):
+        started = time.perf_counter()
+        first_token = None
+        if turn["kind"] == "pdf":
+            answer = pdf_qa.answer_question(turn["query"], pdf_data, stream=args.stream)
+        else:
+            answer = chatbot_backend.process_chat(turn["query"], stream=args.stream, session_id=session_id)
+        if args.stream:
+            for _ in answer:
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+        return time.perf_counter() - started, first_token
+
+    results = []
+    results_lock = threading.Lock()
+
+    def run_session(numbered_session):
+        number, session = numbered_session
+        session_id = f"bench-{number}"
+        for turn in session:
+            before = llm.snapshot()
+            latency, first_token = run_turn(turn, session_id)
+            after = llm.snapshot()
+            with results_lock:
+                results.append({
+                    "kind": turn["kind"], "latency": latency, "first_token": first_token,
+                    "calls": (after["calls"] - after["summary_calls"]) - (before["calls"] - before["summary_calls"]),
+                    "prompt_tokens": (after["prompt_tokens"] - after["summary_prompt_tokens"])
+                                     - (before["prompt_tokens"] - before["summary_prompt_tokens"]),
+                })
+
+    sessions = [session for _ in range(args.repeat) for session in workload["sessions"]]
+    start_stats = llm.snapshot()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(run_session, enumerate(sessions)))
+    elapsed = time.perf_counter() - started
+    end_stats = llm.snapshot()
+
+    turns = len(results)
+    latencies = [r["latency"] for r in results]
+    print(f"Turns: {turns} in {len(sessions)} sessions, concurrency {args.concurrency}, "
+          f"{'streaming' if args.stream else 'blocking'}")
+    print(f"Latency p50 {percentile(latencies, 50):.3f}s  p95 {percentile(latencies, 95):.3f}s  "
+          f"p99 {percentile(latencies, 99):.3f}s")
+    if args.stream:
+        first_tokens = [r["first_token"] for r in results if r["first_token"] is not None]
+        print(f"Time to first token p50 {percentile(first_tokens, 50):.3f}s  p95 {percentile(first_tokens, 95):.3f}s")
+    print(f"Throughput: {turns / elapsed:.2f} turns/s")
+    print(f"LLM calls per turn: {(end_stats['calls'] - start_stats['calls']) / turns:.2f}  "
+          f"prompt tokens per turn: {(end_stats['prompt_tokens'] - start_stats['prompt_tokens']) / turns:.0f}  "
+          f"injected errors: {end_stats['errors'] - start_stats['errors']}")
+    print(f"  of which history summaries: {end_stats['summary_calls'] - start_stats['summary_calls']} calls, "
+          f"{end_stats['summary_prompt_tokens'] - start_stats['summary_prompt_tokens']} prompt tokens")
+
+    # Per-turn counter deltas include other sessions' calls unless sessions run one at a time
+    per_kind_calls = args.concurrency == 1
+    print(f"\n{'kind':<10} {'turns':>5} {'p50':>8} {'p95':>8} {'calls/turn':>11} {'tokens/turn':>12}")
+    for kind in sorted({r["kind"] for r in results}):
+        rows = [r for r in results if r["kind"] == kind]
+        kind_latencies = [r["latency"] for r in rows]
+        if per_kind_calls:
+            calls = f"{sum(r['calls'] for r in rows) / len(rows):>11.2f} {sum(r['prompt_tokens'] for r in rows) / len(rows):>12.0f}"
+        else:
+            calls = f"{'-':>11} {'-':>12}"
+        print(f"{kind:<10} {len(rows):>5} {percentile(kind_latencies, 50):>7.3f}s {percentile(kind_latencies, 95):>7.3f}s {calls}")
+    if not per_kind_calls:
+        print("(calls and tokens per kind need --concurrency 1)")
+
+    print(f"\nCatalog site requests: {site.stats['requests']} ({site.stats['not_modified']} not modified)")
+    print(f"Answer cache: {chatbot_backend.answer_cache.cache_stats()}")
+    print(f"Session memory: {chatbot_backend.session_memory.footprint()}")
+    llm.stop()
+    site.stop()
+
+
+if __name__ == "__main__":
+    main()
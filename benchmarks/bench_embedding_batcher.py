@@ -0,0 +1,83 @@
+"""Throughput and tail latency of per-call encode vs. the micro-batching encoder.
+
+Each simulated session encodes one short query at a time (batch size 1), as
+retrieve_context does. The embedding cache is bypassed so every call hits
+the model.
+
+Usage (from the repository root):
+    python benchmarks/bench_embedding_batcher.py --concurrency 1 4 16 64 --requests 512
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from embedding_batcher import BatchingEncoder  # noqa: E402
+from config import EMBED_MODEL_NAME, EMBED_BATCH_SIZE, EMBED_BATCH_WAIT_MS  # noqa: E402
+
+QUERIES = [
+    "What are the core courses for the MSIE program?",
+    "How do I apply for a teaching assistantship?",
+    "Which electives count toward the robotics degree?",
+    "When is the co-op application deadline?",
+    "What is the credit requirement for engineering management?",
+    "Can I transfer credits from another university?",
+    "Who is the graduate coordinator for mechanical engineering?",
+    "Are there thesis options in operations research?",
+]
+
+
+def run(encoder, concurrency, total_requests):
+    latencies = []
+    lock = threading.Lock()
+    per_worker = total_requests // concurrency
+
+    def worker(worker_id):
+        local = []
+        for i in range(per_worker):
+            # Unique text per call so nothing can be deduplicated
+            text = f"{QUERIES[(worker_id + i) % len(QUERIES)]} ({worker_id}-{i})"
+            started = time.perf_counter()
+            encoder.encode(text)
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(w,)) for w in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    return len(latencies) / elapsed, np.percentile(latencies_ms, 50), np.percentile(latencies_ms, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=512, help="encode calls per concurrency level")
+    args = parser.parse_args()
+
+    model = SentenceTransformer(EMBED_MODEL_NAME)
+    model.encode(QUERIES)  # warm up
+    batcher = BatchingEncoder(model, max_batch=EMBED_BATCH_SIZE, max_wait=EMBED_BATCH_WAIT_MS / 1000)
+
+    print(f"{'concurrency':>11} | {'path':<9} | {'req/s':>8} | {'p50 ms':>8} | {'p99 ms':>8}")
+    for concurrency in args.concurrency:
+        for name, encoder in (("per-call", model), ("batched", batcher)):
+            throughput, p50, p99 = run(encoder, concurrency, args.requests)
+            print(f"{concurrency:>11} | {name:<9} | {throughput:8.1f} | {p50:8.2f} | {p99:8.2f}")
+    print(f"Batcher: {batcher.stats['texts']} texts in {batcher.stats['batches']} batches")
+
+
+if __name__ == "__main__":
+    main()
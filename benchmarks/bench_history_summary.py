@@ -0,0 +1,124 @@
+"""History compaction: RAG prompt tokens per turn over a long session.
+
+Replays one session of --turns turns with long answers and, at every turn,
+builds the RAG request three ways for the same question and context:
+
+- raw:      the original prompt, last 5 rounds verbatim with no token budget
+- last 5:   last 5 rounds verbatim through the prompt budgets
+- summary:  rolling summary of older turns + the unsummarized recent turns
+
+For each it reports prompt tokens and how many earlier turns the prompt
+still covers (verbatim, or folded into the summary).
+
+Summaries come from chatbot_backend.summarize_history_agent talking to the
+fake OpenAI server in fake_services.py, so no API key is needed (the fake
+server returns a summary as long as the requested max_tokens allows, which
+is the worst case). In the app the summary is computed in the background
+after a turn; here each compaction is awaited before the next turn, as if
+the user took longer to type than the summarizer took to answer.
+
+Usage (from the repository root):
+    python benchmarks/bench_history_summary.py
+    python benchmarks/bench_history_summary.py --turns 100 --answer-tokens 400
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_services import FakeOpenAIServer  # noqa: E402
+
+CONTEXT = [("The program requires 32 semester hours: 16 of core courses, 8 of restricted electives and 8 of "
+            "general electives, with a minimum GPA of 3.000. Students may choose a thesis or project option. ") * 4]
+TOPICS = ["core courses", "electives", "co-op", "thesis option", "GPA requirement", "advising", "transfer credit"]
+
+
+def make_answer(turn, tokens):
+    sentence = f"For turn {turn}, the {TOPICS[turn % len(TOPICS)]} rules are described in the catalog. "
+    return (sentence * (tokens * 4 // len(sentence) + 1))[:tokens * 4]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--answer-tokens", type=int, default=300, help="approximate length of each answer")
+    args = parser.parse_args()
+
+    llm = FakeOpenAIServer(latency=0.0, answer_words=200).start()
+    scratch = tempfile.mkdtemp(prefix="mie-summary-")
+    os.environ.update({
+        "OPENAI_API_KEY": "sk-offline",
+        "OPENAI_API_BASE": llm.api_base,
+        "TRACE_FILE": os.path.join(scratch, "trace.jsonl"),
+        "METRICS_FILE": os.path.join(scratch, "metrics.prom"),
+    })
+
+    import chat_db
+    import chatbot_backend
+    import prompt_budget
+    from config import HISTORY_RECENT_TURNS, HISTORY_SUMMARY_BATCH
+
+    chat_db.DB_FILE = os.path.join(scratch, "chat_history.db")
+    chat_db.init_db()
+    compactor = chatbot_backend.history_compactor or chatbot_backend.HistoryCompactor(
+        chatbot_backend.session_memory, chatbot_backend.summarize_history_agent, store=chat_db.save_summary,
+        keep_recent=HISTORY_RECENT_TURNS, batch=HISTORY_SUMMARY_BATCH
+    )
+    memory = chatbot_backend.session_memory
+    session_id = "bench-history"
+
+    def budgeted(history, summary="", summary_turns=0):
+        """(prompt tokens, earlier turns covered) of the budgeted RAG request"""
+        request = chatbot_backend.build_rag_request("What else should I know?", CONTEXT, history, summary)
+        tokens = sum(prompt_budget.count_tokens(m["content"]) for m in request["messages"])
+        return tokens, request["messages"][1]["content"].count("User: ") + summary_turns
+
+    def raw_tokens(history):
+        prompt = (f"Chat History:\n{chr(10).join(history)}\n\nContext:\n{CONTEXT[0]}\n\n"
+                  f"Question: What else should I know?\n\n" + chatbot_backend.RAG_INSTRUCTIONS)
+        return prompt_budget.count_tokens(chatbot_backend.RAG_SYSTEM_PROMPT + prompt)
+
+    rows = []
+    for turn in range(1, args.turns + 1):
+        turns = memory.get(session_id)
+        last_five = [f"User: {t['question']}\nAssistant: {t['answer']}" for t in turns[-5:]]
+        summary, recent = memory.context(session_id)
+        compacted = [f"User: {t['question']}\nAssistant: {t['answer']}" for t in recent[-5:]]
+        rows.append((turn, raw_tokens(last_five), len(last_five), *budgeted(last_five),
+                     *budgeted(compacted, summary, turn - 1 - len(recent))))
+
+        question = f"Question {turn} about {TOPICS[turn % len(TOPICS)]}?"
+        answer = make_answer(turn, args.answer_tokens)
+        chat_db.save_messages(session_id, [("user", question), ("assistant", answer)])
+        memory.append(session_id, question, answer)
+        future = compactor.schedule(session_id)
+        if future is not None:
+            future.result()
+
+    tokenizer = "tiktoken" if prompt_budget.get_encoding() is not None else "len/4 estimate"
+    print(f"\n{args.turns} turns, ~{args.answer_tokens}-token answers, "
+          f"{HISTORY_RECENT_TURNS} recent turns kept verbatim; token counts: {tokenizer}\n")
+    print(f"{'':>5} {'raw':>15} {'last 5':>15} {'summary':>15}")
+    print(f"{'turn':>5}" + f" {'tokens':>8} {'turns':>6}" * 3)
+    shown = {1, 2, 5, 10, 20, 30, 40, args.turns}
+    for row in rows:
+        if row[0] in shown:
+            print(f"{row[0]:>5}" + "".join(f" {tokens:>8} {covered:>6}" for tokens, covered in zip(row[1::2], row[2::2])))
+    means = [sum(row[i] for row in rows) / len(rows) for i in range(1, 7)]
+    print(f"{'mean':>5}" + "".join(f" {tokens:>8.0f} {covered:>6.1f}" for tokens, covered in zip(means[::2], means[1::2])))
+
+    stored, covered = chat_db.load_summary(session_id)
+    stats = llm.snapshot()
+    print(f"\nCompactor: {compactor.stats}")
+    print(f"Background summarizer: {stats['calls']} LLM calls, {stats['prompt_tokens']} prompt tokens "
+          f"({stats['prompt_tokens'] / args.turns:.0f} per turn, off the request path)")
+    print(f"Stored summary covers {covered} of {args.turns} turns ({len(stored)} chars)")
+    llm.stop()
+
+
+if __name__ == "__main__":
+    main()
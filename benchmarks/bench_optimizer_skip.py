@@ -0,0 +1,83 @@
+"""Optimizer fast path: LLM calls per turn and agreement with always-rewrite behavior.
+
+Each entry in query_log.json has the previous questions, the new query and a
+label saying whether it needs the history to be understood. The local
+decision is scored against the labels. With --llm, every skipped query is
+also rewritten by the optimizer, and the raw and rewritten queries are
+checked for leading to the same context (same catalog URL or overlapping
+retrieved docs).
+
+Usage (from the repository root):
+    python benchmarks/bench_optimizer_skip.py
+    python benchmarks/bench_optimizer_skip.py --llm    # costs optimizer API calls
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chatbot_backend  # noqa: E402
+
+LOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_log.json")
+
+
+def same_context(raw_query, rewritten_query):
+    """Would the raw query have produced the same context as the rewritten one?"""
+    raw_course = chatbot_backend.is_course_related_query(raw_query)
+    if raw_course != chatbot_backend.is_course_related_query(rewritten_query):
+        return False
+    if raw_course:
+        return chatbot_backend.route_catalog_locally(raw_query) == chatbot_backend.route_catalog_locally(rewritten_query)
+    raw_docs = set(chatbot_backend.retrieve_context(raw_query))
+    rewritten_docs = set(chatbot_backend.retrieve_context(rewritten_query))
+    if not raw_docs and not rewritten_docs:
+        return True
+    return len(raw_docs & rewritten_docs) / len(raw_docs | rewritten_docs) >= 0.5
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm", action="store_true", help="compare skipped queries with their LLM rewrites")
+    args = parser.parse_args()
+
+    with open(LOG_FILE, "r", encoding="utf-8") as f:
+        log = json.load(f)
+
+    skipped, wrong_skips, missed_skips, decision_seconds = [], 0, 0, 0.0
+    for entry in log:
+        history = [{"question": q, "answer": ""} for q in entry["history"]]
+        started = time.perf_counter()
+        standalone = chatbot_backend.is_standalone_query(entry["query"], history)
+        decision_seconds += time.perf_counter() - started
+
+        if standalone:
+            skipped.append((entry, history))
+            wrong_skips += entry["needs_rewrite"]
+        else:
+            missed_skips += not entry["needs_rewrite"]
+
+    total = len(log)
+    follow_ups = sum(entry["needs_rewrite"] for entry in log)
+    print(f"Turns: {total} ({follow_ups} labelled follow-ups)")
+    print(f"Optimizer LLM calls per turn: always-rewrite 1.00, fast path {(total - len(skipped)) / total:.2f}")
+    print(f"Decision agreement with labels: {(total - wrong_skips - missed_skips) / total:.1%}")
+    print(f"  follow-ups wrongly skipped: {wrong_skips}/{follow_ups}")
+    print(f"  standalone queries still rewritten: {missed_skips}/{total - follow_ups}")
+    print(f"Mean local decision time: {decision_seconds / total * 1000:.2f} ms")
+
+    if args.llm:
+        agree = 0
+        for entry, history in skipped:
+            rewritten = chatbot_backend.query_optimizer_agent(entry["query"], chat_history=history)
+            match = same_context(entry["query"], rewritten)
+            agree += match
+            if not match:
+                print(f"  context differs: {entry['query']!r} -> {rewritten!r}")
+        print(f"Context agreement with always-rewrite on skipped turns: {agree}/{len(skipped)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""PDF text extraction: temp-file + string concatenation vs in-memory page streaming.
+
+Synthetic PDFs (plain Helvetica text pages) are generated in memory, so no
+sample documents are needed. For each size the legacy extractor (write a temp
+file, accumulate with +=), the streaming extractor in one process, and the
+streaming extractor with a process pool are timed, and peak Python heap use
+is measured with tracemalloc (worker processes are not included in that
+figure). The process pool only pays off with several CPU cores available.
+
+Then the whole upload pipeline (extract, classify, chunk, embed) is run
+once per size in a fresh interpreter and its peak memory is reported as
+the peak Python heap of the pipeline itself (tracemalloc, upload bytes
+excluded) and the peak RSS of the whole process as the OS reports it
+(interpreter and imports included), plus the PDF bytes copied into pool
+workers. Worker RSS is not shown: forked workers report the parent's
+resident pages as their own. "previous" is the
+earlier process_pdf: every page in a list, the joined full text, and pool
+workers that each received a copy of the PDF bytes. "streaming" is the
+current one. Chunks are embedded with the HashingEmbedder from
+fake_services.py.
+
+Usage (from the repository root):
+    python benchmarks/bench_pdf_extraction.py
+    python benchmarks/bench_pdf_extraction.py --pages 10 80 600 --workers 4
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from pypdf import PdfReader  # noqa: E402
+
+import pdf_qa  # noqa: E402
+
+LINES_PER_PAGE = 45
+LINE = "Northeastern University MIE course requirements, credits and prerequisites {page}-{line}"
+
+
+class Upload(io.BytesIO):
+    """Stands in for a Streamlit UploadedFile"""
+    name = "synthetic.pdf"
+
+
+def make_pdf(page_count, page_lines=None):
+    """Build a minimal valid PDF with `page_count` text pages.
+
+    `page_lines(page)` may supply each page's lines (no parentheses or
+    backslashes); a line holding a single space leaves a paragraph break.
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page in range(page_count):
+        texts = page_lines(page) if page_lines else [LINE.format(page=page, line=line) for line in range(LINES_PER_PAGE)]
+        lines = [f"({text}) Tj T*" for text in texts]
+        stream = ("BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(lines) + " ET").encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, page_count)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def legacy_extract(pdf_file):
+    """The previous implementation: temp file on disk and quadratic string building"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
+        tmp_file.write(pdf_file.getvalue())
+        tmp_path = tmp_file.name
+    try:
+        reader = PdfReader(tmp_path)
+        text = ""
+        for page in reader.pages:
+            text += page.extract_text() + "\n"
+        return text
+    finally:
+        os.unlink(tmp_path)
+
+
+# The previous pool: every worker got its own copy of the PDF bytes through the initializer
+_legacy_reader = None
+
+
+def _legacy_init_worker(data):
+    global _legacy_reader
+    _legacy_reader = PdfReader(io.BytesIO(data))
+
+
+def _legacy_extract_range(start, end):
+    return [_legacy_reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def legacy_pages(data, workers):
+    reader = PdfReader(io.BytesIO(data))
+    page_count = len(reader.pages)
+    if workers <= 1 or page_count < pdf_qa.PDF_PARALLEL_MIN_PAGES:
+        return [page.extract_text() or "" for page in reader.pages]
+    step = pdf_qa.PDF_PAGES_PER_TASK
+    with ProcessPoolExecutor(max_workers=workers, initializer=_legacy_init_worker, initargs=(data,)) as pool:
+        futures = [pool.submit(_legacy_extract_range, start, min(start + step, page_count))
+                   for start in range(0, page_count, step)]
+        return [text for future in futures for text in future.result()]
+
+
+def legacy_process(data, workers):
+    """The previous process_pdf body, minus the cache"""
+    import doc_classifier
+
+    pages = legacy_pages(data, workers)
+    text = "".join(f"{page_text}\n" for page_text in pages)
+    verdict, _ = doc_classifier.classify_document(text, llm_check=lambda excerpt: True)
+    chunks = pdf_qa.chunk_pages(pages) if verdict else []
+    return {"text": text, "page_count": len(pages), "chunks": chunks,
+            "embeddings": pdf_qa.embed_chunks(chunks) if chunks else None}
+
+
+def run_pipeline(mode, path, workers):
+    """Child process: run one pipeline on the PDF at `path` and print its timings and peak RSS as JSON"""
+    import config
+    from fake_services import HashingEmbedder
+
+    config.override_resources(embed_model=HashingEmbedder())
+    pdf_qa.verify_northeastern_content = lambda excerpt: True
+    pdf_qa.pdf_cache.get = lambda digest: None
+    pdf_qa.pdf_cache.put = lambda digest, entry: None
+
+    with open(path, "rb") as f:
+        data = f.read()
+    tracemalloc.start()
+    if mode == "previous":
+        result = legacy_process(data, workers)
+    else:
+        result = pdf_qa.process_pdf(Upload(data))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(json.dumps({
+        "chunks": len(result["chunks"]),
+        "heap_peak": peak,
+        # ru_maxrss is in kilobytes on Linux
+        "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        # The previous pool pickled the whole document into every worker; tasks now only get a path
+        "worker_copies": workers if mode == "previous" and workers > 1
+        and result["page_count"] >= pdf_qa.PDF_PARALLEL_MIN_PAGES else 0,
+    }))
+
+
+def measure_pipeline(mode, data, workers):
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(data)
+    try:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", mode, f.name, str(workers)],
+            capture_output=True, text=True, check=True, env=dict(os.environ, PDF_EXTRACT_WORKERS=str(workers))
+        ).stdout
+    finally:
+        os.unlink(f.name)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(extract, data):
+    """Time one run, then measure peak heap on a second run (tracemalloc slows extraction down)"""
+    started = time.perf_counter()
+    text = extract(Upload(data))
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    extract(Upload(data))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return text, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 60, 520], help="document sizes to test")
+    parser.add_argument("--workers", type=int, default=pdf_qa.PDF_EXTRACT_WORKERS, help="process pool size")
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "PDF", "WORKERS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, path, workers = args.child
+        run_pipeline(mode, path, int(workers))
+        return
+
+    extractors = {
+        "legacy (temp file)": legacy_extract,
+        "streaming, 1 process": lambda f: "".join(p + "\n" for p in pdf_qa.iter_pdf_pages(f, workers=1)),
+        f"streaming, {args.workers} workers": lambda f: "".join(p + "\n" for p in pdf_qa.iter_pdf_pages(f, workers=args.workers)),
+    }
+
+    for page_count in args.pages:
+        data = make_pdf(page_count)
+        print(f"\n{page_count} pages ({len(data) / 1e6:.1f} MB)")
+        if page_count < pdf_qa.PDF_PARALLEL_MIN_PAGES:
+            print(f"  (below PDF_PARALLEL_MIN_PAGES={pdf_qa.PDF_PARALLEL_MIN_PAGES}, the pool is not used)")
+        baseline = None
+        for label, extract in extractors.items():
+            text, elapsed, peak = measure(extract, data)
+            if baseline is None:
+                baseline = text
+            same = "same text" if text == baseline else "TEXT DIFFERS"
+            print(f"  {label:<24} {elapsed:7.2f} s   peak heap {peak / 1e6:7.1f} MB   {same}")
+
+        for workers in sorted({1, args.workers}):
+            for mode in ("previous", "streaming"):
+                result = measure_pipeline(mode, data, workers)
+                print(f"  pipeline, {mode:<9} {workers} worker{'s' if workers > 1 else ' '}  "
+                      f"peak heap {result['heap_peak'] / 1e6:6.1f} MB   process RSS {result['rss_kb'] / 1024:6.1f} MB   "
+                      f"PDF copies in workers {result['worker_copies'] * len(data) / 1e6:5.1f} MB   "
+                      f"{result['chunks']} chunks")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""PDF Q&A context: "first 3 chunks" vs per-question chunk retrieval.
+
+A synthetic student handbook is generated (filler policy text with a set
+of planted facts on known pages), processed like an upload, and each
+question is answered from (a) the old context -- the first three 4000
+character chunks -- and (b) the chunks select_chunks() picks for it.
+Reports estimated prompt tokens of the context, hit rate (the fact is in
+the context) and correct page citation for several top-k values.
+
+Needs the embedding model; no OpenAI calls are made (verification is
+skipped by treating the handbook as Northeastern-related).
+
+Usage (from the repository root):
+    python benchmarks/bench_pdf_retrieval.py
+    python benchmarks/bench_pdf_retrieval.py --pages 300 --top-k 1 3 6
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_pdf_extraction import Upload, make_pdf  # noqa: E402
+
+import pdf_qa  # noqa: E402
+
+# (question, planted sentence, fraction of the way through the handbook)
+FACTS = [
+    ("What GPA do I need to stay in good academic standing?",
+     "Graduate students must maintain a cumulative GPA of 3.0 to remain in good academic standing.", 0.08),
+    ("How many co-op cycles can a master's student complete?",
+     "Master's students may complete at most two co-op cycles during their program.", 0.17),
+    ("When is the deadline to submit a thesis to the graduate school?",
+     "The final thesis must be submitted to the graduate school by April 15 for May graduation.", 0.26),
+    ("How many credits can be transferred from another university?",
+     "Up to 9 semester hours of graduate credit may be transferred from another accredited university.", 0.34),
+    ("Who approves a leave of absence?",
+     "A leave of absence must be approved by the associate dean for graduate education.", 0.43),
+    ("What is the maximum course load per semester?",
+     "Full-time graduate students may register for no more than 16 semester hours per term.", 0.52),
+    ("How long do I have to finish a master's degree?",
+     "All requirements for the master's degree must be completed within seven years of matriculation.", 0.61),
+    ("What happens if I receive two grades of C?",
+     "Students who earn two grades of C or lower are reviewed by the academic standing committee.", 0.69),
+    ("Can I take an incomplete grade?",
+     "An incomplete grade of I must be resolved within one calendar year or it becomes an F.", 0.78),
+    ("Where do I request access to the machine shop?",
+     "Machine shop access requires the safety orientation offered by the MIE technical staff in Snell Engineering.", 0.87),
+    ("What is the attendance policy for the graduate seminar?",
+     "Attendance at the MIE graduate seminar series is required for all first year PhD students.", 0.95),
+]
+
+FILLER = [
+    "The department reviews its policies each academic year and publishes updates in this handbook.",
+    "Students are encouraged to meet with their academic advisor before registering for courses.",
+    "Course offerings vary by term and are listed in the registrar schedule of classes.",
+    "Questions about financial matters should be directed to the student financial services office.",
+    "Faculty office hours are posted at the start of each semester on the course website.",
+    "The university library provides access to engineering databases and interlibrary loan.",
+    "Students should check their university email account regularly for official notices.",
+    "Laboratory courses may require additional safety training before the first session.",
+    "Program requirements are determined by the catalog year in which the student matriculated.",
+    "International students should consult the global services office about enrollment rules.",
+]
+
+
+def make_handbook(page_count, seed=7):
+    """Return PDF bytes and {question: (fact, page)} with 1-based page numbers"""
+    rng = random.Random(seed)
+    planted = {max(0, min(page_count - 1, int(position * page_count))): (question, fact)
+               for question, fact, position in FACTS}
+
+    def page_lines(page):
+        lines = [f"Section {page + 1}. Graduate policies and procedures"]
+        for paragraph in range(4):
+            lines.append(" ")
+            lines.extend(rng.choice(FILLER) for _ in range(5))
+            if paragraph == 2 and page in planted:
+                lines.append(planted[page][1])
+        return lines
+
+    expected = {question: (fact, page + 1) for page, (question, fact) in planted.items()}
+    return make_pdf(page_count, page_lines), expected
+
+
+def legacy_context(text, max_chunk_size=4000):
+    """The old behavior: paragraph chunks of up to 4000 characters, first three sent"""
+    chunks, current = [], ""
+    for paragraph in text.split("\n\n"):
+        if len(current) + len(paragraph) + 2 <= max_chunk_size:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+        else:
+            chunks.append(current)
+            current = paragraph
+    if current:
+        chunks.append(current)
+    return "\n\n".join(chunks[:3])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=120, help="handbook length")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[1, 3, pdf_qa.PDF_TOP_K], help="top-k values to test")
+    args = parser.parse_args()
+
+    data, expected = make_handbook(args.pages)
+    pdf_qa.verify_northeastern_content = lambda text: True
+    pdf_qa.pdf_cache.get = lambda digest: None
+    pdf_qa.pdf_cache.put = lambda digest, entry: None
+    pdf_data = pdf_qa.process_pdf(Upload(data))
+    print(f"Handbook: {args.pages} pages, {len(pdf_data['chunks'])} chunks, {len(expected)} questions\n")
+
+    old = legacy_context(pdf_qa.extract_text_from_pdf(data))
+    old_hits = sum(fact in old.replace("\n", " ") for fact, _ in expected.values())
+    print(f"{'first 3 chunks':<22} context ~{len(old) // 4:5d} tokens   hit {old_hits}/{len(expected)}")
+
+    for top_k in args.top_k:
+        tokens = hits = cited = 0
+        for question, (fact, page) in expected.items():
+            selected = pdf_qa.select_chunks(question, pdf_data, top_k=top_k)
+            tokens += sum(len(chunk["text"]) for chunk in selected) // 4
+            holding = [c for c in selected if fact in c["text"].replace("\n", " ")]
+            hits += bool(holding)
+            cited += any(c["page_start"] <= page <= c["page_end"] for c in holding)
+        mean_tokens = tokens / len(expected)
+        print(f"{f'retrieval top-{top_k}':<22} context ~{mean_tokens:5.0f} tokens   hit {hits}/{len(expected)}"
+              f"   page cited {cited}/{len(expected)}   ({1 - mean_tokens / (len(old) // 4):.0%} fewer tokens)")
+
+
+if __name__ == "__main__":
+    main()
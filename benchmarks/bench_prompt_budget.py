@@ -0,0 +1,76 @@
+"""Prompt budgets: RAG prompt size before and after trimming to the token budgets.
+
+Builds the RAG request for a few representative turns -- a short question,
+a follow-up with five long history rounds, a large scraped catalog page and
+several retrieved documents -- and compares the prompt tokens of the old
+unbounded prompt with the budgeted one. Token counts use tiktoken when it
+(and its encoding file) is available, otherwise the len/4 estimate.
+
+Usage (from the repository root):
+    python benchmarks/bench_prompt_budget.py
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chatbot_backend  # noqa: E402
+import prompt_budget  # noqa: E402
+from config import MODEL_CONTEXT_TOKENS  # noqa: E402
+
+ROW = ("| MIE 5100 | Fundamentals of Mechanical Engineering Design and Analysis "
+       "with Applications in Manufacturing Systems | 4 |")
+PARAGRAPH = ("The program requires students to complete core courses, a set of restricted electives and "
+             "general electives, for a minimum of 32 semester hours with a GPA of at least 3.000. ")
+
+
+def scenarios():
+    long_answer = PARAGRAPH * 6
+    history = [f"User: question {i} about the program?\nAssistant: {long_answer}" for i in range(5)]
+    catalog_page = "#### Program Requirements\n" + PARAGRAPH * 20 + "\n#### Core Table\n" + "\n".join([ROW] * 600)
+    docs = [PARAGRAPH * 8 for _ in range(3)]
+    return [
+        ("short question, one doc", "What is the GPA requirement?", [PARAGRAPH * 3], []),
+        ("follow-up, 5 long turns", "And what about electives?", docs[:1], history),
+        ("large catalog page", "What are the core courses for the MSIE?", [catalog_page], history[:2]),
+        ("three retrieved docs", "How do I apply for co-op?", docs, history[:3]),
+    ]
+
+
+def legacy_prompt_tokens(query, context, history):
+    """Size of the old unbounded prompt and its len/4-based max_tokens"""
+    history_text = "\n".join(history)
+    context_text = "\n\n".join(context)
+    prompt = (
+        f"Chat History:\n{history_text}\n\n"
+        f"Context:\n{context_text}\n\n"
+        f"Question: {query}\n\n" + chatbot_backend.RAG_INSTRUCTIONS
+    )
+    tokens = prompt_budget.count_tokens(chatbot_backend.RAG_SYSTEM_PROMPT + prompt)
+    max_tokens = min(150 + len("\n".join(context)) // 4, 500)
+    return tokens, max_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    tokenizer = "tiktoken" if prompt_budget.get_encoding() is not None else "len/4 estimate"
+    print(f"Token counts: {tokenizer}; model window {MODEL_CONTEXT_TOKENS}\n")
+    print(f"{'scenario':<26} {'old prompt':>10} {'old max':>8} {'new prompt':>11} {'new max':>8}  saved")
+    for label, query, context, history in scenarios():
+        old_tokens, old_max = legacy_prompt_tokens(query, context, history)
+        request = chatbot_backend.build_rag_request(query, context, history)
+        new_tokens = sum(prompt_budget.count_tokens(m["content"]) for m in request["messages"])
+        overflow = "  (old prompt + answer exceeds the window)" if old_tokens + old_max > MODEL_CONTEXT_TOKENS else ""
+        print(f"{label:<26} {old_tokens:>10} {old_max:>8} {new_tokens:>11} {request['max_tokens']:>8}"
+              f"  {1 - new_tokens / old_tokens:5.0%}{overflow}")
+
+    report = prompt_budget.budget_report()
+    print(f"\nTrimmed {report['trimmed']}/{report['prompts']} prompts, "
+          f"{report['saved_tokens']} tokens saved ({report['saved_ratio']:.0%})")
+
+
+if __name__ == "__main__":
+    main()
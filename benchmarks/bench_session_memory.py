@@ -0,0 +1,102 @@
+"""Conversation memory: the old process-wide list vs. the bounded per-session store.
+
+Simulates many users chatting in one process. Turns from all users are
+interleaved; every answer is persisted to a temporary chat_db as app.py does.
+At checkpoints it reports the bytes of text held by each approach (the
+store's footprint() measure, applied to both) and how many of the last five
+turns a user's prompt would see belong to someone else. Sessions evicted from the bounded store are rebuilt from chat_db when
+their user returns; the rehydration latency is reported at the end.
+
+Usage (from the repository root):
+    python benchmarks/bench_session_memory.py
+    python benchmarks/bench_session_memory.py --users 1000 --turns 40 --max-sessions 200
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chat_db  # noqa: E402
+from session_memory import SessionMemory  # noqa: E402
+
+
+def make_answer(rng, size):
+    words = ["semester", "hours", "core", "elective", "co-op", "thesis", "GPA", "program", "course", "advisor"]
+    text = " ".join(rng.choice(words) for _ in range(size // 6))
+    return text[:size]
+
+
+def text_bytes(turns):
+    return sum(sys.getsizeof(turn["question"]) + sys.getsizeof(turn["answer"]) for turn in turns)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=400)
+    parser.add_argument("--turns", type=int, default=30, help="turns per user")
+    parser.add_argument("--answer-chars", type=int, default=1200)
+    parser.add_argument("--max-turns", type=int, default=20)
+    parser.add_argument("--max-sessions", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    traffic = [user for user in range(args.users) for _ in range(args.turns)]
+    rng.shuffle(traffic)
+    answers = [make_answer(rng, args.answer_chars) for _ in range(64)]
+
+    scratch = tempfile.mkdtemp(prefix="mie-memory-")
+    chat_db.DB_FILE = os.path.join(scratch, "chat_history.db")
+    chat_db.init_db()
+
+    legacy = []
+    memory = SessionMemory(max_turns=args.max_turns, max_sessions=args.max_sessions, ttl=3600,
+                           loader=lambda sid: chat_db.load_chat(sid, kind=chat_db.CHAT_KIND))
+    counters = {}
+    checkpoints = {len(traffic) * i // 4 for i in range(1, 5)}
+
+    print(f"{args.users} users x {args.turns} turns, {args.answer_chars}-char answers; "
+          f"store keeps {args.max_turns} turns x {args.max_sessions} sessions\n")
+    print(f"{'turns':>7} {'legacy bytes':>13} {'legacy leak':>12} {'store bytes':>12} {'store leak':>11} {'sessions':>9}")
+    for step, user in enumerate(traffic, 1):
+        session_id = f"user-{user}"
+        counters[user] = counters.get(user, 0) + 1
+        question = f"{session_id} question {counters[user]}"
+        answer = answers[step % len(answers)]
+
+        with contextlib.redirect_stdout(io.StringIO()):  # quiet the per-session rehydration log
+            memory.get(session_id)
+        legacy.append({"question": question, "answer": answer})
+        memory.append(session_id, question, answer)
+        chat_db.save_messages(session_id, [("user", question), ("assistant", answer)])
+
+        if step in checkpoints:
+            legacy_bytes = text_bytes(legacy)
+            store_bytes = memory.footprint()["bytes"]
+            legacy_leak = sum(not turn["question"].startswith(f"{session_id} ") for turn in legacy[-5:])
+            store_leak = sum(not turn["question"].startswith(f"{session_id} ") for turn in memory.get(session_id)[-5:])
+            print(f"{step:>7} {legacy_bytes:>13,} {f'{legacy_leak}/5':>12} {store_bytes:>12,} "
+                  f"{f'{store_leak}/5':>11} {memory.footprint()['sessions']:>9}")
+
+    # Returning users whose sessions were evicted are rebuilt from chat_db
+    evicted = [f"user-{user}" for user in range(args.users)
+               if f"user-{user}" not in memory._sessions][:50]
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for session_id in evicted:
+            memory.get(session_id)
+    elapsed = time.perf_counter() - started
+    if evicted:
+        print(f"\nRehydrated {len(evicted)} evicted sessions from chat_db: "
+              f"{elapsed / len(evicted) * 1000:.2f} ms each")
+    print(f"Store stats: {memory.footprint()}")
+
+
+if __name__ == "__main__":
+    main()
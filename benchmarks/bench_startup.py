@@ -0,0 +1,68 @@
+"""Cold-start cost: import time, first-use time of each lazy resource, and time to first answer.
+
+Every measurement runs in a fresh interpreter so nothing is already imported
+or loaded.
+
+Usage (from the repository root):
+    python benchmarks/bench_startup.py --repeat 5
+    python benchmarks/bench_startup.py --first-answer    # also runs process_chat once (needs API keys)
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, time
+started = time.perf_counter()
+import chatbot_backend
+import config
+timings = {"import chatbot_backend": time.perf_counter() - started}
+
+step = time.perf_counter()
+config.get_embed_model().encode("warm up")
+timings["first encode"] = time.perf_counter() - step
+
+if MEASURE_INDEX:
+    step = time.perf_counter()
+    config.get_index()
+    timings["index handle"] = time.perf_counter() - step
+
+if FIRST_ANSWER:
+    step = time.perf_counter()
+    chatbot_backend.process_chat("What are the core courses for the MSIE program?")
+    timings["first answer"] = time.perf_counter() - step
+
+timings["total"] = time.perf_counter() - started
+print(json.dumps(timings))
+"""
+
+
+def run_probe(first_answer, measure_index):
+    code = PROBE.replace("MEASURE_INDEX", str(measure_index)).replace("FIRST_ANSWER", str(first_answer))
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--first-answer", action="store_true", help="time one full process_chat call")
+    parser.add_argument("--no-index", action="store_true", help="skip creating the index handle")
+    args = parser.parse_args()
+
+    runs = [run_probe(args.first_answer, not args.no_index) for _ in range(args.repeat)]
+    print(f"{'stage':<24} | {'median s':>9} | {'max s':>9}")
+    for stage in runs[0]:
+        values = [run[stage] for run in runs]
+        print(f"{stage:<24} | {statistics.median(values):9.3f} | {max(values):9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""Local stand-ins for OpenAI, Pinecone, the embedding model and the course catalog site.
+
+Used by bench_e2e.py to run the chat pipeline with no network and no API
+keys. Nothing here imports the application modules, so the servers can be
+started before config.py reads its environment.
+
+- FakeOpenAIServer: an OpenAI-compatible /v1/chat/completions endpoint
+  (plain and streaming) with configurable latency (optionally growing with
+  the prompt length) and error rate. Replies
+  are chosen from the prompt so each agent gets a well-formed answer.
+- FakePineconeIndex: in-memory upsert/query with cosine scores.
+- HashingEmbedder: deterministic bag-of-words vectors with the
+  SentenceTransformer encode() signature.
+- StaticCatalogServer: serves saved catalog HTML (see --save-catalog in
+  bench_e2e.py), or a synthetic page with the catalog's structure for any
+  path, with ETag support.
+"""
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+FOLLOW_UP_PATTERN = re.compile(r"^(and|what about)\b|\b(that|this|it|those|they)\b", re.IGNORECASE)
+
+
+def _serve(handler_class):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ---------------- OpenAI ----------------
+
+class FakeOpenAIServer:
+    """Chat completions with `latency` seconds before the first token and `token_latency` per streamed token.
+
+    `prompt_latency` adds that many seconds per 1,000 prompt tokens before
+    the first token, like a real model's prompt processing. Calls made by the
+    history summarizer are also tallied on their own (summary_calls,
+    summary_prompt_tokens), since they run in the background of any session.
+    With `stream_error_after` set, streams send an error event after that
+    many tokens instead of finishing.
+    """
+
+    def __init__(self, latency=0.3, token_latency=0.01, error_rate=0.0, answer_words=80, seed=0, prompt_latency=0.0,
+                 stream_error_after=None):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.prompt_latency = prompt_latency
+        self.error_rate = error_rate
+        self.stream_error_after = stream_error_after
+        self.answer_words = answer_words
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "errors": 0, "streams": 0,
+                      "summary_calls": 0, "summary_prompt_tokens": 0}
+        self.server = None
+
+    @property
+    def api_base(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+    def start(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                fake.handle(self, body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = _serve(Handler)
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def reply_for(self, messages, max_tokens):
+        prompt = "\n".join(m.get("content", "") for m in messages)
+        if "improve the following query" in prompt:
+            # Resolve a follow-up (one with a back-reference) by folding in the most recent previous question
+            quoted = re.findall(r'"([^"]*)"', prompt)
+            query = quoted[-1] if quoted else "query"
+            previous = re.findall(r"Previous Q: (.*)", prompt)
+            if previous and FOLLOW_UP_PATTERN.search(query):
+                return f"{query} ({previous[-1]})"
+            return query
+        if "select the MOST RELEVANT URL" in prompt:
+            urls = re.findall(r"https?://\S+", prompt)
+            return urls[0] if urls else ""
+        if 'Answer with ONLY "yes" or "no"' in prompt:
+            return "yes"
+        if "Search the web for detailed information" in prompt:
+            return "Northeastern offers resources for this topic through its graduate student services."
+        words = min(self.answer_words, max(1, int(max_tokens or self.answer_words) * 3 // 4))
+        return " ".join(f"word{i}" for i in range(words))
+
+    def handle(self, request, body):
+        messages = body.get("messages", [])
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["prompt_tokens"] += prompt_tokens
+            if any("You maintain a running summary" in m.get("content", "") for m in messages):
+                self.stats["summary_calls"] += 1
+                self.stats["summary_prompt_tokens"] += prompt_tokens
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.stats["errors"] += 1
+
+        time.sleep(self.latency + self.prompt_latency * prompt_tokens / 1000)
+        if failed:
+            payload = json.dumps({"error": {"message": "Injected failure", "type": "server_error"}}).encode()
+            request.send_response(500)
+            request.send_header("Content-Type", "application/json")
+            request.send_header("Content-Length", str(len(payload)))
+            request.end_headers()
+            request.wfile.write(payload)
+            return
+
+        reply = self.reply_for(messages, body.get("max_tokens"))
+        pieces = re.findall(r"\s*\S+", reply) or [reply]
+        with self._lock:
+            self.stats["completion_tokens"] += len(pieces)
+
+        if not body.get("stream"):
+            payload = json.dumps({
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+                "model": body.get("model", "gpt-4"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(pieces),
+                          "total_tokens": prompt_tokens + len(pieces)},
+            }).encode()
+            request.send_response(200)
+            request.send_header("Content-Type", "application/json")
+            request.send_header("Content-Length", str(len(payload)))
+            request.end_headers()
+            request.wfile.write(payload)
+            return
+
+        with self._lock:
+            self.stats["streams"] += 1
+        request.send_response(200)
+        request.send_header("Content-Type", "text/event-stream")
+        request.end_headers()
+        for i, piece in enumerate(pieces):
+            if i == self.stream_error_after:
+                error = {"error": {"message": "Injected stream failure", "type": "server_error"}}
+                request.wfile.write(f"data: {json.dumps(error)}\n\n".encode())
+                request.wfile.flush()
+                return
+            chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": body.get("model", "gpt-4"),
+                     "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+            request.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            request.wfile.flush()
+            time.sleep(self.token_latency)
+        request.wfile.write(b"data: [DONE]\n\n")
+        request.wfile.flush()
+
+
+# ---------------- Embeddings and vector index ----------------
+
+class HashingEmbedder:
+    """Deterministic bag-of-words (plus bigram) vectors; a drop-in for SentenceTransformer.encode"""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def _vector(self, text):
+        words = WORD_PATTERN.findall(text.lower())
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dim] += 1.0 if digest[4] & 1 else -1.0
+        return vector
+
+    def encode(self, sentences, normalize_embeddings=False, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if texts:
+            vectors = np.stack([self._vector(t) for t in texts])
+        else:
+            vectors = np.zeros((0, self.dim), dtype=np.float32)
+        if normalize_embeddings and len(vectors):
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors[0] if single else vectors
+
+
+class FakePineconeIndex:
+    """In-memory index with the parts of the Pinecone Index API the app uses"""
+
+    def __init__(self):
+        self._ids, self._vectors, self._metadata = [], [], []
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors, namespace=None):
+        with self._lock:
+            for item in vectors:
+                if isinstance(item, dict):
+                    record_id, values, metadata = item["id"], item["values"], item.get("metadata", {})
+                else:
+                    record_id, values, metadata = (tuple(item) + ({},))[:3]
+                values = np.asarray(values, dtype=np.float32)
+                self._ids.append(record_id)
+                self._vectors.append(values / max(float(np.linalg.norm(values)), 1e-12))
+                self._metadata.append(metadata)
+            self._matrix = np.stack(self._vectors)
+        return {"upserted_count": len(vectors)}
+
+    def query(self, vector, top_k=10, include_metadata=False, namespace=None, **kwargs):
+        with self._lock:
+            if self._matrix is None:
+                return {"matches": []}
+            query = np.asarray(vector, dtype=np.float32)
+            scores = self._matrix @ (query / max(float(np.linalg.norm(query)), 1e-12))
+            best = np.argsort(-scores)[:top_k]
+            return {"matches": [
+                {"id": self._ids[i], "score": float(scores[i]),
+                 **({"metadata": self._metadata[i]} if include_metadata else {})}
+                for i in best
+            ]}
+
+    def describe_index_stats(self):
+        return {"total_vector_count": len(self._ids)}
+
+
+# ---------------- Course catalog site ----------------
+
+def page_file_name(path):
+    """File name a saved catalog page is stored under"""
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", path.strip("/")) + ".html"
+
+
+def synthetic_catalog_page(path, courses=24):
+    """HTML shaped like a catalog program page: overview, requirement headings, lists and a course table.
+
+    The table follows the catalog's markup: "areaheader" rows naming each
+    requirement group, code cells, "or" alternatives and comment rows.
+    """
+    slug = path.strip("/").split("/")[-1] or "program"
+    name = slug.replace("-", " ").title()
+    rng = random.Random(slug)
+    prefix = rng.choice(["IE", "ME", "EMGT", "HFA", "EECE"])
+    subjects = ["Probability and Statistics", "Optimization Methods", "Machine Learning", "Supply Chain Engineering",
+                "Manufacturing Systems", "Human Factors", "Simulation Modeling", "Robotics", "Thermodynamics",
+                "Project Management", "Data Mining", "Quality Control"]
+
+    def course_row(i, alternative=False):
+        code = f"{prefix}&nbsp;{5000 + rng.randrange(0, 2999)}"
+        title = f"{rng.choice(subjects)} {i}"
+        if alternative:
+            return (f'<tr class="orclass"><td class="codecol orclass"><div style="margin-left: 20px;">or '
+                    f'<a class="bubblelink code">{code}</a></div></td><td>{title}</td><td class="hourscol"></td></tr>')
+        return (f'<tr><td class="codecol"><a class="bubblelink code">{code}</a></td><td>{title}</td>'
+                f'<td class="hourscol">{rng.choice([2, 4])}</td></tr>')
+
+    def area(title, comment, count, start):
+        rows = [f'<tr class="areaheader"><td colspan="2"><span class="courselistcomment areaheader">{title}</span>'
+                f'</td><td class="hourscol"></td></tr>']
+        if comment:
+            rows.append(f'<tr><td colspan="2"><span class="courselistcomment">{comment}</span></td>'
+                        f'<td class="hourscol">16</td></tr>')
+        for i in range(start, start + count):
+            rows.append(course_row(i))
+            if i % 5 == 4:
+                rows.append(course_row(i, alternative=True))
+        return "".join(rows)
+
+    core = courses // 3
+    rows = area("Core Requirements", "", core, 0) + area(
+        "Electives", "Complete 16 semester hours from the following:", courses - core, core
+    )
+    return f"""<html><head><title>{name} | Northeastern University Academic Catalog</title></head>
+<body><main>
+<h1>{name}</h1>
+<p>The {name} program at Northeastern University prepares students for careers in industry and research.</p>
+<div id="programrequirementstextcontainer">
+<h2 id="programrequirementstext">Program Requirements</h2>
+<p>Complete 32 semester hours with a minimum GPA of 3.000. Students may complete a thesis or a project.</p>
+<h3>Core Requirements</h3>
+<ul><li>Complete all core courses with a grade of B or better.</li><li>Complete one experiential course.</li></ul>
+<h3>Course List</h3>
+<table class="sc_courselist"><thead><tr><th>Code</th><th>Title</th><th>Hours</th></tr></thead><tbody>{rows}</tbody></table>
+<h3>Electives</h3>
+<p>Complete 16 semester hours of electives approved by the program director.</p>
+</div>
+</main></body></html>"""
+
+
+class StaticCatalogServer:
+    """Serves saved pages from `pages_dir` (named by page_file_name) and synthetic pages for everything else"""
+
+    def __init__(self, pages_dir=None):
+        self.pages_dir = pages_dir
+        self.stats = {"requests": 0, "not_modified": 0}
+        self.server = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def page(self, path):
+        if self.pages_dir:
+            saved = os.path.join(self.pages_dir, page_file_name(path))
+            if os.path.exists(saved):
+                with open(saved, "r", encoding="utf-8") as f:
+                    return f.read()
+        return synthetic_catalog_page(path)
+
+    def start(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                site.stats["requests"] += 1
+                body = site.page(self.path.split("?")[0]).encode("utf-8")
+                etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+                if self.headers.get("If-None-Match") == etag:
+                    site.stats["not_modified"] += 1
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = _serve(Handler)
+        return self
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
@@ -0,0 +1,220 @@
+# catalog_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+from config import CATALOG_CACHE_DIR, CATALOG_CACHE_TTL, CATALOG_PREFETCH_WORKERS, CATALOG_MIRROR
+from tracing import current_span
+
+
+def mirror_url(url, mirror=CATALOG_MIRROR):
+    """The URL to fetch `url` from: unchanged, or the same path on the CATALOG_MIRROR host"""
+    if not mirror:
+        return url
+    parts = urlsplit(url)
+    return mirror.rstrip("/") + parts.path + (f"?{parts.query}" if parts.query else "")
+
+
+class CatalogCache:
+    """Memory + disk cache for parsed course catalog pages.
+
+    Entries are kept fresh for `ttl` seconds. After that the page is
+    revalidated with a conditional GET (ETag / Last-Modified), so an
+    unchanged page costs a 304 and no re-parse. Expired entries that are
+    already cached are served immediately and revalidated in the background.
+    Entries parsed with a different `version` of parse_page are ignored, so
+    changing what the parser extracts re-fetches every page once.
+    """
+
+    def __init__(self, parse_page, cache_dir=CATALOG_CACHE_DIR, ttl=CATALOG_CACHE_TTL, timeout=10, version=1):
+        self.parse_page = parse_page
+        self.version = version
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.timeout = timeout
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._refresher = None
+        # Callbacks run with the URL whenever a page's parsed content changes
+        self.on_change = []
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "revalidated": 0, "errors": 0}
+
+    # ---------------- Storage ----------------
+
+    def _path(self, url):
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def _load(self, url):
+        with self._lock:
+            entry = self._entries.get(url)
+        if entry is not None:
+            return entry
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("version", 1) != self.version:
+            return None
+        with self._lock:
+            self._entries[url] = entry
+        return entry
+
+    def _store(self, url, entry):
+        with self._lock:
+            self._entries[url] = entry
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(url)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Catalog cache write error for {url}: {e}")
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+        current_span().set(cache=key)
+
+    # ---------------- Lookup ----------------
+
+    def _is_fresh(self, entry):
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    def get(self, url):
+        """Return the parsed page for `url`, fetching only when nothing is cached."""
+        entry = self._load(url)
+        if entry is not None and self._is_fresh(entry):
+            self._count("hits")
+            return entry["data"]
+
+        if entry is not None:
+            self._count("stale")
+            self._refresh_async(url)
+            return entry["data"]
+
+        self._count("misses")
+        return self._fetch(url)
+
+    def peek(self, url):
+        """The cached parsed page for `url` (fresh or not), or None; never fetches"""
+        entry = self._load(url)
+        return entry["data"] if entry is not None else None
+
+    def refresh(self, url, force=False):
+        """Fetch or revalidate `url` unless it is still fresh (or `force` is set)."""
+        entry = self._load(url)
+        if entry is not None and not force and self._is_fresh(entry):
+            return entry["data"]
+        return self._fetch(url, entry)
+
+    def _refresh_async(self, url):
+        with self._lock:
+            if url in self._refreshing:
+                return
+            self._refreshing.add(url)
+
+        def run():
+            try:
+                self.refresh(url, force=True)
+            except Exception as e:
+                print(f"Catalog refresh error for {url}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(url)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _fetch(self, url, entry=None):
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            response = requests.get(mirror_url(url), headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and entry is not None:
+                self._count("revalidated")
+                entry = dict(entry, fetched_at=time.time())
+                self._store(url, entry)
+                return entry["data"]
+            if response.status_code == 304:
+                # Nothing cached to revalidate and no body to parse: ask for the full page instead
+                response = requests.get(mirror_url(url), headers={"Cache-Control": "no-cache"}, timeout=self.timeout)
+                if response.status_code == 304:
+                    raise requests.HTTPError(f"304 Not Modified for {url} with no cached copy", response=response)
+            response.raise_for_status()
+        except Exception:
+            self._count("errors")
+            # Serve the stale copy rather than failing the request
+            if entry is not None:
+                return entry["data"]
+            raise
+
+        data = self.parse_page(response.text, url)
+        if entry is not None and entry["data"] != data:
+            for callback in self.on_change:
+                try:
+                    callback(url)
+                except Exception as e:
+                    print(f"Catalog change callback error for {url}: {e}")
+        self._store(url, {
+            "version": self.version,
+            "data": data,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": time.time(),
+        })
+        return data
+
+    # ---------------- Warm-up ----------------
+
+    def prefetch(self, urls, max_workers=CATALOG_PREFETCH_WORKERS, force=False):
+        """Fetch all `urls` concurrently; returns the number that failed."""
+        def fetch_one(url):
+            try:
+                self.refresh(url, force=force)
+                return True
+            except Exception as e:
+                print(f"Catalog prefetch error for {url}: {e}")
+                return False
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(fetch_one, urls))
+        return results.count(False)
+
+    def start_refresher(self, urls, interval):
+        """Warm all `urls` now and revalidate them every `interval` seconds in a daemon thread."""
+        with self._lock:
+            if self._refresher is not None:
+                return self._refresher
+
+            def run():
+                force = False
+                while True:
+                    started = time.time()
+                    failed = self.prefetch(urls, force=force)
+                    print(f"[CATALOG] 🔄 Refreshed {len(urls) - failed}/{len(urls)} pages "
+                          f"in {time.time() - started:.2f}s")
+                    force = True
+                    time.sleep(interval)
+
+            self._refresher = threading.Thread(target=run, name="catalog-refresher", daemon=True)
+            self._refresher.start()
+            return self._refresher
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,33 @@
+# catalog_router.py
+import numpy as np
+
+
+class CatalogRouter:
+    """Pick a catalog URL by cosine similarity between the query and program descriptions.
+
+    Program descriptions are encoded once into a normalized float32 matrix, so
+    routing a query is one encode plus a single matrix-vector product.
+    """
+
+    def __init__(self, encoder, programs):
+        self.encoder = encoder
+        self.urls = [p["url"] for p in programs]
+        texts = [f"{p['name']}. {p['description']}" for p in programs]
+        self.matrix = np.asarray(encoder.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+    def scores_for_vector(self, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+        return self.matrix @ vector
+
+    def route_vector(self, vector):
+        """Return (url, score, margin) where margin is the gap between the top-2 scores."""
+        scores = self.scores_for_vector(vector)
+        top2 = np.argpartition(-scores, 1)[:2]
+        best, second = top2[np.argsort(-scores[top2])]
+        return self.urls[best], float(scores[best]), float(scores[best] - scores[second])
+
+    def route(self, query):
+        return self.route_vector(self.encoder.encode(query, normalize_embeddings=True))
@@ -0,0 +1,176 @@
+# catalog_sections.py
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from prompt_budget import count_tokens
+
+HEADING_TAGS = ["h1", "h2", "h3", "h4"]
+BLOCK_TAGS = HEADING_TAGS + ["p", "li", "table"]
+
+
+def table_lines(rows):
+    """Rows of a catalog table as markdown lines (same layout as extract_rich_text)"""
+    if all(len(row) == 3 for row in rows):
+        return ["Course Code | Course Title | Credits", "--- | --- | ---"] + [" | ".join(row) for row in rows]
+    if all(len(row) == 2 for row in rows):
+        return ["Course Code | Course Title", "--- | ---"] + [" | ".join(row) for row in rows]
+    return [f"- {' – '.join(row)}" for row in rows]
+
+
+def split_section(heading, lines, max_tokens):
+    """One section's lines as one or more {heading, text} pieces of at most ~max_tokens each"""
+    pieces, current, used = [], [], 0
+    for line in lines:
+        cost = count_tokens(line)
+        if current and used + cost > max_tokens:
+            pieces.append(current)
+            current, used = [], 0
+        current.append(line)
+        used += cost
+    if current:
+        pieces.append(current)
+
+    sections = []
+    for i, piece in enumerate(pieces):
+        title = heading if i == 0 else f"{heading} (continued)"
+        text = "\n".join(([f"### {title}"] if heading else []) + piece)
+        sections.append({"heading": heading, "text": text})
+    return sections
+
+
+def iter_blocks(root):
+    """Headings, text lines and tables of a catalog page, in document order.
+
+    The one walk over a page's DOM that both the page text
+    (chatbot_backend.extract_rich_text) and its sections are built from, so
+    they agree on where each heading starts. Yields ("heading", text),
+    ("line", text) for paragraphs and list items ("- " prefixed), and
+    ("table", segments) where segments are (area header or None, rows)
+    pairs: the rows before the table's first "area header" row (e.g. "Core
+    Requirements"), then the rows under each one. Text inside tables is only
+    yielded as table rows.
+    """
+    for tag in root.find_all(BLOCK_TAGS):
+        if tag.name != "table" and tag.find_parent("table") is not None:
+            continue
+        if tag.name in HEADING_TAGS:
+            text = tag.get_text(strip=True)
+            if text:
+                yield "heading", text
+            continue
+        if tag.name != "table":
+            text = tag.get_text(strip=True)
+            if text:
+                yield "line", f"- {text}" if tag.name == "li" else text
+            continue
+
+        segments = [(None, [])]
+        for tr in tag.find_all("tr"):
+            cells = [td.get_text(strip=True).replace("\xa0", " ") for td in tr.find_all("td")]
+            if not any(cells):
+                continue
+            if "areaheader" in (tr.get("class") or []):
+                segments.append((cells[0], []))
+                continue
+            segments[-1][1].append(cells)
+        if segments[0][1] or len(segments) > 1:
+            yield "table", segments
+
+
+def extract_sections(root, max_tokens=400):
+    """Heading-scoped sections of a catalog page, in document order.
+
+    Each heading from iter_blocks opens a new section, and so does each
+    "area header" row of a course table, scoped under the heading before
+    the table. Sections longer than `max_tokens` are split, repeating the
+    heading. Returns dicts with heading and text.
+    """
+    sections = []
+    heading, lines = "", []
+
+    def close(next_heading):
+        nonlocal heading, lines
+        if lines:
+            sections.extend(split_section(heading, lines, max_tokens))
+        heading, lines = next_heading, []
+
+    page_heading = ""
+    for kind, value in iter_blocks(root):
+        if kind == "heading":
+            page_heading = value
+            close(value)
+        elif kind == "line":
+            lines.append(value)
+        else:
+            for area, rows in value:
+                if area is not None:
+                    close(f"{page_heading} – {area}" if page_heading else area)
+                if rows:
+                    lines.extend(table_lines(rows))
+    close("")
+    return sections
+
+
+def sections_digest(sections):
+    return hashlib.sha256("\n\x00".join(s["text"] for s in sections).encode("utf-8")).hexdigest()
+
+
+class SectionIndex:
+    """Section embeddings of parsed catalog pages, computed once per page version.
+
+    `get_encoder()` returns the embedding model (called lazily). Each
+    page's section vectors are keyed by its URL and a digest of the section
+    texts, so a re-fetched page with unchanged sections reuses them and a
+    changed page is embedded again. At most `max_pages` pages are kept, in
+    least-recently-used order.
+    """
+
+    def __init__(self, get_encoder, max_pages=64):
+        self.get_encoder = get_encoder
+        self.max_pages = max_pages
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"embedded": 0, "sections_embedded": 0, "hits": 0}
+
+    def vectors(self, url, sections):
+        """Normalized float32 matrix with one row per section"""
+        digest = sections_digest(sections)
+        with self._lock:
+            cached = self._pages.get(url)
+            if cached is not None and cached[0] == digest:
+                self._pages.move_to_end(url)
+                self.stats["hits"] += 1
+                return cached[1]
+        # Embed outside the lock; a concurrent request for the same page just embeds it twice
+        vectors = self.get_encoder().encode([s["text"] for s in sections], normalize_embeddings=True)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            self._pages[url] = (digest, vectors)
+            self._pages.move_to_end(url)
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+            self.stats["embedded"] += 1
+            self.stats["sections_embedded"] += len(sections)
+        return vectors
+
+    def invalidate(self, url):
+        with self._lock:
+            self._pages.pop(url, None)
+
+    def select(self, query, url, sections, token_budget, top_k=8):
+        """The sections most similar to `query` that fit in token_budget, returned in document order"""
+        vectors = self.vectors(url, sections)
+        query_vector = np.asarray(self.get_encoder().encode(query, normalize_embeddings=True), dtype=np.float32)
+        selected, used_tokens = [], 0
+        for i in np.argsort(-(vectors @ query_vector)):
+            cost = count_tokens(sections[i]["text"])
+            if used_tokens + cost > token_budget:
+                continue
+            selected.append(int(i))
+            used_tokens += cost
+            if len(selected) == top_k:
+                break
+        return [sections[i] for i in sorted(selected)]
@@ -1,65 +1,280 @@
+import queue
 import sqlite3
+import threading
+import time
 import uuid
-from typing import List, Dict
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Tuple
+
+from tracing import current_span, traced
 
 DB_FILE = "chat_history.db"
+POOL_SIZE = 4
+SESSION_PAGE_SIZE = 20
+SCHEMA_VERSION = 3
+# Kind of the question/answer turn a message belongs to. Only CHAT_KIND turns are
+# part of a session's conversation memory (and of its rolling summary); PDF Q&A,
+# "what was my Nth question" replies and interrupted answers are stored with other
+# kinds so rehydrating a session never shifts its turn count.
+CHAT_KIND = "chat"
+
+# SQL is kept in constants so every pooled connection reuses its compiled
+# statement from sqlite3's per-connection statement cache.
+CREATE_CHATS_SQL = """
+    CREATE TABLE IF NOT EXISTS chats (
+        session_id TEXT,
+        role TEXT,
+        content TEXT,
+        kind TEXT NOT NULL DEFAULT 'chat'
+    )
+"""
+ADD_KIND_COLUMN_SQL = "ALTER TABLE chats ADD COLUMN kind TEXT NOT NULL DEFAULT 'chat'"
+CREATE_CHATS_INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_chats_session_id ON chats (session_id)"
+# One row per session, kept up to date on every save so the sidebar never scans chats.
+# last_message_id is the chats rowid of the newest message: it orders sessions by
+# recent activity and is the keyset cursor for pagination. summary is the rolling
+# summary of the session's first summary_turns question/answer turns.
+CREATE_SESSIONS_SQL = """
+    CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        message_count INTEGER NOT NULL DEFAULT 0,
+        preview TEXT,
+        last_message_id INTEGER NOT NULL,
+        summary TEXT,
+        summary_turns INTEGER NOT NULL DEFAULT 0
+    )
+"""
+ADD_SUMMARY_COLUMNS_SQL = (
+    "ALTER TABLE sessions ADD COLUMN summary TEXT",
+    "ALTER TABLE sessions ADD COLUMN summary_turns INTEGER NOT NULL DEFAULT 0",
+)
+CREATE_SESSIONS_INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_sessions_last_message_id ON sessions (last_message_id)"
+BACKFILL_SESSIONS_SQL = """
+    INSERT OR IGNORE INTO sessions (session_id, created_at, updated_at, message_count, preview, last_message_id)
+    SELECT c.session_id, :now, :now, COUNT(*),
+           (SELECT p.content FROM chats p WHERE p.session_id = c.session_id AND p.role = 'user'
+            ORDER BY p.rowid LIMIT 1),
+           MAX(c.rowid)
+    FROM chats c
+    GROUP BY c.session_id
+"""
+INSERT_MESSAGE_SQL = "INSERT INTO chats (session_id, role, content, kind) VALUES (?, ?, ?, ?)"
+UPSERT_SESSION_SQL = """
+    INSERT INTO sessions (session_id, created_at, updated_at, message_count, preview, last_message_id)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (session_id) DO UPDATE SET
+        updated_at = excluded.updated_at,
+        message_count = sessions.message_count + excluded.message_count,
+        preview = COALESCE(sessions.preview, excluded.preview),
+        last_message_id = excluded.last_message_id
+"""
+LOAD_CHAT_SQL = "SELECT role, content FROM chats WHERE session_id = ? ORDER BY rowid"
+LOAD_CHAT_KIND_SQL = "SELECT role, content FROM chats WHERE session_id = ? AND kind = ? ORDER BY rowid"
+LIST_SESSIONS_SQL = """
+    SELECT session_id, created_at, updated_at, message_count, preview, last_message_id
+    FROM sessions
+    WHERE last_message_id < ?
+    ORDER BY last_message_id DESC
+    LIMIT ?
+"""
+ALL_SESSIONS_SQL = "SELECT session_id FROM sessions ORDER BY last_message_id DESC"
+SESSION_PREVIEW_SQL = "SELECT preview FROM sessions WHERE session_id = ?"
+LOAD_SUMMARY_SQL = "SELECT summary, summary_turns FROM sessions WHERE session_id = ?"
+# Never replace a summary with one covering fewer turns (summaries are written from a background thread)
+SAVE_SUMMARY_SQL = "UPDATE sessions SET summary = ?, summary_turns = ? WHERE session_id = ? AND summary_turns < ?"
+DELETE_CHAT_SQL = "DELETE FROM chats WHERE session_id = ?"
+DELETE_SESSION_SQL = "DELETE FROM sessions WHERE session_id = ?"
+
+# --- Connection pool ---
+class ConnectionPool:
+    """Thread-safe pool of WAL-mode SQLite connections."""
+
+    def __init__(self, db_file: str, size: int = POOL_SIZE):
+        self.db_file = db_file
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False, cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.db_file != DB_FILE:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(DB_FILE)
+        return _pool
+
+@contextmanager
+def transaction():
+    """Pooled connection that commits on success and rolls back on error."""
+    with get_pool().connection() as conn:
+        with conn:
+            yield conn
 
 # --- Initialize the DB ---
+@traced("db.init")
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS chats (
-            session_id TEXT,
-            role TEXT,
-            content TEXT
-        )
-    """)
-    conn.commit()
-    conn.close()
+    with transaction() as conn:
+        conn.execute(CREATE_CHATS_SQL)
+        conn.execute(CREATE_CHATS_INDEX_SQL)
+        conn.execute(CREATE_SESSIONS_SQL)
+        conn.execute(CREATE_SESSIONS_INDEX_SQL)
+        migrate(conn)
+
+def migrate(conn: sqlite3.Connection):
+    """Bring an existing database up to SCHEMA_VERSION (tracked in PRAGMA user_version)."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version < 1:
+        # v1: populate the sessions table from existing chats
+        conn.execute(BACKFILL_SESSIONS_SQL, {"now": time.time()})
+    if version < 2:
+        # v2: rolling history summary per session (already present if the table was just created)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+        if "summary" not in columns:
+            for statement in ADD_SUMMARY_COLUMNS_SQL:
+                conn.execute(statement)
+    if version < 3:
+        # v3: turn kind per message; older rows can't be told apart and count as chat turns
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(chats)")}
+        if "kind" not in columns:
+            conn.execute(ADD_KIND_COLUMN_SQL)
+    if version < SCHEMA_VERSION:
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+def _record_messages(conn: sqlite3.Connection, session_id: str, messages: List[Tuple[str, str]],
+                     kind: str = CHAT_KIND):
+    """Insert messages and update the session row, inside the caller's transaction."""
+    if not messages:
+        return
+    last_id = None
+    for role, content in messages:
+        last_id = conn.execute(INSERT_MESSAGE_SQL, (session_id, role, content, kind)).lastrowid
+    preview = next((content for role, content in messages if role == "user"), None)
+    now = time.time()
+    conn.execute(UPSERT_SESSION_SQL, (session_id, now, now, len(messages), preview, last_id))
 
 # --- Save a single message ---
-def save_message(session_id: str, role: str, content: str):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("INSERT INTO chats VALUES (?, ?, ?)", (session_id, role, content))
-    conn.commit()
-    conn.close()
+@traced("db.save_message")
+def save_message(session_id: str, role: str, content: str, kind: str = CHAT_KIND):
+    with transaction() as conn:
+        _record_messages(conn, session_id, [(role, content)], kind)
+
+# --- Save several messages (e.g. a user/assistant pair) in one transaction ---
+@traced("db.save_messages")
+def save_messages(session_id: str, messages: List[Tuple[str, str]], kind: str = CHAT_KIND):
+    current_span().set(rows=len(messages))
+    with transaction() as conn:
+        _record_messages(conn, session_id, messages, kind)
 
 # --- Load all messages for a session ---
-def load_chat(session_id: str) -> List[Dict[str, str]]:
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT role, content FROM chats WHERE session_id = ?", (session_id,))
-    rows = c.fetchall()
-    conn.close()
+@traced("db.load_chat")
+def load_chat(session_id: str, kind: Optional[str] = None) -> List[Dict[str, str]]:
+    """All messages of the session, or only those of one turn kind"""
+    with get_pool().connection() as conn:
+        if kind is None:
+            rows = conn.execute(LOAD_CHAT_SQL, (session_id,)).fetchall()
+        else:
+            rows = conn.execute(LOAD_CHAT_KIND_SQL, (session_id, kind)).fetchall()
+    current_span().set(rows=len(rows))
     return [{"role": role, "content": content} for role, content in rows]
 
+# --- Rolling history summary of a session ---
+def load_summary(session_id: str) -> Tuple[str, int]:
+    """(summary, number of turns it covers); ("", 0) for a session without one"""
+    with get_pool().connection() as conn:
+        row = conn.execute(LOAD_SUMMARY_SQL, (session_id,)).fetchone()
+    return (row[0] or "", row[1]) if row else ("", 0)
+
+@traced("db.save_summary")
+def save_summary(session_id: str, summary: str, summary_turns: int) -> bool:
+    """Store the summary unless the session is unknown or already has a newer one"""
+    with transaction() as conn:
+        updated = conn.execute(SAVE_SUMMARY_SQL, (summary, summary_turns, session_id, summary_turns)).rowcount
+    return updated > 0
+
+# --- List sessions, newest activity first, one page per query ---
+@traced("db.list_sessions")
+def list_sessions(limit: int = SESSION_PAGE_SIZE, before: Optional[int] = None) -> Tuple[List[Dict], Optional[int]]:
+    """Return (sessions, next_cursor). Pass next_cursor as `before` to get the following page."""
+    cursor = before if before is not None else 2 ** 63 - 1
+    with get_pool().connection() as conn:
+        rows = conn.execute(LIST_SESSIONS_SQL, (cursor, limit + 1)).fetchall()
+    sessions = [
+        {
+            "session_id": session_id,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "message_count": message_count,
+            "preview": preview or "(no message)",
+            "last_message_id": last_message_id,
+        }
+        for session_id, created_at, updated_at, message_count, preview, last_message_id in rows[:limit]
+    ]
+    next_cursor = sessions[-1]["last_message_id"] if len(rows) > limit else None
+    return sessions, next_cursor
+
 def get_all_sessions() -> list[str]:
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT DISTINCT session_id FROM chats ORDER BY rowid DESC")
-    sessions = [row[0] for row in c.fetchall()]
-    conn.close()
-    return sessions
+    with get_pool().connection() as conn:
+        return [row[0] for row in conn.execute(ALL_SESSIONS_SQL)]
 
 def get_session_preview(session_id: str, limit=1) -> str:
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    c.execute("SELECT content FROM chats WHERE session_id = ? AND role = 'user' LIMIT ?", (session_id, limit))
-    row = c.fetchone()
-    conn.close()
-    return row[0] if row else "(no message)"
+    with get_pool().connection() as conn:
+        row = conn.execute(SESSION_PREVIEW_SQL, (session_id,)).fetchone()
+    return row[0] if row and row[0] else "(no message)"
 
+@traced("db.delete_chat")
 def delete_chat(session_id: str) -> bool:
     """Delete all messages for a specific chat session"""
     try:
-        conn = sqlite3.connect(DB_FILE)
-        c = conn.cursor()
-        c.execute("DELETE FROM chats WHERE session_id = ?", (session_id,))
-        conn.commit()
-        conn.close()
+        with transaction() as conn:
+            conn.execute(DELETE_CHAT_SQL, (session_id,))
+            conn.execute(DELETE_SESSION_SQL, (session_id,))
         return True
     except Exception as e:
         print(f"Error deleting chat: {e}")
-        return False
\ No newline at end of file
+        current_span().record_error(e)
+        return False
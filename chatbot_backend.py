@@ -1,53 +1,151 @@
 import openai
 import re
-import requests
+import threading
+import time
+import numpy as np
 from bs4 import BeautifulSoup
-from config import embed_model, index
-
-course_catalog_urls = [
-    "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/advanced-intelligent-manufacturing-ms/#programrequirementstext",
-    "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/data-analytics-engineering-ms/#programrequirementstext",
-    "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/data-analytics-engineering-online-ms/#programrequirementstext",
-    "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/human-factors-mshf/#programrequirementstext",
-    "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/robotics-ms/#programrequirementstext",
-    "https://catalog.northeastern.edu/graduate/engineering/electrical-computer/semiconductor-engineering-ms/#programrequirementstext",
-    "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/industrial-engineering-msie/#programrequirementstext",
-    "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/engineering-management-msem/#programrequirementstext",
-    "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/energy-systems-msenes/#programrequirementstext",
-    "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/energy-systems-msenes-academic-link-program/#programrequirementstext",
-    "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/mechanical-engineering-concentration-general-msme/#programrequirementstext",
-    "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/mechanical-engineering-concentration-mechanics-design-msme/#programrequirementstext",
-    "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/mechanical-engineering-concentration-material-science-msme/#programrequirementstext",
-    "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/mechanical-engineering-concentration-mechatronics-msme/#programrequirementstext",
-    "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/mechanical-engineering-concentration-thermofluids-msme/#programrequirementstext",
-    "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/operations-research-msor/#programrequirementstext"
+from config import (
+    get_embed_model, get_index, CATALOG_REFRESH_INTERVAL, CATALOG_ROUTER_MARGIN,
+    CATALOG_SECTIONS_ENABLED, CATALOG_SECTION_TOKENS, CATALOG_TOP_SECTIONS, CATALOG_CONTEXT_TOKENS,
+    SPECULATIVE_RETRIEVAL, SPECULATION_SIMILARITY,
+    ANSWER_CACHE_ENABLED, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL, ANSWER_CACHE_SIZE,
+    SKIP_OPTIMIZER_FOR_STANDALONE, STANDALONE_MIN_SIMILARITY,
+    URL_VERIFY_DEADLINE, URL_VERIFY_TTL, URL_VERIFY_NEGATIVE_TTL, OPTIMIZER_HISTORY_TOKENS,
+    SESSION_MEMORY_TURNS, SESSION_MEMORY_SESSIONS, SESSION_MEMORY_TTL,
+    HISTORY_SUMMARY_ENABLED, HISTORY_RECENT_TURNS, HISTORY_SUMMARY_BATCH, HISTORY_SUMMARY_TOKENS,
+    PROMPT_HISTORY_TOKENS
+)
+from catalog_cache import CatalogCache
+from catalog_sections import SectionIndex, extract_sections, iter_blocks, table_lines
+from chat_db import CHAT_KIND, load_chat, load_summary, save_summary
+from course_index import COURSE_CODE_PATTERN, CourseIndex, parse_course_records
+from history_summary import HistoryCompactor
+from catalog_router import CatalogRouter
+from answer_cache import SemanticAnswerCache, context_fingerprint
+from llm_stream import stream_chat_completion, stream_with_fallback, INTERRUPTED_NOTE
+from pipeline import StageRunner
+from prompt_budget import count_tokens, fit_prompt
+from session_memory import SessionMemory
+from tracing import current_span, metrics, record_usage, span, trace_stream, traced
+from url_verifier import UrlVerifier
+
+# Catalog programs: name and description are used by the catalog router and the LLM fallback prompt
+course_catalog_programs = [
+    {
+        "name": "Advanced Intelligent Manufacturing MS (AI Manufacturing)",
+        "description": "Smart and intelligent manufacturing, Industry 4.0, additive manufacturing, automation, AI and machine learning for production systems.",
+        "url": "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/advanced-intelligent-manufacturing-ms/#programrequirementstext"
+    },
+    {
+        "name": "Data Analytics Engineering MS (DAE)",
+        "description": "Data analytics engineering on campus: data mining, machine learning, statistics, databases, data visualization and big data.",
+        "url": "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/data-analytics-engineering-ms/#programrequirementstext"
+    },
+    {
+        "name": "Data Analytics Engineering Online MS",
+        "description": "Online, remote or part-time data analytics engineering degree: data mining, machine learning, statistics and databases taken online.",
+        "url": "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/data-analytics-engineering-online-ms/#programrequirementstext"
+    },
+    {
+        "name": "Human Factors MSHF",
+        "description": "Human factors and ergonomics: human-computer interaction, usability, cognitive engineering, human performance and safety.",
+        "url": "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/human-factors-mshf/#programrequirementstext"
+    },
+    {
+        "name": "Robotics MS",
+        "description": "Robotics: robot mechanics, control, perception, autonomous systems, computer vision, mobile robots and manipulators.",
+        "url": "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/robotics-ms/#programrequirementstext"
+    },
+    {
+        "name": "Semiconductor Engineering MS",
+        "description": "Semiconductor engineering: semiconductor devices, microelectronics, chip fabrication, VLSI, nanofabrication and cleanroom processing.",
+        "url": "https://catalog.northeastern.edu/graduate/engineering/electrical-computer/semiconductor-engineering-ms/#programrequirementstext"
+    },
+    {
+        "name": "Industrial Engineering MSIE",
+        "description": "Industrial engineering: operations, supply chain, quality control, probability and statistics, simulation, facilities and systems optimization.",
+        "url": "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/industrial-engineering-msie/#programrequirementstext"
+    },
+    {
+        "name": "Engineering Management MSEM",
+        "description": "Engineering management: project management, engineering economy, leadership, financial management and managing technical organizations.",
+        "url": "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/engineering-management-msem/#programrequirementstext"
+    },
+    {
+        "name": "Energy Systems MSENES",
+        "description": "Energy systems: renewable and sustainable energy, power generation, energy conversion, energy policy and economics.",
+        "url": "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/energy-systems-msenes/#programrequirementstext"
+    },
+    {
+        "name": "Energy Systems MSENES Academic Link",
+        "description": "Energy systems academic link program: accelerated energy systems master's degree for students from partner universities.",
+        "url": "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/energy-systems-msenes-academic-link-program/#programrequirementstext"
+    },
+    {
+        "name": "Mechanical Engineering (General) MSME",
+        "description": "Mechanical engineering general concentration: broad mechanical engineering master's with flexible electives across all areas.",
+        "url": "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/mechanical-engineering-concentration-general-msme/#programrequirementstext"
+    },
+    {
+        "name": "Mechanical Engineering (Mechanics Design) MSME",
+        "description": "Mechanical engineering mechanics and design concentration: solid mechanics, finite element analysis, vibrations and mechanical design.",
+        "url": "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/mechanical-engineering-concentration-mechanics-design-msme/#programrequirementstext"
+    },
+    {
+        "name": "Mechanical Engineering (Material Science) MSME",
+        "description": "Mechanical engineering materials science concentration: materials, metallurgy, polymers, composites and nanomaterials.",
+        "url": "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/mechanical-engineering-concentration-material-science-msme/#programrequirementstext"
+    },
+    {
+        "name": "Mechanical Engineering (Mechatronics) MSME",
+        "description": "Mechanical engineering mechatronics concentration: embedded systems, sensors and actuators, control systems and electromechanical design.",
+        "url": "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/mechanical-engineering-concentration-mechatronics-msme/#programrequirementstext"
+    },
+    {
+        "name": "Mechanical Engineering (Thermofluids) MSME",
+        "description": "Mechanical engineering thermofluids concentration: thermodynamics, fluid mechanics, heat transfer and computational fluid dynamics.",
+        "url": "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/mechanical-engineering-concentration-thermofluids-msme/#programrequirementstext"
+    },
+    {
+        "name": "Operations Research MSOR",
+        "description": "Operations research: optimization, linear and integer programming, stochastic models, decision analysis and analytics.",
+        "url": "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/operations-research-msor/#programrequirementstext"
+    }
 ]
 
-# In-memory session memory (stores question-answer pairs)
-session_memory = []
+course_catalog_urls = [program["url"] for program in course_catalog_programs]
+
+# "What was my Nth question": answered from session memory, not a turn of the conversation itself
+PREVIOUS_QUESTION_PATTERN = re.compile(r"what was my (\w+)[\s-]*question", re.IGNORECASE)
+
+def chat_turn_kind(user_query):
+    """chat_db kind for a chatbot-mode turn: only CHAT_KIND turns are kept in session memory"""
+    return "meta" if PREVIOUS_QUESTION_PATTERN.search(user_query) else CHAT_KIND
+
+def load_chat_turns(session_id):
+    """The session's stored chat turns, without PDF Q&A or meta replies"""
+    return load_chat(session_id, kind=CHAT_KIND)
 
-def estimate_max_tokens(query, context, base_tokens=150, max_limit=500):
-    context_text = "\n".join(context)
-    extra_tokens = len(context_text) // 4
-    return min(base_tokens + extra_tokens, max_limit)
+# Question-answer pairs per chat session (bounded; evicted sessions are reloaded from chat_db)
+session_memory = SessionMemory(
+    max_turns=SESSION_MEMORY_TURNS, max_sessions=SESSION_MEMORY_SESSIONS, ttl=SESSION_MEMORY_TTL,
+    loader=load_chat_turns, summary_loader=load_summary
+)
+# Used by callers that don't pass a session_id (scripts, benchmarks)
+DEFAULT_SESSION_ID = "default"
 
 # ---------------- URL Helpers ----------------
 
 def extract_urls(text):
     return re.findall(r'https?://\S+', text)
 
+# Shared, pooled and cached link checker for fallback answers
+url_verifier = UrlVerifier(
+    ttl=URL_VERIFY_TTL, negative_ttl=URL_VERIFY_NEGATIVE_TTL, deadline=URL_VERIFY_DEADLINE
+)
+
 def verify_urls(url_list):
-    valid_urls, invalid_urls = [], []
-    for url in url_list:
-        try:
-            r = requests.head(url, allow_redirects=True, timeout=5)
-            if r.status_code == 200:
-                valid_urls.append(url)
-            else:
-                invalid_urls.append((url, r.status_code))
-        except Exception as e:
-            invalid_urls.append((url, str(e)))
-    return valid_urls, invalid_urls
+    return url_verifier.verify(url_list)
 
 def verify_urls_in_text(text):
     urls = extract_urls(text)
@@ -74,30 +172,51 @@ def is_course_related_query(query):
     # Check if any course keyword is in the query
     return any(keyword in query_lower for keyword in course_keywords)
 
+_catalog_router = None
+_catalog_router_lock = threading.Lock()
+
+def get_catalog_router():
+    """Build the embedding router on first use (encodes the program descriptions once)"""
+    global _catalog_router
+    if _catalog_router is None:
+        with _catalog_router_lock:
+            if _catalog_router is None:
+                _catalog_router = CatalogRouter(get_embed_model(), course_catalog_programs)
+    return _catalog_router
+
+@traced("router")
 def course_catalog_agent(query):
     """Agent that selects the appropriate course catalog URL based on the query."""
+    try:
+        url, score, margin = get_catalog_router().route(query)
+    except Exception as e:
+        print(f"Catalog router error: {e}")
+        current_span().record_error(e)
+        return llm_course_catalog_agent(query)
+
+    current_span().set(score=round(float(score), 4), margin=round(float(margin), 4))
+    if margin >= CATALOG_ROUTER_MARGIN:
+        return url
+
+    # Ambiguous between the top programs: let the LLM decide, keeping the router's pick as default
+    print(f"[COURSE] 🤔 Low router margin ({margin:.3f}), asking LLM")
+    return llm_course_catalog_agent(query, default_url=url)
+
+@traced("router.llm")
+def llm_course_catalog_agent(query, default_url=None):
+    """Ask the LLM to select the catalog URL; always returns one of course_catalog_urls."""
+    default_url = default_url or course_catalog_urls[0]
+    program_list = "\n".join(
+        f"    {i}. {program['name']}: {program['url']}"
+        for i, program in enumerate(course_catalog_programs, 1)
+    )
     prompt = f"""
     Based on the following user query about Northeastern University courses or programs, select the MOST RELEVANT URL from the list:
     
     User Query: "{query}"
     
     Available catalog URLs:
-    1. Advanced Intelligent Manufacturing MS (AI Manufacturing): https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/advanced-intelligent-manufacturing-ms/#programrequirementstext
-    2. Data Analytics Engineering MS (DAE): https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/data-analytics-engineering-ms/#programrequirementstext
-    3. Data Analytics Engineering Online MS: https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/data-analytics-engineering-online-ms/#programrequirementstext
-    4. Human Factors MSHF: https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/human-factors-mshf/#programrequirementstext
-    5. Robotics MS: https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/robotics-ms/#programrequirementstext
-    6. Semiconductor Engineering MS: https://catalog.northeastern.edu/graduate/engineering/electrical-computer/semiconductor-engineering-ms/#programrequirementstext
-    7. Industrial Engineering MSIE: https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/industrial-engineering-msie/#programrequirementstext
-    8. Engineering Management MSEM: https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/engineering-management-msem/#programrequirementstext
-    9. Energy Systems MSENES: https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/energy-systems-msenes/#programrequirementstext
-    10. Energy Systems MSENES Academic Link: https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/energy-systems-msenes-academic-link-program/#programrequirementstext
-    11. Mechanical Engineering (General) MSME: https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/mechanical-engineering-concentration-general-msme/#programrequirementstext
-    12. Mechanical Engineering (Mechanics Design) MSME: https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/mechanical-engineering-concentration-mechanics-design-msme/#programrequirementstext
-    13. Mechanical Engineering (Material Science) MSME: https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/mechanical-engineering-concentration-material-science-msme/#programrequirementstext
-    14. Mechanical Engineering (Mechatronics) MSME: https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/mechanical-engineering-concentration-mechatronics-msme/#programrequirementstext
-    15. Mechanical Engineering (Thermofluids) MSME: https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/mechanical-engineering-concentration-thermofluids-msme/#programrequirementstext
-    16. Operations Research MSOR: https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/operations-research-msor/#programrequirementstext
+{program_list}
     
     Return only the URL that's most relevant to the query, no other text.
     """
@@ -109,121 +228,241 @@ def course_catalog_agent(query):
             temperature=0.3,
             max_tokens=100
         )
-        return response["choices"][0]["message"]["content"].strip()
+        record_usage(response)
+        answer = response["choices"][0]["message"]["content"].strip()
     except Exception as e:
         print(f"Course catalog agent error: {e}")
+        current_span().record_error(e)
         # Return a default URL if there's an error
-        return course_catalog_urls[0]
+        return default_url
+
+    # The model sometimes wraps the URL in text; only accept a known catalog URL
+    for url in extract_urls(answer):
+        url = url.strip(".,)>\"'")
+        for catalog_url in course_catalog_urls:
+            if url.split("#")[0].rstrip("/") == catalog_url.split("#")[0].rstrip("/"):
+                return catalog_url
+    return default_url
     
 
 def extract_rich_text(soup):
+    """Markdown text of a catalog page, built from the same blocks as its sections (iter_blocks)"""
     content = []
 
     # Track latest heading to attach context (like "Required Courses")
     last_heading = ""
 
-    # Extract heading blocks and paragraphs
-    for tag in soup.find_all(["h1", "h2", "h3", "p", "li"]):
-        text = tag.get_text(strip=True)
-        if not text:
-            continue
-
-        if tag.name in ["h1", "h2", "h3"]:
-            last_heading = text
-            content.append(f"### {text}")
-        elif tag.name == "li":
-            content.append(f"- {text}")
+    for kind, value in iter_blocks(soup):
+        if kind == "heading":
+            last_heading = value
+            content.append(f"### {value}")
+        elif kind == "line":
+            content.append(value)
         else:
-            content.append(text)
-
-    # Extract course-related tables
-    for table in soup.find_all("table"):
-        table_rows = []
-        for tr in table.find_all("tr"):
-            cells = [td.get_text(strip=True).replace("\xa0", " ") for td in tr.find_all("td")]
-            if cells:
-                table_rows.append(cells)
-
-        # Decide structure based on number of cells
-        if table_rows:
             # Add heading if previous text was relevant
             if last_heading and any(kw in last_heading.lower() for kw in ["course", "requirement", "curriculum", "core", "elective"]):
                 content.append(f"#### {last_heading} Table")
 
-            # Markdown table for 2 or 3 columns
-            if all(len(row) == 3 for row in table_rows):
-                content.append("Course Code | Course Title | Credits")
-                content.append("--- | --- | ---")
-                for row in table_rows:
-                    content.append(" | ".join(row))
-            elif all(len(row) == 2 for row in table_rows):
-                content.append("Course Code | Course Title")
-                content.append("--- | ---")
-                for row in table_rows:
-                    content.append(" | ".join(row))
-            else:
-                # Fallback: plain bullets
-                for row in table_rows:
-                    content.append(f"- {' – '.join(row)}")
-
-    # Debug preview
-    final_text = "\n".join(content)
-    return final_text
-
-def scrape_course_catalog(url):
-    """Scrape content from the course catalog URL using rich text extraction"""
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Get program title
-        title_elem = soup.find('h1')
-        program_title = title_elem.get_text(strip=True) if title_elem else "Program Requirements"
-        
-        # Find the main content section - try multiple possible container IDs
-        content_section = None
-        for container_id in ['programrequirementstextcontainer', 'programrequirementstext']:
-            content_section = soup.find('div', {'id': container_id})
+            # Markdown table for 2 or 3 columns, plain bullets otherwise; area headers label their rows
+            for area, rows in value:
+                if area is not None:
+                    content.append(f"#### {area}")
+                if rows:
+                    content.extend(table_lines(rows))
+
+    return "\n".join(content)
+
+def parse_catalog_page(html, url):
+    """Parse a course catalog page into {title, content, url, courses, sections} using rich text extraction"""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # Get program title
+    title_elem = soup.find('h1')
+    program_title = title_elem.get_text(strip=True) if title_elem else "Program Requirements"
+
+    # Find the main content section - try multiple possible container IDs
+    content_section = None
+    for container_id in ['programrequirementstextcontainer', 'programrequirementstext']:
+        content_section = soup.find('div', {'id': container_id})
+        if content_section:
+            break
+
+    # Fallback to other common containers if specific ones not found
+    if not content_section:
+        for container_class in ['page_content', 'main-content', 'content-wrapper']:
+            content_section = soup.find('div', {'class': container_class})
             if content_section:
                 break
-        
-        # Fallback to other common containers if specific ones not found
-        if not content_section:
-            for container_class in ['page_content', 'main-content', 'content-wrapper']:
-                content_section = soup.find('div', {'class': container_class})
-                if content_section:
-                    break
-        
-        if not content_section:
-            return {
-                "title": program_title,
-                "content": f"Program: {program_title}\n\nCould not find program requirements section. Please check the URL directly.",
-                "url": url
-            }
-        
-        # Extract rich text content
-        extracted_content = extract_rich_text(content_section)
-        
-        # Format the final content
-        formatted_content = f"Program: {program_title}\n\n{extracted_content}"
-        
+
+    if not content_section:
         return {
             "title": program_title,
-            "content": formatted_content,
-            "url": url
+            "content": f"Program: {program_title}\n\nCould not find program requirements section. Please check the URL directly.",
+            "url": url,
+            "courses": [],
+            "sections": []
         }
+
+    # Extract rich text content
+    extracted_content = extract_rich_text(content_section)
+
+    # Format the final content
+    formatted_content = f"Program: {program_title}\n\n{extracted_content}"
+
+    return {
+        "title": program_title,
+        "content": formatted_content,
+        "url": url,
+        "courses": parse_course_records(content_section, program_title),
+        "sections": extract_sections(content_section, CATALOG_SECTION_TOKENS)
+    }
+
+# Bumped whenever parse_catalog_page extracts something new (2: course records, 3: sections)
+CATALOG_PARSE_VERSION = 3
+
+# Parsed catalog pages, cached in memory and on disk
+catalog_cache = CatalogCache(parse_catalog_page, version=CATALOG_PARSE_VERSION)
+
+def warm_catalog_cache():
+    """Prefetch every catalog page in the background and keep them refreshed"""
+    return catalog_cache.start_refresher(course_catalog_urls, CATALOG_REFRESH_INTERVAL)
+
+@traced("catalog.scrape")
+def scrape_course_catalog(url):
+    """Scrape content from the course catalog URL, served from the catalog cache when possible"""
+    try:
+        return catalog_cache.get(url)
     except Exception as e:
         print(f"Scraping error for {url}: {e}")
+        current_span().record_error(e)
         return {
             "title": "Error",
             "content": f"Failed to scrape content from {url}. Error: {str(e)}",
             "url": url
         }
 
+# ---------------- Catalog Sections ----------------
+
+# Section embeddings per catalog page, recomputed only when a page's sections change
+section_index = SectionIndex(get_embed_model)
+catalog_cache.on_change.append(section_index.invalidate)
+
+@traced("catalog.sections")
+def catalog_page_content(query, scraped_data):
+    """The page sections closest to the query within CATALOG_CONTEXT_TOKENS, or the whole page content"""
+    sections = scraped_data.get("sections")
+    if not CATALOG_SECTIONS_ENABLED or not sections:
+        return scraped_data["content"]
+    # The page is already chosen, so the words naming its program don't tell its sections apart
+    title_words = set(re.findall(r"\w+", scraped_data["title"].lower()))
+    focus = " ".join(w for w in re.findall(r"\w+", query) if w.lower() not in title_words) or query
+    try:
+        selected = section_index.select(
+            focus, scraped_data["url"], sections, CATALOG_CONTEXT_TOKENS, top_k=CATALOG_TOP_SECTIONS
+        )
+    except Exception as e:
+        print(f"Catalog section selection error: {e}")
+        current_span().record_error(e)
+        return scraped_data["content"]
+    if not selected:
+        return scraped_data["content"]
+    current_span().set(sections=len(sections), selected=len(selected))
+    print(f"[SECTIONS] 🧩 Sending {len(selected)} of {len(sections)} sections: "
+          f"{', '.join(s['heading'] or 'intro' for s in selected)}")
+    return f"Program: {scraped_data['title']}\n\n" + "\n\n".join(s["text"] for s in selected)
+
+# ---------------- Course Index ----------------
+
+# Course records from every cached catalog page, for answering course lookups without the full page
+course_index = CourseIndex()
+
+# Questions about a course code that the index answers on its own. The whole question must be one of
+# these forms ("how many credits is IE 6200?", "what is IE 6200 called?"); anything else, even one
+# mentioning credits ("can I take IE 6200 for credit in MSOR?"), goes to the LLM with the records as context
+_CODE = r"[a-z]{2,5}[\s\-]?\d{4}"
+DIRECT_LOOKUP_PATTERN = re.compile(
+    rf"\s*(?:"
+    rf"how many (?:credits|credit hours|semester hours|hours) (?:is|are|does|for) {_CODE}"
+    rf"(?: (?:have|carry|give|worth|count for))?"
+    rf"|what(?: is|'s) {_CODE}(?: called)?"
+    rf"|what(?: is|'s) the (?:title|name|course title|course name|credit count|number of credits) (?:of|for) {_CODE}"
+    rf"|(?:which|what) programs? (?:list|lists|include|includes|offer|offers|have|has|require|requires) {_CODE}"
+    rf"|{_CODE}"
+    rf")\s*\??\s*",
+    re.IGNORECASE
+)
+# "Which courses cover machine learning?": keyword search over course titles
+TOPIC_QUERY_PATTERN = re.compile(
+    r"\b(which|what|any)\s+(courses?|classes)\b.*?\b(about|on|cover|covers|covering|teach|teaches|"
+    r"related to|involve|involving|deal with)\s+(?P<topic>.+)",
+    re.IGNORECASE
+)
+# Topics naming a program are program questions, answered from the program page instead
+PROGRAM_TOPIC_PATTERN = re.compile(r"\b(programs?|degrees?|concentrations?|ms[a-z]{0,5})\b", re.IGNORECASE)
+
+def sync_course_index():
+    """Index the course records of every catalog page already in the cache (never fetches)"""
+    return course_index.sync((url, catalog_cache.peek(url)) for url in course_catalog_urls)
+
+def format_course_record(record):
+    credits = f" | {record['credits']} credits" if record["credits"] else ""
+    return f"{record['code']} | {record['title']}{credits} | {record['program']} — {record['section'] or 'Program Requirements'}"
+
+def format_course_answer(code, listings):
+    """Markdown answer for a course code from its catalog listings"""
+    title = next((record["title"] for record in listings if record["title"]), "")
+    credits = sorted({record["credits"] for record in listings if record["credits"]})
+    header = f"**{code}{' – ' + title if title else ''}**"
+    if len(credits) == 1:
+        header += f" is {credits[0]} credit{'' if credits[0] == '1' else 's'}."
+    lines = [header, "", "Listed in the catalog under:"]
+    for record in listings:
+        per_listing = f" ({record['credits']} credits)" if len(credits) > 1 and record["credits"] else ""
+        lines.append(f"- [{record['program']}]({record['url']}) — {record['section'] or 'Program Requirements'}{per_listing}")
+    return "\n".join(lines)
+
+@traced("course_index")
+def lookup_course_index(query):
+    """Answer a course lookup from the course index.
+
+    Returns None when the index can't help, otherwise a dict with either
+    "answer" (a complete answer, no LLM needed) or "context_docs" (the few
+    matching course records, as a small context for the RAG agent), plus
+    the "sources" URLs.
+    """
+    has_code = bool(COURSE_CODE_PATTERN.search(query))
+    topic = TOPIC_QUERY_PATTERN.search(query)
+    if topic and PROGRAM_TOPIC_PATTERN.search(topic.group("topic")):
+        topic = None
+    if not (has_code or topic):
+        return None
+    sync_course_index()
+
+    codes = course_index.codes_in(query) if has_code else []
+    if codes:
+        listings = {code: course_index.by_code(code) for code in codes}
+        sources = list(dict.fromkeys(record["url"] for records in listings.values() for record in records))
+        if len(codes) == 1 and DIRECT_LOOKUP_PATTERN.fullmatch(query):
+            current_span().set(result="answer", records=len(listings[codes[0]]))
+            return {"answer": format_course_answer(codes[0], listings[codes[0]]), "sources": sources}
+        records = [record for code in codes for record in listings[code]]
+    elif topic:
+        records = course_index.search(topic.group("topic"))
+        sources = list(dict.fromkeys(record["url"] for record in records))
+    else:
+        records = []
+    if not records:
+        current_span().set(result="miss")
+        return None
+
+    current_span().set(result="context", records=len(records))
+    context = "Course catalog listings (code | title | credits | program — requirement section):\n"
+    context += "\n".join(format_course_record(record) for record in records)
+    return {"context_docs": [context + "\n\nSources: " + ", ".join(sources)], "sources": sources}
+
 # ---------------- GPT Agents ----------------
 
+@traced("fallback")
 def fallback_scraper_agent(query):
     prompt = f"""
 Search the web for detailed information about: '{query}' in the context of Northeastern University. Provide a concise summary.
@@ -236,15 +475,15 @@ Also provide a helpful link.
             temperature=0.7,
             max_tokens=200
         )
+        record_usage(response)
         raw = response["choices"][0]["message"]["content"].strip()
         return verify_urls_in_text(raw)
     except Exception as e:
         print("Fallback scraper error:", e)
+        current_span().record_error(e)
         return ""
 
-def query_optimizer_agent(query, chat_history=None):
-    history_block = "\n".join([f"Previous Q: {turn['question']}" for turn in chat_history[-5:]]) if chat_history else ""
-    prompt = f"""
+OPTIMIZER_INSTRUCTIONS = """
 You are an intelligent assistant specializing in queries related to Northeastern University.
 {history_block}
 
@@ -253,64 +492,153 @@ in case the query is a follow-up question of the previous query. If the question
 previous context. If it's related to a different topic, do not use previous context.:
 "{query}"
 """
+
+@traced("optimizer")
+def query_optimizer_agent(query, chat_history=None):
+    previous = [f"Previous Q: {turn['question']}" for turn in chat_history[-5:]] if chat_history else []
+    budget = fit_prompt(
+        query, history=previous, fixed_text=OPTIMIZER_INSTRUCTIONS,
+        history_budget=OPTIMIZER_HISTORY_TOKENS, context_budget=0, answer_tokens=60, base_answer_tokens=60
+    )
+    prompt = OPTIMIZER_INSTRUCTIONS.format(history_block="\n".join(budget["history"]), query=budget["question"])
     try:
         response = openai.ChatCompletion.create(
             model="gpt-4",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.5,
-            max_tokens=60
+            max_tokens=budget["max_tokens"]
         )
+        record_usage(response)
         return response["choices"][0]["message"]["content"].strip()
     except Exception as e:
         print("Query optimizer error:", e)
+        current_span().record_error(e)
         return query
 
+HISTORY_SUMMARY_INSTRUCTIONS = """
+You maintain a running summary of a conversation between a student and the Northeastern University MIE assistant.
+Existing summary:
+{summary}
+
+New turns to fold in:
+{turns}
+
+Write the updated summary in at most 120 words. Keep the programs, courses, requirements, deadlines and links
+the student asked about, and any preferences or facts about the student. Drop greetings and repeated details.
+"""
+
+@traced("history.summarize")
+def summarize_history_agent(summary, turns):
+    """Fold `turns` (question/answer dicts) into `summary`; None on error so the turns are retried later"""
+    formatted = [f"User: {turn['question']}\nAssistant: {turn['answer']}" for turn in turns]
+    budget = fit_prompt(
+        "", context=formatted, fixed_text=HISTORY_SUMMARY_INSTRUCTIONS + (summary or ""), history_budget=0,
+        answer_tokens=HISTORY_SUMMARY_TOKENS, base_answer_tokens=HISTORY_SUMMARY_TOKENS
+    )
+    prompt = HISTORY_SUMMARY_INSTRUCTIONS.format(summary=summary or "(none)", turns="\n\n".join(budget["context"]))
+    current_span().set(turns=len(turns))
+    try:
+        response = openai.ChatCompletion.create(
+            model="gpt-4",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.2,
+            max_tokens=budget["max_tokens"]
+        )
+        record_usage(response)
+        return response["choices"][0]["message"]["content"].strip() or None
+    except Exception as e:
+        print("History summary error:", e)
+        current_span().record_error(e)
+        return None
+
+@traced("retrieve")
 def retrieve_context(query, top_k=3, threshold=0.7):
-    query_embedding = embed_model.encode(query).tolist()
-    result = index.query(vector=query_embedding, top_k=top_k, include_metadata=True)
+    with span("embed"):
+        query_embedding = get_embed_model().encode(query).tolist()
+    with span("vector.query", top_k=top_k):
+        result = get_index().query(vector=query_embedding, top_k=top_k, include_metadata=True)
     context = []
     if result and "matches" in result:
         for match in result["matches"]:
             if match.get("score", 0) >= threshold:
                 context.append(match["metadata"].get("combined_text", ""))
+    current_span().set(docs=len(context))
     return context
 
-def rag_agent(query, context, chat_history=""):
-    if not context or all(not c.strip() for c in context):
-        return ("I'm sorry, I don't have sufficient information about this topic. "
-                "Please visit [FAQs](https://northeastern.edu/faqs) or contact [support@northeastern.edu](mailto:support@northeastern.edu).")
-
-    context_text = "\n\n".join(context)
+NO_CONTEXT_RESPONSE = ("I'm sorry, I don't have sufficient information about this topic. "
+                       "Please visit [FAQs](https://northeastern.edu/faqs) or contact [support@northeastern.edu](mailto:support@northeastern.edu).")
+RAG_ERROR_RESPONSE = "I'm sorry, I couldn't generate a response. Please contact support."
+
+RAG_SYSTEM_PROMPT = "You are a helpful assistant for Northeastern University."
+RAG_INSTRUCTIONS = (
+    "Please provide a clear, concise and helpful answer about Northeastern University. "
+    "Keep in context the chat history as well when answering questions. "
+    "Format your answer in Markdown with headings and bullet points when needed. "
+    "Include valid links when applicable. If no valid context, say so. "
+    "If the answer includes links, add: "
+    "'If the above link doesn't work or you need updated info, visit the official [Northeastern program page](https://graduate.northeastern.edu/programs/) or use the [search function](https://www.northeastern.edu/search/)'."
+)
+
+def build_rag_request(query, context, chat_history=(), summary=""):
+    """Chat completion arguments for the RAG answer, trimmed to the prompt budgets.
+
+    chat_history is a list of formatted turns (oldest first); a preformatted
+    string is treated as a single turn. The rolling summary of older turns
+    is never trimmed: it is sent first and its tokens come out of the
+    history budget, so the newest verbatim turns fill what is left.
+    """
+    turns = [chat_history] if isinstance(chat_history, str) else list(chat_history)
+    summary_text = f"Summary of earlier conversation: {summary}" if summary else ""
+    budget = fit_prompt(
+        query, context=context, history=[t for t in turns if t],
+        fixed_text=RAG_SYSTEM_PROMPT + "Chat History:\n\nContext:\n\nQuestion: \n\n" + RAG_INSTRUCTIONS + summary_text,
+        history_budget=max(0, PROMPT_HISTORY_TOKENS - count_tokens(summary_text))
+    )
+    history_text = "\n".join(([summary_text] if summary_text else []) + budget["history"])
+    context_text = "\n\n".join(budget["context"])
     prompt = (
-        f"Chat History:\n{chat_history}\n\n"
+        f"Chat History:\n{history_text}\n\n"
         f"Context:\n{context_text}\n\n"
-        f"Question: {query}\n\n"
-        "Please provide a clear, concise and helpful answer about Northeastern University. "
-        "Keep in context the chat history as well when answering questions. "
-        "Format your answer in Markdown with headings and bullet points when needed. "
-        "Include valid links when applicable. If no valid context, say so. "
-        "If the answer includes links, add: "
-        "'If the above link doesn't work or you need updated info, visit the official [Northeastern program page](https://graduate.northeastern.edu/programs/) or use the [search function](https://www.northeastern.edu/search/)'."
+        f"Question: {budget['question']}\n\n"
+        + RAG_INSTRUCTIONS
     )
+    return {
+        "model": "gpt-4",
+        "messages": [
+            {"role": "system", "content": RAG_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.7,
+        "max_tokens": budget["max_tokens"]
+    }
+
+@traced("rag")
+def rag_agent(query, context, chat_history=(), summary=""):
+    if not context or all(not c.strip() for c in context):
+        return NO_CONTEXT_RESPONSE
 
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant for Northeastern University."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=estimate_max_tokens(query, context)
-        )
+        response = openai.ChatCompletion.create(**build_rag_request(query, context, chat_history, summary))
+        record_usage(response)
         return response["choices"][0]["message"]["content"].strip()
     except Exception as e:
         print("RAG error:", e)
-        return "I'm sorry, I couldn't generate a response. Please contact support."
+        current_span().record_error(e)
+        return RAG_ERROR_RESPONSE
+
+def rag_agent_stream(query, context, chat_history=(), summary=""):
+    """Streaming variant of rag_agent: yields answer tokens as the model produces them"""
+    if not context or all(not c.strip() for c in context):
+        yield NO_CONTEXT_RESPONSE
+        return
+
+    yield from stream_with_fallback(
+        stream_chat_completion(**build_rag_request(query, context, chat_history, summary)), RAG_ERROR_RESPONSE, "RAG"
+    )
 
 # ---------------- Memory Retrieval ----------------
 
-def get_question_by_index(ordinal: str) -> str:
+def get_question_by_index(ordinal: str, session_id: str = DEFAULT_SESSION_ID) -> str:
     ordinal_map = {
         "first": 1, "1st": 1,
         "second": 2, "2nd": 2,
@@ -322,25 +650,181 @@ def get_question_by_index(ordinal: str) -> str:
         index_num = int(ordinal) if ordinal.isdigit() else ordinal_map.get(ordinal.lower(), 1)
     except Exception:
         index_num = 1
-    if 1 <= index_num <= len(session_memory):
-        return session_memory[index_num - 1]["question"]
+    question = session_memory.question(session_id, index_num)
+    if question is not None:
+        return question
     else:
         return "No such question found in this session."
 
-# ---------------- Main Chat Function ----------------
+# ---------------- History Compaction ----------------
+
+history_compactor = HistoryCompactor(
+    session_memory, summarize_history_agent, store=save_summary,
+    keep_recent=HISTORY_RECENT_TURNS, batch=HISTORY_SUMMARY_BATCH
+) if HISTORY_SUMMARY_ENABLED else None
+
+def compact_history(session_id):
+    """Start folding the session's older turns into its summary, without waiting for it"""
+    if history_compactor is not None:
+        history_compactor.schedule(session_id)
+
+# ---------------- Query Optimizer Fast Path ----------------
+
+# Words and openings that point back at earlier turns ("what about its electives?", "and the MSOR?")
+FOLLOW_UP_PATTERN = re.compile(
+    r"\b(it|its|it's|this|that|these|those|they|them|their|same|above|previous|former|latter|"
+    r"also|too|else|instead|again|more|another|other)\b"
+    r"|^\s*(and|but|or|so|then|what about|how about)\b"
+    r"|\.\.\.|…",
+    re.IGNORECASE
+)
+# Explicit entities that make a query self-contained
+ENTITY_PATTERN = re.compile(
+    r"\b(northeastern|ms(ie|em|enes|me|or|hf)|robotics|semiconductor|data analytics|human factors|"
+    r"industrial engineering|mechanical engineering|engineering management|energy systems|"
+    r"operations research|manufacturing|mechatronics|thermofluids|[a-z]{2,4}\s?\d{4})\b",
+    re.IGNORECASE
+)
+
+# Turns seen vs. optimizer LLM calls made
+optimizer_stats = {"turns": 0, "rewrites": 0}
+_optimizer_stats_lock = threading.Lock()
+
+def is_standalone_query(query, history):
+    """Decide locally whether the query can skip the LLM rewrite.
+
+    First turns have nothing to resolve. With history, a query is standalone
+    only if it has no back-references and either names an explicit entity or
+    is close to one of the catalog program descriptions.
+    """
+    if not history:
+        return True
+    if len(query.split()) < 3 or FOLLOW_UP_PATTERN.search(query):
+        return False
+    if ENTITY_PATTERN.search(query):
+        return True
+    try:
+        _, score, _ = get_catalog_router().route(query)
+    except Exception as e:
+        print(f"Standalone check error: {e}")
+        return False
+    return score >= STANDALONE_MIN_SIMILARITY
+
+def record_optimizer_call(rewritten):
+    with _optimizer_stats_lock:
+        optimizer_stats["turns"] += 1
+        optimizer_stats["rewrites"] += int(rewritten)
+
+# ---------------- Speculative Retrieval ----------------
+
+# Counters across requests: how often work started on the raw query could be reused
+speculation_stats = {"requests": 0, "hits": 0, "misses": 0, "saved_seconds": 0.0}
+_speculation_lock = threading.Lock()
+
+def is_same_query(raw_query, optimized_query):
+    """True when the optimized query is materially the same as the raw one"""
+    if " ".join(raw_query.lower().split()) == " ".join(optimized_query.lower().split()):
+        return True
+    vectors = get_embed_model().encode([raw_query, optimized_query], normalize_embeddings=True)
+    return float(np.dot(vectors[0], vectors[1])) >= SPECULATION_SIMILARITY
+
+def route_catalog_locally(query):
+    """Router-only URL choice for speculation (never calls the LLM)"""
+    try:
+        url, _, _ = get_catalog_router().route(query)
+        return url
+    except Exception as e:
+        print(f"Speculative routing error: {e}")
+        return None
+
+def fetch_catalog_speculatively(url):
+    return scrape_course_catalog(url) if url else None
+
+def record_speculation(request_stats):
+    with _speculation_lock:
+        speculation_stats["requests"] += 1
+        if request_stats["speculated"]:
+            speculation_stats["hits" if request_stats["hit"] else "misses"] += 1
+            speculation_stats["saved_seconds"] += request_stats["saved_seconds"]
+    print(f"[SPECULATION] ⚡ {request_stats['speculated'] or 'none'}: "
+          f"{'hit' if request_stats['hit'] else 'miss'}, saved {request_stats['saved_seconds']:.3f}s")
+
+def format_chat_history(history):
+    """Last 5 unsummarized rounds as text turns (build_rag_request keeps the newest that fit its budget)"""
+    return [f"User: {msg['question']}\nAssistant: {msg['answer']}" for msg in history[-5:]]
+
+def prepare_indexed_chat(user_query, indexed, history=(), summary=""):
+    """prepare_chat's result for a course lookup: the matching course records are the whole context.
+
+    Course codes make the query self-contained, so there is no optimizer
+    rewrite, routing or page fetch.
+    """
+    return {
+        "optimized_query": user_query,
+        "context_docs": indexed["context_docs"],
+        "chat_history": format_chat_history(history),
+        "history_summary": summary,
+        "sources": indexed["sources"],
+        "cacheable": True
+    }
 
-def process_chat(user_query: str, chat_history: list[str] = []) -> str:
-    print(f"\n[PROCESS_CHAT] 🔹 Received user query: {user_query}")
+@traced("chat.prepare")
+def prepare_chat(user_query: str, history=(), summary=""):
+    """Run the optimizer and retrieval stages for one turn of a session.
 
-    # Check for request for a previous question
-    match = re.search(r"what was my (\w+)[\s-]*question", user_query.lower())
-    if match:
-        return f"Your requested question: {get_question_by_index(match.group(1))}"
+    `history` holds the session's turns not yet covered by its rolling
+    `summary` (see history_summary.py).
+
+    Returns a dict with the optimized query, the context docs for the RAG
+    agent, the formatted chat history and its summary, the source URLs of the context and
+    whether an answer built from this context may be cached.
+
+    Standalone queries skip the optimizer entirely (see is_standalone_query).
+    Otherwise, while the optimizer LLM call is in flight, routing, retrieval
+    and the catalog fetch already run on the raw query. Their results are
+    reused when the optimized query leads to the same work, and discarded
+    otherwise.
+    """
+    runner = StageRunner()
+    speculated = None
+
+    if SKIP_OPTIMIZER_FOR_STANDALONE and is_standalone_query(user_query, history):
+        # Step 1 (fast path): nothing to resolve, use the query as-is
+        record_optimizer_call(False)
+        current_span().set(optimizer_skipped=True)
+        optimized_query = user_query
+        optimizer_done = time.perf_counter()
+        print("[OPTIMIZER] ⏭️ Standalone query, skipping rewrite")
+    else:
+        # Step 1: Use optimizer with the session's memory as context
+        record_optimizer_call(True)
+        runner.start("optimize", query_optimizer_agent, user_query, history)
+
+        if SPECULATIVE_RETRIEVAL:
+            if is_course_related_query(user_query):
+                speculated = "catalog"
+                runner.start("route", route_catalog_locally, user_query)
+                runner.start("catalog", fetch_catalog_speculatively, deps=["route"])
+            else:
+                speculated = "retrieve"
+                runner.start("retrieve", retrieve_context, user_query)
+
+        optimized_query = runner.result("optimize")
+        optimizer_done = time.perf_counter()
+        print(f"[OPTIMIZER] ✨ Optimized query: {optimized_query}")
+
+    request_stats = {"speculated": speculated, "hit": False, "saved_seconds": 0.0}
+    sources = []
+    cacheable = True
+
+    def reuse(name):
+        result = runner.result(name)
+        started, _ = runner.timings[name]
+        request_stats["hit"] = True
+        # Time the speculative stage already spent before the optimizer returned
+        request_stats["saved_seconds"] += max(0.0, min(runner.timings[name][1], optimizer_done) - started)
+        return result
 
-    # Step 1: Use optimizer with session memory context
-    optimized_query = query_optimizer_agent(user_query, chat_history=session_memory)
-    print(f"[OPTIMIZER] ✨ Optimized query: {optimized_query}")
-    
     # Step 2: Check if this is a course-related query
     if is_course_related_query(optimized_query):
         print("[COURSE] 📚 Detected course-related query")
@@ -349,41 +833,165 @@ def process_chat(user_query: str, chat_history: list[str] = []) -> str:
         catalog_url = course_catalog_agent(optimized_query)
         print(f"[COURSE] 🔗 Selected catalog URL: {catalog_url}")
         
-        # Scrape the content from the URL
-        scraped_data = scrape_course_catalog(catalog_url)
+        # Scrape the content from the URL (reusing the speculative fetch of the same page)
+        if speculated == "catalog" and catalog_url and runner.result("route") == catalog_url:
+            scraped_data = reuse("catalog")
+        else:
+            runner.discard("catalog", "retrieve")
+            scraped_data = scrape_course_catalog(catalog_url)
         print(f"[SCRAPER] 🌐 Scraped content from: {scraped_data['title']}")
+        sources.append(scraped_data["url"])
+        cacheable = scraped_data["title"] != "Error"
         
-        # Format the scraped content for the RAG agent
+        # Format the page sections relevant to the query for the RAG agent
         context_docs = [
             f"Title: {scraped_data['title']}\n\n"
-            f"Content: {scraped_data['content']}\n\n"
+            f"Content: {catalog_page_content(optimized_query, scraped_data)}\n\n"
             f"Source: {scraped_data['url']}"
         ]
     else:
         # Regular flow for non-course queries
-        # Step 3: Try Pinecone retrieval
-        context_docs = retrieve_context(optimized_query)
+        # Step 3: Try Pinecone retrieval (reusing the speculative one if the query barely changed)
+        if speculated == "retrieve" and is_same_query(user_query, optimized_query):
+            context_docs = reuse("retrieve")
+        else:
+            runner.discard("catalog", "retrieve")
+            context_docs = retrieve_context(optimized_query)
         print(f"[PINECONE] 📚 Retrieved {len(context_docs)} documents")
 
         # Step 4: Fallback if nothing found
         if not context_docs or all(not c.strip() for c in context_docs):
             print("[FALLBACK] 🪄 Using GPT fallback")
             context_docs = [fallback_scraper_agent(optimized_query)]
+            cacheable = False
+
+    record_speculation(request_stats)
+
+    # Step 5: Build chat history
+    return {
+        "optimized_query": optimized_query,
+        "context_docs": context_docs,
+        "chat_history": format_chat_history(history),
+        "history_summary": summary,
+        "sources": sources,
+        "cacheable": cacheable
+    }
+
+# ---------------- Semantic Answer Cache ----------------
 
-    # Step 5: Build chat history (last 5 rounds)
-    formatted_chat_history = "\n".join([
-        f"User: {msg['question']}\nAssistant: {msg['answer']}"
-        for msg in session_memory[-5:]
-    ])
+answer_cache = SemanticAnswerCache(
+    threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_SIZE
+)
+# Answers built from a catalog page are dropped as soon as that page's content changes
+catalog_cache.on_change.append(answer_cache.invalidate_source)
+metrics.add_gauges(
+    "mie_answer_cache", answer_cache.cache_stats, ("hits", "misses", "hit_rate", "saved_seconds"),
+    "Semantic answer cache lookups, hit rate and estimated generation seconds saved."
+)
 
-    # Step 6: Generate answer using RAG
-    final_response = rag_agent(optimized_query, context_docs, formatted_chat_history)
+def answer_cache_key(chat):
+    """(query vector, prompt fingerprint) for the answer cache, or None if the answer should not be cached.
 
-    # Step 7: Store interaction
-    session_memory.append({
-        "question": user_query,
-        "answer": final_response
-    })
+    The fingerprint covers the session's chat history and summary as well as
+    the context docs: the answer was written from all of them, so it is only
+    served to a session whose prompt would have been the same.
+    """
+    if not ANSWER_CACHE_ENABLED or not chat["cacheable"]:
+        return None
+    context_docs = chat["context_docs"]
+    if not context_docs or all(not c.strip() for c in context_docs):
+        return None
+    try:
+        vector = get_embed_model().encode(chat["optimized_query"], normalize_embeddings=True)
+    except Exception as e:
+        print(f"Answer cache embedding error: {e}")
+        return None
+    prompt_parts = [*context_docs, "\x00history", *chat["chat_history"], chat["history_summary"] or ""]
+    return vector, context_fingerprint(prompt_parts)
+
+def cache_answer(cache_key, chat, answer, generation_seconds):
+    if cache_key is None or answer in (NO_CONTEXT_RESPONSE, RAG_ERROR_RESPONSE):
+        return
+    if answer.endswith(INTERRUPTED_NOTE.strip()):
+        return
+    answer_cache.store(*cache_key, answer, generation_seconds=generation_seconds, sources=chat["sources"])
+
+# ---------------- Main Chat Function ----------------
+
+@traced("chat.turn")
+def process_chat(user_query: str, stream: bool = False, session_id: str = DEFAULT_SESSION_ID):
+    """Answer a user query in the chat session `session_id`.
+
+    With stream=True, returns a generator of answer tokens instead of a string.
+    """
+    print(f"\n[PROCESS_CHAT] 🔹 Received user query: {user_query}")
+
+    # Check for request for a previous question
+    match = PREVIOUS_QUESTION_PATTERN.search(user_query)
+    if match:
+        answer = f"Your requested question: {get_question_by_index(match.group(1), session_id)}"
+        return iter([answer]) if stream else answer
+
+    summary, history = session_memory.context(session_id)
+
+    # Course lookups: answered from the course index alone, or with only the matching course records as context
+    indexed = lookup_course_index(user_query)
+    if indexed is not None and "answer" in indexed:
+        print("[INDEX] 📇 Answered from the course index")
+        if stream:
+            return _stream_response(session_id, user_query, iter([indexed["answer"]]))
+        session_memory.append(session_id, user_query, indexed["answer"])
+        compact_history(session_id)
+        return indexed["answer"]
+    if indexed is not None:
+        print(f"[INDEX] 📇 Using {len(indexed['sources'])} catalog page(s) of course records as context")
+        chat = prepare_indexed_chat(user_query, indexed, history, summary)
+    else:
+        chat = prepare_chat(user_query, history, summary)
+
+    # Step 6: Serve a semantically equivalent cached answer, or generate one using RAG
+    cache_key = answer_cache_key(chat)
+    cached_response = answer_cache.lookup(*cache_key) if cache_key else None
+    current_span().set(answer_cache_hit=cached_response is not None)
+    if cached_response is not None:
+        print("[CACHE] ♻️ Semantic answer cache hit")
+        if stream:
+            return _stream_response(session_id, user_query, iter([cached_response]))
+        final_response = cached_response
+    elif stream:
+        pieces = trace_stream(
+            rag_agent_stream(chat["optimized_query"], chat["context_docs"], chat["chat_history"],
+                             chat["history_summary"]),
+            "rag.stream"
+        )
+        return _stream_response(session_id, user_query, pieces, cache_key, chat)
+    else:
+        started = time.perf_counter()
+        final_response = rag_agent(
+            chat["optimized_query"], chat["context_docs"], chat["chat_history"], chat["history_summary"]
+        )
+        cache_answer(cache_key, chat, final_response, time.perf_counter() - started)
+
+    # Step 7: Store interaction (older turns are summarized in the background)
+    session_memory.append(session_id, user_query, final_response)
+    compact_history(session_id)
+
+    print(f"[RAG] ✅ Final response length: {len(final_response)}")
+    return final_response
+
+def _stream_response(session_id, user_query, pieces, cache_key=None, chat=None):
+    """Yield tokens to the caller, then store the full answer in session memory (and the answer cache)"""
+    started = time.perf_counter()
+    parts = []
+    for piece in pieces:
+        parts.append(piece)
+        yield piece
+    final_response = "".join(parts).strip()
+    if chat is not None:
+        cache_answer(cache_key, chat, final_response, time.perf_counter() - started)
+
+    # Step 7: Store interaction (older turns are summarized in the background)
+    session_memory.append(session_id, user_query, final_response)
+    compact_history(session_id)
 
     print(f"[RAG] ✅ Final response length: {len(final_response)}")
-    return final_response
\ No newline at end of file
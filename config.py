@@ -1,10 +1,8 @@
 # app/config.py
 
 import os
+import threading
 import openai
-from pinecone import Pinecone
-from sentence_transformers import SentenceTransformer
-from langchain.memory import ConversationBufferMemory
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,21 +12,199 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = os.getenv("INDEX_NAME")
 
-import streamlit as st
-
 # OPENAI_API_KEY = st.secrets["OPENAI_API_KEY"]
 # PINECONE_API_KEY = st.secrets["PINECONE_API_KEY"]
 INDEX_NAME = "chatbot-memory"
 
-# Set OpenAI key
+# Set OpenAI key (and an alternative endpoint, e.g. a local stand-in for offline benchmarks)
 openai.api_key = OPENAI_API_KEY
+OPENAI_API_BASE = os.getenv("OPENAI_API_BASE")
+if OPENAI_API_BASE:
+    openai.api_base = OPENAI_API_BASE
+
+# Course catalog cache (parsed pages kept in memory and on disk)
+CATALOG_CACHE_DIR = os.getenv("CATALOG_CACHE_DIR", ".cache/catalog")
+CATALOG_CACHE_TTL = int(os.getenv("CATALOG_CACHE_TTL", "21600"))  # seconds
+# Fetch catalog pages from this base URL instead (same paths); cache keys keep the original URLs
+CATALOG_MIRROR = os.getenv("CATALOG_MIRROR")
+CATALOG_PREFETCH_WORKERS = int(os.getenv("CATALOG_PREFETCH_WORKERS", "8"))
+CATALOG_REFRESH_INTERVAL = int(os.getenv("CATALOG_REFRESH_INTERVAL", "3600"))  # seconds
+
+# Catalog router: below this top-2 cosine margin the LLM picks the catalog URL
+CATALOG_ROUTER_MARGIN = float(os.getenv("CATALOG_ROUTER_MARGIN", "0.05"))
+
+# Catalog sections: pages split at their headings, only the sections closest to the query go to the LLM
+CATALOG_SECTIONS_ENABLED = os.getenv("CATALOG_SECTIONS_ENABLED", "1") == "1"
+CATALOG_SECTION_TOKENS = int(os.getenv("CATALOG_SECTION_TOKENS", "400"))  # longer sections are split
+CATALOG_TOP_SECTIONS = int(os.getenv("CATALOG_TOP_SECTIONS", "6"))
+CATALOG_CONTEXT_TOKENS = int(os.getenv("CATALOG_CONTEXT_TOKENS", "1200"))
+
+# Optimizer fast path: standalone queries skip the LLM rewrite
+SKIP_OPTIMIZER_FOR_STANDALONE = os.getenv("SKIP_OPTIMIZER_FOR_STANDALONE", "1") == "1"
+STANDALONE_MIN_SIMILARITY = float(os.getenv("STANDALONE_MIN_SIMILARITY", "0.45"))
+
+# Speculative retrieval: run routing/retrieval on the raw query while the optimizer runs
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "1") == "1"
+SPECULATION_SIMILARITY = float(os.getenv("SPECULATION_SIMILARITY", "0.92"))
+
+# URL verification for fallback answers (concurrent, with positive and negative caching)
+URL_VERIFY_DEADLINE = float(os.getenv("URL_VERIFY_DEADLINE", "3"))  # seconds for all links together
+URL_VERIFY_TTL = int(os.getenv("URL_VERIFY_TTL", "3600"))
+URL_VERIFY_NEGATIVE_TTL = int(os.getenv("URL_VERIFY_NEGATIVE_TTL", "300"))
+
+# Semantic answer cache: reuse an answer for a near-identical query over the same context
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") == "1"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "3600"))  # seconds
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+
+# Conversation memory per chat session: recent turns kept in memory, older sessions rebuilt from chat_db
+SESSION_MEMORY_TURNS = int(os.getenv("SESSION_MEMORY_TURNS", "20"))
+SESSION_MEMORY_SESSIONS = int(os.getenv("SESSION_MEMORY_SESSIONS", "500"))
+SESSION_MEMORY_TTL = int(os.getenv("SESSION_MEMORY_TTL", "3600"))  # seconds idle before a session is dropped
+
+# Rolling history summary: older turns are folded into a per-session summary in the background
+HISTORY_SUMMARY_ENABLED = os.getenv("HISTORY_SUMMARY_ENABLED", "1") == "1"
+HISTORY_RECENT_TURNS = int(os.getenv("HISTORY_RECENT_TURNS", "3"))  # newest turns always sent verbatim
+HISTORY_SUMMARY_BATCH = int(os.getenv("HISTORY_SUMMARY_BATCH", "3"))  # extra turns collected before folding
+HISTORY_SUMMARY_TOKENS = int(os.getenv("HISTORY_SUMMARY_TOKENS", "200"))
+
+# Embedding cache (bounded in-memory LRU backed by SQLite)
+EMBED_MODEL_NAME = os.getenv("EMBED_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", ".cache/embeddings.sqlite")
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "10000"))
+
+# Micro-batching: concurrent cache misses are merged into one encode call
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+EMBED_BATCH_WAIT_MS = float(os.getenv("EMBED_BATCH_WAIT_MS", "5"))
+
+# PDF extraction: large documents are extracted in page ranges across worker processes
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+
+# Tracing: per-stage spans to a rotating JSONL file, latency histograms in Prometheus text format
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "0") == "1"
+TRACE_FILE = os.getenv("TRACE_FILE", ".cache/traces/trace.jsonl")
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(20 * 1024 * 1024)))
+TRACE_BACKUPS = int(os.getenv("TRACE_BACKUPS", "5"))
+METRICS_FILE = os.getenv("METRICS_FILE", ".cache/metrics.prom")
+METRICS_FLUSH_INTERVAL = int(os.getenv("METRICS_FLUSH_INTERVAL", "10"))  # seconds
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))  # 0 = no HTTP endpoint
+
+# Prompt budgets (tokens): each prompt part is trimmed to its budget and max_tokens sized from what's left
+PROMPT_TOKENIZER_MODEL = os.getenv("PROMPT_TOKENIZER_MODEL", "gpt-4")
+MODEL_CONTEXT_TOKENS = int(os.getenv("MODEL_CONTEXT_TOKENS", "8192"))
+PROMPT_QUESTION_TOKENS = int(os.getenv("PROMPT_QUESTION_TOKENS", "200"))
+PROMPT_HISTORY_TOKENS = int(os.getenv("PROMPT_HISTORY_TOKENS", "800"))
+PROMPT_CONTEXT_TOKENS = int(os.getenv("PROMPT_CONTEXT_TOKENS", "3000"))
+ANSWER_MAX_TOKENS = int(os.getenv("ANSWER_MAX_TOKENS", "500"))
+OPTIMIZER_HISTORY_TOKENS = int(os.getenv("OPTIMIZER_HISTORY_TOKENS", "300"))
+
+# PDF Q&A retrieval: chunk size/overlap in characters, context budget in tokens
+PDF_CHUNK_SIZE = int(os.getenv("PDF_CHUNK_SIZE", "1200"))
+PDF_CHUNK_OVERLAP = int(os.getenv("PDF_CHUNK_OVERLAP", "200"))
+PDF_TOP_K = int(os.getenv("PDF_TOP_K", "6"))
+PDF_CONTEXT_TOKENS = int(os.getenv("PDF_CONTEXT_TOKENS", "1500"))
+
+# Upload relevance check: lexical mentions, then embedding similarity, then the LLM for the ambiguous band
+DOC_CLASSIFY_SAMPLES = int(os.getenv("DOC_CLASSIFY_SAMPLES", "8"))
+DOC_CLASSIFY_SAMPLE_CHARS = int(os.getenv("DOC_CLASSIFY_SAMPLE_CHARS", "1000"))
+DOC_CLASSIFY_ACCEPT_MENTIONS = int(os.getenv("DOC_CLASSIFY_ACCEPT_MENTIONS", "3"))
+DOC_CLASSIFY_ACCEPT_SIMILARITY = float(os.getenv("DOC_CLASSIFY_ACCEPT_SIMILARITY", "0.45"))
+DOC_CLASSIFY_REJECT_SIMILARITY = float(os.getenv("DOC_CLASSIFY_REJECT_SIMILARITY", "0.25"))
+# Reference vectors: centroids of the corpus, written by export_index.py (fallback texts until then)
+DOC_CLASSIFY_REFERENCE_FILE = os.getenv("DOC_CLASSIFY_REFERENCE_FILE", ".cache/doc_classifier_references.npy")
+DOC_CLASSIFY_REFERENCE_CLUSTERS = int(os.getenv("DOC_CLASSIFY_REFERENCE_CLUSTERS", "32"))
+
+# Processed-PDF cache (keyed by file hash, shared by all sessions)
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", ".cache/pdf")
+PDF_CACHE_MAX_BYTES = int(os.getenv("PDF_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+PDF_CACHE_MEMORY_ITEMS = int(os.getenv("PDF_CACHE_MEMORY_ITEMS", "16"))
+
+# Retrieval backend: "pinecone" (default) or "local" (in-process index built with export_index.py)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", ".cache/vector_index")
+LOCAL_INDEX_MODE = os.getenv("LOCAL_INDEX_MODE", "exact")  # "exact" or "ivf"
+LOCAL_INDEX_NPROBE = int(os.getenv("LOCAL_INDEX_NPROBE", "8"))
+
+# ---------------- Lazily initialized resources ----------------
+# The embedding model and the index handle are only created on first use,
+# so importing config (and chatbot_backend) stays fast and works offline.
+
+_embed_model = None
+_embed_model_lock = threading.Lock()
+# CachedEmbedder.cache_stats keys published as Prometheus gauges
+EMBEDDING_CACHE_GAUGES = ("hits", "disk_hits", "misses", "hit_ratio", "memory_items", "memory_bytes", "disk_bytes")
+_index = None
+_index_lock = threading.Lock()
+
+def get_embed_model():
+    """SentenceTransformer behind the embedding cache and the micro-batcher"""
+    global _embed_model
+    if _embed_model is None:
+        with _embed_model_lock:
+            if _embed_model is None:
+                from sentence_transformers import SentenceTransformer
+                from embedding_batcher import BatchingEncoder
+                from embedding_cache import CachedEmbedder
+
+                _embed_model = CachedEmbedder(
+                    BatchingEncoder(
+                        SentenceTransformer(EMBED_MODEL_NAME),
+                        max_batch=EMBED_BATCH_SIZE, max_wait=EMBED_BATCH_WAIT_MS / 1000
+                    ),
+                    EMBED_MODEL_NAME, EMBED_CACHE_PATH, max_items=EMBED_CACHE_SIZE
+                )
+                from tracing import metrics
+                metrics.add_gauges("mie_embedding_cache", _embed_model.cache_stats, EMBEDDING_CACHE_GAUGES,
+                                   "Embedding cache lookups, hit ratio and memory/disk bytes used.")
+    return _embed_model
+
+def get_index():
+    """Vector index handle for the configured VECTOR_BACKEND"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                if VECTOR_BACKEND == "local":
+                    from vector_store import LocalIndex
+                    _index = LocalIndex(LOCAL_INDEX_DIR, mode=LOCAL_INDEX_MODE, nprobe=LOCAL_INDEX_NPROBE)
+                else:
+                    from pinecone import Pinecone
+                    _index = Pinecone(api_key=PINECONE_API_KEY).Index(INDEX_NAME)
+    return _index
+
+def override_resources(embed_model=None, index=None):
+    """Install stand-ins for the embedding model and/or the vector index (offline benchmarks)"""
+    global _embed_model, _index
+    if embed_model is not None:
+        with _embed_model_lock:
+            _embed_model = embed_model
+    if index is not None:
+        with _index_lock:
+            _index = index
 
-# Initialize SentenceTransformer
-embed_model = SentenceTransformer('all-MiniLM-L6-v2')
+def preload(background=True):
+    """Load the heavy resources ahead of the first request (in a daemon thread by default)"""
+    def run():
+        for loader in (get_embed_model, get_index):
+            try:
+                loader()
+            except Exception as e:
+                print(f"Preload error in {loader.__name__}: {e}")
 
-# Initialize Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(INDEX_NAME)
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="config-preload", daemon=True)
+    thread.start()
+    return thread
 
-# Optional LangChain memory
-memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+def __getattr__(name):
+    # Keep `config.embed_model` / `config.index` working without loading them at import time
+    if name == "embed_model":
+        return get_embed_model()
+    if name == "index":
+        return get_index()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,169 @@
+# course_index.py
+import re
+import threading
+
+# A catalog course code: subject letters and a four-digit number ("IE 6200", "ie6200", "EECE-5550")
+COURSE_CODE_PATTERN = re.compile(r"\b([A-Za-z]{2,5})[\s\-]?(\d{4})\b")
+HEADING_TAGS = ["h1", "h2", "h3", "h4"]
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = {
+    "a", "an", "and", "for", "in", "of", "on", "the", "to", "with", "i", "ii", "iii", "iv",
+    "introduction", "topics", "special",
+    # Question words, so a query's keywords are only the subject it asks about
+    "which", "what", "are", "is", "there", "any", "course", "courses", "class", "classes",
+    "about", "cover", "covers", "covering", "related", "teach", "teaches", "offer", "offered",
+}
+
+
+def normalize_code(text):
+    """Canonical "SUBJ 1234" form of the first course code in `text`, or None"""
+    match = COURSE_CODE_PATTERN.search(text or "")
+    if not match:
+        return None
+    return f"{match.group(1).upper()} {match.group(2)}"
+
+
+def keywords(text):
+    return {word for word in WORD_PATTERN.findall(text.lower()) if word not in STOP_WORDS and not word.isdigit()}
+
+
+def parse_course_records(root, program):
+    """Course rows of the catalog tables under `root` (a BeautifulSoup tag), in document order.
+
+    Returns dicts with program, section, code, title and credits. The
+    section is the latest heading before the table, refined by the table's
+    own "area header" rows (e.g. "Core Requirements") when it has them.
+    Alternatives listed as "or IE 6200" keep the credits of the course they
+    are an alternative to.
+    """
+    records = []
+    heading = ""
+    for tag in root.find_all(HEADING_TAGS + ["table"]):
+        if tag.name in HEADING_TAGS:
+            heading = tag.get_text(" ", strip=True) or heading
+            continue
+
+        section = heading
+        credits = ""
+        for tr in tag.find_all("tr"):
+            cells = [td.get_text(" ", strip=True).replace("\xa0", " ") for td in tr.find_all("td")]
+            if not any(cells):
+                continue
+            first = re.sub(r"^or\s+", "", cells[0], flags=re.IGNORECASE)
+            alternative = first != cells[0]
+            if not COURSE_CODE_PATTERN.match(first):
+                # Area headers name the requirement group of the rows below them
+                if "areaheader" in (tr.get("class") or []):
+                    section = cells[0]
+                continue
+            title = cells[1] if len(cells) > 1 else ""
+            row_credits = cells[-1] if len(cells) > 2 else ""
+            if row_credits or not alternative:
+                credits = row_credits
+            records.append({
+                "program": program,
+                "section": section,
+                "code": normalize_code(first),
+                "title": title,
+                "credits": credits,
+            })
+    return records
+
+
+class CourseIndex:
+    """In-memory index of catalog course records, rebuilt per page whenever the parsed page changes.
+
+    Pages are registered with update_page(url, program, records); a page
+    whose records object is unchanged is skipped, so calling sync() with the
+    catalog cache's pages on every lookup is cheap. Lookups return record
+    dicts with the page URL added.
+    """
+
+    def __init__(self):
+        self._pages = {}
+        self._by_code = {}
+        self._by_keyword = {}
+        self._lock = threading.Lock()
+        self.stats = {"pages": 0, "records": 0, "lookups": 0, "hits": 0}
+
+    def update_page(self, url, program, records):
+        with self._lock:
+            current = self._pages.get(url)
+            if current is not None and current["source"] is records:
+                return False
+            self._pages[url] = {
+                "source": records,
+                "program": program,
+                "records": [dict(record, url=url) for record in records],
+            }
+            self._rebuild()
+        return True
+
+    def sync(self, pages):
+        """Register every (url, parsed page) pair that carries course records; returns pages updated"""
+        updated = 0
+        for url, data in pages:
+            if data and data.get("courses") is not None:
+                updated += self.update_page(url, data.get("title", ""), data["courses"])
+        return updated
+
+    def _rebuild(self):
+        by_code, by_keyword = {}, {}
+        for page in self._pages.values():
+            for record in page["records"]:
+                by_code.setdefault(record["code"], []).append(record)
+                for word in keywords(record["title"]):
+                    by_keyword.setdefault(word, []).append(record)
+        self._by_code, self._by_keyword = by_code, by_keyword
+        self.stats["pages"] = len(self._pages)
+        self.stats["records"] = sum(len(page["records"]) for page in self._pages.values())
+
+    def _count(self, found):
+        with self._lock:
+            self.stats["lookups"] += 1
+            self.stats["hits"] += int(bool(found))
+
+    # ---------------- Lookups ----------------
+
+    def by_code(self, code):
+        """Every listing of a course (one per program and section it appears in)"""
+        code = normalize_code(code)
+        found = list(self._by_code.get(code, [])) if code else []
+        self._count(found)
+        return found
+
+    def by_program(self, program, section=None):
+        """Records of the program whose name or URL contains `program`, optionally within a section"""
+        program = program.lower()
+        found = []
+        for url, page in list(self._pages.items()):
+            if program in page["program"].lower() or program in url.lower():
+                found.extend(
+                    record for record in page["records"]
+                    if section is None or section.lower() in record["section"].lower()
+                )
+        self._count(found)
+        return found
+
+    def search(self, text, limit=10):
+        """Records whose titles share the most keywords with `text`, one per course code"""
+        scores = {}
+        for word in keywords(text):
+            codes = set()
+            for record in self._by_keyword.get(word, []):
+                if record["code"] not in codes:
+                    codes.add(record["code"])
+                    scores.setdefault(record["code"], [0, record])[0] += 1
+        ranked = sorted(scores.values(), key=lambda item: -item[0])
+        found = [record for _, record in ranked[:limit]]
+        self._count(found)
+        return found
+
+    def codes_in(self, text):
+        """Indexed course codes mentioned in `text`, in order of appearance"""
+        codes = []
+        for match in COURSE_CODE_PATTERN.finditer(text or ""):
+            code = f"{match.group(1).upper()} {match.group(2)}"
+            if code in self._by_code and code not in codes:
+                codes.append(code)
+        return codes
@@ -0,0 +1,189 @@
+# doc_classifier.py
+import re
+import threading
+
+import numpy as np
+
+from config import (
+    get_embed_model, DOC_CLASSIFY_SAMPLES, DOC_CLASSIFY_SAMPLE_CHARS, DOC_CLASSIFY_ACCEPT_MENTIONS,
+    DOC_CLASSIFY_ACCEPT_SIMILARITY, DOC_CLASSIFY_REJECT_SIMILARITY, DOC_CLASSIFY_REFERENCE_FILE
+)
+
+# Explicit references to the university; "northeastern" alone also matches geography
+MENTION_PATTERN = re.compile(
+    r"\bnortheastern\s+university\b|\bnortheastern\.edu\b|\bnortheastern'?s\s+(?:college|department|mie|coe)\b"
+    r"|\bnu\s+mie\b|\bkhoury\s+college\b|\bsnell\s+(?:library|engineering)\b",
+    re.IGNORECASE
+)
+
+# Short descriptions of what Northeastern/MIE documents talk about, used as references only until
+# export_index.py has written the corpus centroids to DOC_CLASSIFY_REFERENCE_FILE
+REFERENCE_TEXTS = [
+    "Northeastern MIE graduate programs: industrial engineering, operations research, engineering management, "
+    "mechanical engineering, robotics, data analytics, human factors and energy systems.",
+    "Northeastern University College of Engineering graduate student handbook and academic policies.",
+    "Mechanical and Industrial Engineering (MIE) department at Northeastern University in Boston.",
+    "Northeastern co-op program: cooperative education, experiential learning and employer placements.",
+    "MIE graduate program requirements, core courses, electives, thesis and course credits.",
+    "Northeastern University registrar, graduate admissions, tuition and financial aid for engineering students.",
+    "Course syllabus for a Northeastern MIE course: prerequisites, grading, schedule and instructor.",
+]
+
+LLM_EXCERPT_CHARS = 3000
+
+classifier_stats = {"lexical": 0, "embedding": 0, "llm": 0, "fallback": 0}
+_stats_lock = threading.Lock()
+
+_reference_vectors = None
+_reference_lock = threading.Lock()
+
+
+def _count(tier):
+    with _stats_lock:
+        classifier_stats[tier] += 1
+
+
+def load_reference_vectors(path=DOC_CLASSIFY_REFERENCE_FILE):
+    """Normalized corpus centroids from `path`, or embeddings of REFERENCE_TEXTS if it doesn't exist yet"""
+    try:
+        vectors = np.asarray(np.load(path), dtype=np.float32)
+    except (OSError, ValueError):
+        vectors = np.asarray(get_embed_model().encode(REFERENCE_TEXTS), dtype=np.float32)
+        print(f"[CLASSIFIER] ⚠️ No corpus reference vectors at {path} (run export_index.py); using fallback texts")
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def get_reference_vectors():
+    global _reference_vectors
+    if _reference_vectors is None:
+        with _reference_lock:
+            if _reference_vectors is None:
+                _reference_vectors = load_reference_vectors()
+    return _reference_vectors
+
+
+def set_reference_vectors(vectors):
+    """Use these (normalized) reference vectors instead of loading them"""
+    global _reference_vectors
+    with _reference_lock:
+        _reference_vectors = np.asarray(vectors, dtype=np.float32)
+
+
+def sample_document(text, samples=DOC_CLASSIFY_SAMPLES, sample_chars=DOC_CLASSIFY_SAMPLE_CHARS):
+    """Evenly spaced excerpts from the start to the end of the document"""
+    text = text.strip()
+    if len(text) <= samples * sample_chars:
+        return [text[i:i + sample_chars] for i in range(0, len(text), sample_chars)]
+    step = (len(text) - sample_chars) / max(samples - 1, 1)
+    return [text[int(i * step):int(i * step) + sample_chars] for i in range(samples)]
+
+
+def count_mentions(text):
+    return len(MENTION_PATTERN.findall(text))
+
+
+class DocumentSampler:
+    """Mention count and classifier excerpts of a document whose pages stream through it.
+
+    Only the first `samples * sample_chars` characters and the head of
+    evenly spaced pages are kept (every `stride`-th page; the stride doubles
+    whenever twice `samples` heads are held), so memory stays bounded
+    however long the document is. Documents no longer than the kept prefix
+    get the same excerpts as sample_document on their full text.
+    """
+
+    def __init__(self, samples=DOC_CLASSIFY_SAMPLES, sample_chars=DOC_CLASSIFY_SAMPLE_CHARS):
+        self.samples = samples
+        self.sample_chars = sample_chars
+        self.prefix = ""
+        self.heads = []
+        self.stride = 1
+        self.pages = 0
+        self.chars = 0
+        self.mentions = 0
+
+    def add(self, page_text):
+        page_text = f"{page_text}\n"
+        self.mentions += count_mentions(page_text)
+        limit = self.samples * self.sample_chars
+        if len(self.prefix) < limit:
+            self.prefix += page_text[:limit - len(self.prefix)]
+        if self.pages % self.stride == 0 and page_text.strip():
+            self.heads.append((self.pages, page_text.strip()[:self.sample_chars]))
+            if len(self.heads) >= 2 * self.samples:
+                self.stride *= 2
+                self.heads = [(page, head) for page, head in self.heads if page % self.stride == 0]
+        self.pages += 1
+        self.chars += len(page_text)
+
+    def observe(self, pages):
+        """Pass page texts through unchanged, sampling each one"""
+        for page_text in pages:
+            self.add(page_text)
+            yield page_text
+
+    def excerpts(self):
+        if self.chars <= self.samples * self.sample_chars:
+            return sample_document(self.prefix, self.samples, self.sample_chars)
+        if len(self.heads) <= self.samples:
+            return [head for _, head in self.heads]
+        step = (len(self.heads) - 1) / max(self.samples - 1, 1)
+        return [self.heads[round(i * step)][1] for i in range(self.samples)]
+
+
+def similarity_score(excerpts, references=None):
+    """Mean of the three best excerpt-to-reference similarities"""
+    if not excerpts:
+        return 0.0
+    if references is None:
+        references = get_reference_vectors()
+    vectors = np.asarray(get_embed_model().encode(excerpts, normalize_embeddings=True), dtype=np.float32)
+    best_per_excerpt = (vectors @ references.T).max(axis=1)
+    return float(np.sort(best_per_excerpt)[-3:].mean())
+
+
+def classify_document(text, llm_check=None, references=None):
+    """Decide whether a document's full text is Northeastern-related (see classify_sample)"""
+    return classify_sample(count_mentions(text), sample_document(text), llm_check, references)
+
+
+def classify_sample(mentions, excerpts, llm_check=None, references=None):
+    """Decide whether a document is Northeastern-related, cheapest evidence first.
+
+    `mentions` counts the explicit mentions of the university in the whole
+    document and `excerpts` are samples spread across it (sample_document
+    or DocumentSampler). `references` defaults to get_reference_vectors().
+    Returns (verdict, tier). Tier "lexical": enough explicit mentions of the
+    university. Tier "embedding": the excerpts are clearly close to (with at
+    least one mention) or clearly far from (with none) the reference
+    vectors. Everything else is ambiguous and goes to `llm_check(excerpt)`;
+    if that returns None (API error) the verdict falls back to whether the
+    document mentions the university at all, with tier "fallback".
+    """
+    if mentions >= DOC_CLASSIFY_ACCEPT_MENTIONS:
+        _count("lexical")
+        return True, "lexical"
+
+    try:
+        score = similarity_score(excerpts, references)
+    except Exception as e:
+        print(f"Error scoring document similarity: {e}")
+        score = None
+
+    if score is not None:
+        if mentions and score >= DOC_CLASSIFY_ACCEPT_SIMILARITY:
+            _count("embedding")
+            return True, "embedding"
+        if not mentions and score < DOC_CLASSIFY_REJECT_SIMILARITY:
+            _count("embedding")
+            return False, "embedding"
+
+    # The LLM sees a shortened piece of every excerpt, about LLM_EXCERPT_CHARS in total
+    per_excerpt = LLM_EXCERPT_CHARS // max(len(excerpts), 1)
+    verdict = llm_check("\n...\n".join(e[:per_excerpt] for e in excerpts)) if llm_check else None
+    if verdict is None:
+        _count("fallback")
+        return mentions > 0, "fallback"
+    _count("llm")
+    return verdict, "llm"
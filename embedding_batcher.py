@@ -0,0 +1,129 @@
+# embedding_batcher.py
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import numpy as np
+
+
+class BatchingEncoder:
+    """Shared encode worker that merges concurrent requests into one batched call.
+
+    Callers block on a future while a single worker thread collects requests
+    for up to `max_wait` seconds (or until `max_batch` texts are queued), runs
+    one `encode` per distinct set of encode options, and hands each caller
+    its slice of the result.
+
+    A failing batch only fails the requests in it; callers waiting on the
+    worker check every `check_interval` seconds that it is still alive and
+    restart it if not, so no caller can block forever.
+    """
+
+    def __init__(self, model, max_batch=32, max_wait=0.005, check_interval=1.0):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.check_interval = check_interval
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "batches": 0, "texts": 0, "failed_batches": 0, "restarts": 0}
+
+    def __getattr__(self, name):
+        # Everything except encode goes straight to the wrapped model
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def _ensure_worker(self):
+        """Start the worker thread, or replace it if it has died"""
+        if self._worker is None or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    if self._worker is not None:
+                        self.stats["restarts"] += 1
+                        print("Embedding batcher worker died; restarting it")
+                    self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                    self._worker.start()
+
+    def encode(self, sentences, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return self.model.encode(texts, **kwargs)
+
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((texts, kwargs, future))
+        while True:
+            try:
+                vectors = future.result(timeout=self.check_interval)
+                break
+            except FutureTimeout:
+                self._ensure_worker()
+        return vectors[0] if single else vectors
+
+    # ---------------- Worker ----------------
+
+    def _collect(self):
+        """Block for one request, then gather more until the batch is full or the window closes."""
+        batch = [self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._encode_batch(batch)
+            except BaseException as e:
+                # Whatever went wrong, nobody in this batch is left waiting
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                with self._lock:
+                    self.stats["failed_batches"] += 1
+                if not isinstance(e, Exception):
+                    raise
+
+    def _encode_batch(self, batch):
+        # Requests are grouped by equal encode options (compared, not hashed: values may be lists)
+        groups = []
+        for texts, kwargs, future in batch:
+            for options, requests in groups:
+                if options == kwargs:
+                    requests.append((texts, future))
+                    break
+            else:
+                groups.append((kwargs, [(texts, future)]))
+
+        for options, requests in groups:
+            all_texts = [text for texts, _ in requests for text in texts]
+            try:
+                vectors = np.asarray(self.model.encode(all_texts, **options))
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+
+            start = 0
+            for texts, future in requests:
+                future.set_result(vectors[start:start + len(texts)])
+                start += len(texts)
+
+            with self._lock:
+                self.stats["requests"] += len(requests)
+                self.stats["batches"] += 1
+                self.stats["texts"] += len(all_texts)
@@ -0,0 +1,132 @@
+# embedding_cache.py
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize_text(text):
+    return " ".join(text.split())
+
+
+class CachedEmbedder:
+    """Drop-in wrapper around a SentenceTransformer that caches `encode` results.
+
+    Vectors are keyed on a hash of the model name, the encode options that
+    change the output, and the whitespace-normalized text. Recent vectors
+    live in a bounded in-memory LRU; everything is also written to a SQLite
+    file so the cache survives restarts.
+    """
+
+    def __init__(self, model, model_name, db_path, max_items=10000):
+        self.model = model
+        self.model_name = model_name
+        self.db_path = db_path
+        self.max_items = max_items
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)")
+        self._conn.commit()
+
+    def __getattr__(self, name):
+        # Everything except encode goes straight to the wrapped model
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def _key(self, text, normalize_embeddings):
+        raw = f"{self.model_name}\0{int(bool(normalize_embeddings))}\0{text}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    # ---------------- Memory LRU ----------------
+
+    def _remember(self, key, vector):
+        # Caller holds self._lock
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = vector
+        self._memory_bytes += vector.nbytes
+        while len(self._memory) > self.max_items:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    # ---------------- Encode ----------------
+
+    def encode(self, sentences, normalize_embeddings=False, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [normalize_text(t) for t in ([sentences] if single else sentences)]
+        keys = [self._key(t, normalize_embeddings) for t in texts]
+        vectors = [None] * len(texts)
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    vectors[i] = vector
+                    self.stats["hits"] += 1
+
+            missing = [i for i, v in enumerate(vectors) if v is None]
+            if missing:
+                lookup = list({keys[i] for i in missing})
+                found = {}
+                for start in range(0, len(lookup), 500):
+                    chunk = lookup[start:start + 500]
+                    rows = self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    found.update((key, np.frombuffer(blob, dtype=np.float32)) for key, blob in rows)
+                for i in missing:
+                    if keys[i] in found:
+                        vectors[i] = found[keys[i]]
+                        self._remember(keys[i], vectors[i])
+                        self.stats["disk_hits"] += 1
+
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            # Encode only the distinct misses, in one batched call
+            unique = list(dict.fromkeys(texts[i] for i in missing))
+            encoded = self.model.encode(unique, normalize_embeddings=normalize_embeddings, **kwargs)
+            encoded = {t: np.asarray(v, dtype=np.float32) for t, v in zip(unique, encoded)}
+            with self._lock:
+                for i in missing:
+                    vectors[i] = encoded[texts[i]]
+                    self._remember(keys[i], vectors[i])
+                self.stats["misses"] += len(missing)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(self._key(t, normalize_embeddings), v.tobytes()) for t, v in encoded.items()]
+                )
+                self._conn.commit()
+
+        if single:
+            return vectors[0]
+        if not vectors:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack(vectors)
+
+    # ---------------- Stats ----------------
+
+    def cache_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats["memory_items"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+        lookups = stats["hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        stats["disk_bytes"] = sum(
+            os.path.getsize(path) for path in (self.db_path, f"{self.db_path}-wal") if os.path.exists(path)
+        )
+        return stats
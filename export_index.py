@@ -0,0 +1,90 @@
+"""Export a corpus into the local vector index used when VECTOR_BACKEND=local.
+
+Usage:
+    python export_index.py                              # copy every vector from the Pinecone index
+    python export_index.py --from-jsonl corpus.jsonl    # embed {"id", "combined_text", ...} records
+    python export_index.py --ivf-lists 256              # also build IVF lists for LOCAL_INDEX_MODE=ivf
+
+Also writes the corpus centroids the upload classifier (doc_classifier.py)
+compares PDFs against to DOC_CLASSIFY_REFERENCE_FILE.
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+from config import (
+    get_embed_model, PINECONE_API_KEY, INDEX_NAME, LOCAL_INDEX_DIR,
+    DOC_CLASSIFY_REFERENCE_FILE, DOC_CLASSIFY_REFERENCE_CLUSTERS
+)
+from vector_store import LocalIndex, _kmeans, _normalize
+
+
+def export_from_pinecone(namespace="", batch_size=100):
+    """Yield (id, values, metadata) for every vector in the configured Pinecone index."""
+    from pinecone import Pinecone
+
+    index = Pinecone(api_key=PINECONE_API_KEY).Index(INDEX_NAME)
+    for id_page in index.list(namespace=namespace):
+        for start in range(0, len(id_page), batch_size):
+            batch = id_page[start:start + batch_size]
+            response = index.fetch(ids=batch, namespace=namespace)
+            for record_id, vector in response.vectors.items():
+                yield record_id, vector.values, dict(vector.metadata or {})
+
+
+def export_from_jsonl(path, text_field="combined_text", batch_size=64):
+    """Yield (id, values, metadata) by embedding each JSONL record's text with config.embed_model."""
+    embed_model = get_embed_model()
+
+    with open(path, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+
+    for start in range(0, len(records), batch_size):
+        batch = records[start:start + batch_size]
+        vectors = embed_model.encode([r[text_field] for r in batch], batch_size=batch_size)
+        for i, (record, vector) in enumerate(zip(batch, vectors)):
+            metadata = {k: v for k, v in record.items() if k != "id"}
+            yield str(record.get("id", start + i)), vector, metadata
+
+
+def write_reference_vectors(path, vectors, n_clusters=DOC_CLASSIFY_REFERENCE_CLUSTERS):
+    """Save k-means centroids of the corpus vectors as the classifier's reference vectors."""
+    vectors = _normalize(vectors)
+    centroids = _kmeans(vectors, min(n_clusters, len(vectors)))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.save(path, centroids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=LOCAL_INDEX_DIR, help="index directory (default: LOCAL_INDEX_DIR)")
+    parser.add_argument("--from-jsonl", help="embed records from a JSONL file instead of reading Pinecone")
+    parser.add_argument("--namespace", default="", help="Pinecone namespace to export")
+    parser.add_argument("--ivf-lists", type=int, default=0, help="number of IVF lists (0 = exact search only)")
+    parser.add_argument("--references", default=DOC_CLASSIFY_REFERENCE_FILE,
+                        help="classifier reference vectors file (default: DOC_CLASSIFY_REFERENCE_FILE)")
+    args = parser.parse_args()
+
+    if args.from_jsonl:
+        records = export_from_jsonl(args.from_jsonl)
+    else:
+        records = export_from_pinecone(namespace=args.namespace)
+
+    ids, vectors, metadatas = [], [], []
+    for record_id, values, metadata in records:
+        ids.append(record_id)
+        vectors.append(values)
+        metadatas.append(metadata)
+    print(f"Collected {len(ids)} vectors")
+
+    LocalIndex.build(args.out, ids, vectors, metadatas, ivf_lists=args.ivf_lists)
+    print(f"Wrote local index to {args.out}")
+
+    write_reference_vectors(args.references, vectors)
+    print(f"Wrote classifier reference vectors to {args.references}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# history_summary.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class HistoryCompactor:
+    """Folds older turns of a session into a rolling summary, off the request path.
+
+    After each turn, schedule(session_id) checks whether the session has
+    `keep_recent + batch` turns not yet covered by its summary. If so, a
+    background worker calls `summarize(summary, turns)` with the current
+    summary and every unsummarized turn except the `keep_recent` newest,
+    stores the result in `memory` and hands it to `store(session_id,
+    summary, summary_turns)` (e.g. chat_db.save_summary). At most one job
+    per session runs at a time; a failed summary (None) is retried on the
+    session's next turn.
+    """
+
+    def __init__(self, memory, summarize, store=None, keep_recent=3, batch=3, workers=1):
+        self.memory = memory
+        self.summarize = summarize
+        self.store = store
+        self.keep_recent = keep_recent
+        self.batch = batch
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="history-summary")
+        self._running = set()
+        self._lock = threading.Lock()
+        self.stats = {"scheduled": 0, "summarized": 0, "failed": 0, "turns_folded": 0}
+
+    def schedule(self, session_id):
+        """Queue a compaction for the session if it has enough unsummarized turns; returns the future or None"""
+        with self._lock:
+            if session_id in self._running:
+                return None
+            job = self.memory.pending_summary(session_id, self.keep_recent, self.batch)
+            if job is None:
+                return None
+            self._running.add(session_id)
+            self.stats["scheduled"] += 1
+        return self._executor.submit(self._compact, session_id, *job)
+
+    def _compact(self, session_id, summary, turns, summary_turns):
+        try:
+            updated = self.summarize(summary, turns)
+            if not updated:
+                with self._lock:
+                    self.stats["failed"] += 1
+                return None
+            if self.memory.set_summary(session_id, updated, summary_turns) and self.store is not None:
+                self.store(session_id, updated, summary_turns)
+            with self._lock:
+                self.stats["summarized"] += 1
+                self.stats["turns_folded"] += len(turns)
+            print(f"[SUMMARY] 🗜️ Folded {len(turns)} turns into the summary of session {session_id}")
+            return updated
+        except Exception as e:
+            print(f"History summary error for {session_id}: {e}")
+            with self._lock:
+                self.stats["failed"] += 1
+            return None
+        finally:
+            with self._lock:
+                self._running.discard(session_id)
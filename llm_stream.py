@@ -0,0 +1,28 @@
+# llm_stream.py
+import openai
+
+INTERRUPTED_NOTE = "\n\n_(The response was interrupted.)_"
+
+
+def stream_chat_completion(**kwargs):
+    """Yield content deltas from openai.ChatCompletion.create(stream=True) as they arrive"""
+    response = openai.ChatCompletion.create(stream=True, **kwargs)
+    for chunk in response:
+        choices = chunk.get("choices") or []
+        if not choices:
+            continue
+        content = choices[0].get("delta", {}).get("content")
+        if content:
+            yield content
+
+
+def stream_with_fallback(pieces, error_message, label):
+    """Pass through a token stream; on an error yield `error_message` (or a note if text was already sent)"""
+    started = False
+    try:
+        for piece in pieces:
+            started = True
+            yield piece
+    except Exception as e:
+        print(f"{label} error:", e)
+        yield INTERRUPTED_NOTE if started else error_message
@@ -0,0 +1,140 @@
+# pdf_cache.py
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES, PDF_CACHE_MEMORY_ITEMS
+
+
+class PdfCache:
+    """Memory + disk cache for processed PDFs, keyed by the SHA-256 of the file bytes.
+
+    Entries are plain dicts (text, chunks, verification verdict, ...). A NumPy
+    array stored under "embeddings" is written next to the JSON as a .npy file.
+    Memory holds the `memory_items` most recently used documents; on disk the
+    least recently used documents are deleted once the directory grows past
+    `max_bytes`. The cache is process-wide, so identical uploads from
+    different sessions share one entry.
+    """
+
+    def __init__(self, cache_dir=PDF_CACHE_DIR, max_bytes=PDF_CACHE_MAX_BYTES, memory_items=PDF_CACHE_MEMORY_ITEMS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evicted": 0}
+
+    # ---------------- Storage ----------------
+
+    def _paths(self, digest):
+        base = os.path.join(self.cache_dir, digest)
+        return f"{base}.json", f"{base}.npy"
+
+    def _remember(self, digest, entry):
+        with self._lock:
+            self._entries[digest] = entry
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.memory_items:
+                self._entries.popitem(last=False)
+
+    def _read_disk(self, digest):
+        json_path, npy_path = self._paths(digest)
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if os.path.exists(npy_path):
+                entry["embeddings"] = np.load(npy_path)
+            # Touch the files so disk eviction sees them as recently used
+            now = time.time()
+            for path in (json_path, npy_path):
+                if os.path.exists(path):
+                    os.utime(path, (now, now))
+        except (OSError, ValueError) as e:
+            if not isinstance(e, FileNotFoundError):
+                print(f"PDF cache read error for {digest}: {e}")
+            return None
+        return entry
+
+    def _write_disk(self, digest, entry):
+        json_path, npy_path = self._paths(digest)
+        tmp_suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            embeddings = entry.get("embeddings")
+            if embeddings is not None:
+                with open(npy_path + tmp_suffix, "wb") as f:
+                    np.save(f, np.asarray(embeddings))
+                os.replace(npy_path + tmp_suffix, npy_path)
+            with open(json_path + tmp_suffix, "w", encoding="utf-8") as f:
+                json.dump({k: v for k, v in entry.items() if k != "embeddings"}, f)
+            os.replace(json_path + tmp_suffix, json_path)
+        except OSError as e:
+            print(f"PDF cache write error for {digest}: {e}")
+
+    def _evict_disk(self):
+        """Delete least recently used documents until the directory fits in max_bytes"""
+        try:
+            files = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)]
+            stats = {path: os.stat(path) for path in files if path.endswith((".json", ".npy"))}
+        except OSError:
+            return
+        total = sum(st.st_size for st in stats.values())
+        if total <= self.max_bytes:
+            return
+
+        documents = {}
+        for path, st in stats.items():
+            digest = os.path.splitext(os.path.basename(path))[0]
+            doc = documents.setdefault(digest, {"size": 0, "used": 0.0})
+            doc["size"] += st.st_size
+            doc["used"] = max(doc["used"], st.st_mtime)
+
+        for digest, doc in sorted(documents.items(), key=lambda item: item[1]["used"]):
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(digest):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= doc["size"]
+            with self._lock:
+                self._entries.pop(digest, None)
+                self.stats["evicted"] += 1
+
+    # ---------------- Lookup ----------------
+
+    def get(self, digest):
+        """Return the cached entry for `digest` or None"""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+                self.stats["hits"] += 1
+                return entry
+
+        entry = self._read_disk(digest)
+        with self._lock:
+            self.stats["disk_hits" if entry is not None else "misses"] += 1
+        if entry is not None:
+            self._remember(digest, entry)
+        return entry
+
+    def put(self, digest, entry):
+        self._remember(digest, entry)
+        self._write_disk(digest, entry)
+        self._evict_disk()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            if name.endswith((".json", ".npy")):
+                os.remove(os.path.join(self.cache_dir, name))
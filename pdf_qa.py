@@ -1,59 +1,195 @@
 # pdf_qa.py
+import hashlib
+import io
 import os
+import re
 import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 from pypdf import PdfReader
 import openai
+from config import (
+    get_embed_model, PDF_EXTRACT_WORKERS, PDF_PARALLEL_MIN_PAGES, PDF_PAGES_PER_TASK,
+    PDF_CHUNK_SIZE, PDF_CHUNK_OVERLAP, PDF_TOP_K, PDF_CONTEXT_TOKENS
+)
+from doc_classifier import DocumentSampler, classify_sample
+from prompt_budget import count_tokens, fit_prompt
+from tracing import current_span, record_usage, span, trace_stream, traced
+from pdf_cache import PdfCache
+from llm_stream import stream_chat_completion, stream_with_fallback
+
+def _pdf_bytes(pdf_file):
+    """Raw bytes of an uploaded file (Streamlit UploadedFile, file object or bytes)"""
+    if isinstance(pdf_file, (bytes, bytearray)):
+        return bytes(pdf_file)
+    if hasattr(pdf_file, "getvalue"):
+        return pdf_file.getvalue()
+    return pdf_file.read()
+
+def _extract_page_range(path, start, end):
+    """Worker task: open the spooled PDF and extract one page range.
+
+    The reader gets an open file rather than the path (pypdf reads a path
+    fully into memory), so a worker only loads the objects of its pages.
+    """
+    with open(path, "rb") as f:
+        reader = PdfReader(f)
+        return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+def _iter_pages_parallel(data, page_count, workers):
+    """Extract page ranges in a process pool, yielding pages in order with a bounded number of ranges in flight.
+
+    The bytes are written to a temporary file once and each task opens it,
+    instead of every worker process receiving its own copy of the document.
+    """
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_count)) for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = deque()
+            next_range = 0
+            while next_range < len(ranges) or in_flight:
+                while next_range < len(ranges) and len(in_flight) < workers * 2:
+                    in_flight.append(pool.submit(_extract_page_range, path, *ranges[next_range]))
+                    next_range += 1
+                yield from in_flight.popleft().result()
+    finally:
+        os.unlink(path)
+
+def iter_pdf_pages(pdf_file, workers=PDF_EXTRACT_WORKERS):
+    """Yield the text of each page in order.
+
+    Small documents (or `workers` <= 1) are read straight from the upload
+    buffer. Documents with at least PDF_PARALLEL_MIN_PAGES pages are split
+    into page ranges and extracted in a process pool; that path spools the
+    bytes to a temp file once so each worker opens the document itself
+    instead of receiving a copy.
+    """
+    data = _pdf_bytes(pdf_file)
+    reader = PdfReader(io.BytesIO(data))
+    page_count = len(reader.pages)
+
+    if workers > 1 and page_count >= PDF_PARALLEL_MIN_PAGES:
+        yield from _iter_pages_parallel(data, page_count, workers)
+        return
+
+    for page in reader.pages:
+        yield page.extract_text() or ""
 
 def extract_text_from_pdf(pdf_file):
     """Extract text from a PDF file"""
-    temp_dir = tempfile.gettempdir()
-    temp_path = os.path.join(temp_dir, pdf_file.name)
-    
-    with open(temp_path, "wb") as f:
-        f.write(pdf_file.getvalue())
-    
-    reader = PdfReader(temp_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() + "\n"
-    
-    # Clean up
-    os.remove(temp_path)
-    return text
+    return "".join(f"{page_text}\n" for page_text in iter_pdf_pages(pdf_file))
 
-def chunk_text(text, max_chunk_size=4000):
-    """Split text into chunks suitable for sending to an LLM"""
-    chunks = []
-    paragraphs = text.split('\n\n')
-    current_chunk = ""
-    
-    for paragraph in paragraphs:
-        if len(current_chunk) + len(paragraph) + 2 <= max_chunk_size:
-            if current_chunk:
-                current_chunk += "\n\n"
-            current_chunk += paragraph
+def _split_long(paragraph, max_chunk_size):
+    """Break a paragraph longer than max_chunk_size at line (or, failing that, character) boundaries"""
+    pieces, current = [], ""
+    for line in paragraph.split("\n"):
+        while len(line) > max_chunk_size:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(line[:max_chunk_size])
+            line = line[max_chunk_size:]
+        if current and len(current) + len(line) + 1 > max_chunk_size:
+            pieces.append(current)
+            current = line
         else:
-            chunks.append(current_chunk)
-            current_chunk = paragraph
-    
-    if current_chunk:
-        chunks.append(current_chunk)
-    
+            current = f"{current}\n{line}" if current else line
+    if current:
+        pieces.append(current)
+    return pieces
+
+def _overlap_tail(text, overlap):
+    """Last `overlap` characters of a chunk, starting on a word boundary"""
+    if overlap <= 0 or len(text) <= overlap:
+        return text if overlap > 0 else ""
+    tail = text[-overlap:]
+    space = tail.find(" ")
+    return tail[space + 1:] if space != -1 else tail
+
+def chunk_pages(pages, max_chunk_size=PDF_CHUNK_SIZE, overlap=PDF_CHUNK_OVERLAP):
+    """Split page texts into overlapping chunks that remember which (1-based) pages they cover"""
+    chunks = []
+    current, page_start, page_end = "", None, None
+
+    for page_number, page_text in enumerate(pages, start=1):
+        for paragraph in re.split(r"\n\s*\n", page_text):
+            if not paragraph.strip():
+                continue
+            for piece in _split_long(paragraph.strip(), max_chunk_size):
+                if current and len(current) + len(piece) + 2 > max_chunk_size:
+                    chunks.append({"text": current, "page_start": page_start, "page_end": page_end})
+                    current = _overlap_tail(current, overlap)
+                    page_start = page_end
+                if not current:
+                    page_start = page_number
+                current = f"{current}\n\n{piece}" if current else piece
+                page_end = page_number
+
+    if current:
+        chunks.append({"text": current, "page_start": page_start, "page_end": page_end})
     return chunks
 
+def embed_chunks(chunks):
+    """Embed all chunks in one batched pass; returns a normalized float32 matrix (or None on error)"""
+    try:
+        vectors = get_embed_model().encode([c["text"] for c in chunks], normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+    except Exception as e:
+        print(f"Error embedding document chunks: {e}")
+        return None
+
+def page_label(chunk):
+    if chunk["page_start"] == chunk["page_end"]:
+        return f"p. {chunk['page_start']}"
+    return f"pp. {chunk['page_start']}-{chunk['page_end']}"
+
+@traced("pdf.select_chunks")
+def select_chunks(question, pdf_data, top_k=PDF_TOP_K, token_budget=PDF_CONTEXT_TOKENS):
+    """The chunks most similar to the question that fit in token_budget, returned in document order"""
+    chunks = pdf_data["chunks"]
+    embeddings = pdf_data.get("embeddings")
+    order = range(len(chunks))
+    if embeddings is not None and len(embeddings) == len(chunks):
+        try:
+            query_vector = get_embed_model().encode(question, normalize_embeddings=True)
+            order = np.argsort(-(embeddings @ np.asarray(query_vector, dtype=np.float32)))
+        except Exception as e:
+            # Fall back to the leading chunks
+            print(f"Error embedding question: {e}")
+
+    selected, used_tokens = [], 0
+    for i in order:
+        cost = count_tokens(chunks[i]["text"])
+        if used_tokens + cost > token_budget:
+            continue
+        selected.append(int(i))
+        used_tokens += cost
+        if len(selected) == top_k:
+            break
+    return [chunks[i] for i in sorted(selected)]
+
+@traced("pdf.verify_llm")
 def verify_northeastern_content(text):
-    """Use an LLM to check if the document is related to Northeastern University"""
+    """Use an LLM to check if the document is related to Northeastern University.
+
+    `text` is normally the excerpts doc_classifier samples from across the
+    document; only ambiguous documents reach this call.
+    """
     # Take a sample of the document to keep token usage reasonable
     sample = text[:3000]  # First 3000 characters
     
     prompt = f"""
-    Below is an excerpt from a document. Your task is to determine if this document is related to Northeastern University 
+    Below are excerpts from a document. Your task is to determine if this document is related to Northeastern University 
     or its Mechanical and Industrial Engineering (MIE) department.
     
-    Document excerpt:
+    Document excerpts:
     {sample}
     
-    Based only on this excerpt, is this document related to Northeastern University? 
+    Based only on these excerpts, is this document related to Northeastern University? 
     Answer with ONLY "yes" or "no".
     """
     
@@ -65,71 +201,135 @@ def verify_northeastern_content(text):
             max_tokens=10
         )
         
+        record_usage(response)
         answer = response["choices"][0]["message"]["content"].strip().lower()
         return "yes" in answer
     except Exception as e:
         print(f"Error verifying document content: {e}")
-        # If there's an error, err on the side of caution and return False
-        return False
+        current_span().record_error(e)
+        # No verdict: classify_document falls back to the local evidence and
+        # process_pdf does not cache the result
+        return None
+
+pdf_cache = PdfCache()
 
+# Bump when the shape of process_pdf's result changes so older cache entries are rebuilt
+# (3: no full-text copy, char_count instead)
+PDF_PROCESSING_VERSION = 3
+
+@traced("pdf.process")
 def process_pdf(pdf_file):
-    """Process a PDF file and verify if it's Northeastern-related"""
+    """Process a PDF file and verify if it's Northeastern-related.
+
+    Results are cached by the SHA-256 of the file bytes, so re-uploading a
+    document (from any session) costs one hash.
+    """
+    data = _pdf_bytes(pdf_file)
+    digest = hashlib.sha256(data).hexdigest()
+    cached = pdf_cache.get(digest)
+    current_span().set(bytes=len(data), cache_hit=cached is not None)
+    if cached is not None and cached.get("version") == PDF_PROCESSING_VERSION:
+        print(f"Using cached processing for PDF: {pdf_file.name}")
+        return dict(cached, filename=pdf_file.name)
+
     print(f"Processing PDF: {pdf_file.name}")
-    text = extract_text_from_pdf(pdf_file)
-    print(f"Extracted {len(text)} characters of text")
-    
-    # Verify if the document is related to Northeastern using LLM
-    is_northeastern_related = verify_northeastern_content(text)
-    print(f"Document is Northeastern-related: {is_northeastern_related}")
-    
-    # Only chunk the text if it's Northeastern-related to save processing
-    chunks = chunk_text(text) if is_northeastern_related else []
+    # Pages stream straight into the chunker; the classifier only keeps a bounded sample of them
+    sampler = DocumentSampler()
+    with span("pdf.extract") as extract_span:
+        chunks = chunk_pages(sampler.observe(iter_pdf_pages(data)))
+        extract_span.set(pages=sampler.pages)
+    print(f"Extracted {sampler.chars} characters of text from {sampler.pages} pages")
+
+    # Local lexical/embedding checks first; the LLM only sees ambiguous documents
+    with span("pdf.classify") as classify_span:
+        is_northeastern_related, tier = classify_sample(
+            sampler.mentions, sampler.excerpts(), llm_check=verify_northeastern_content
+        )
+        classify_span.set(tier=tier)
+    print(f"Document is Northeastern-related: {is_northeastern_related} (decided by {tier})")
+
+    # Only embed the chunks if it's Northeastern-related to save processing
+    embeddings = None
     if is_northeastern_related:
+        with span("pdf.embed", chunks=len(chunks)):
+            embeddings = embed_chunks(chunks) if chunks else None
         print(f"Split into {len(chunks)} chunks")
-    
-    return {
+    else:
+        chunks = []
+
+    pdf_data = {
         "filename": pdf_file.name,
-        "text": text,
+        "digest": digest,
+        "version": PDF_PROCESSING_VERSION,
+        "char_count": sampler.chars,
+        "page_count": sampler.pages,
         "chunks": chunks,
+        "embeddings": embeddings,
         "is_northeastern_related": is_northeastern_related
     }
+    # Don't cache results that a transient API or model error left incomplete
+    if tier != "fallback" and (embeddings is not None or not chunks):
+        pdf_cache.put(digest, pdf_data)
+    return pdf_data
 
-def answer_question(question, pdf_data):
-    """Use LLM to answer a question based on the PDF content"""
-    if not pdf_data:
-        return "No PDF data available. Please upload a document first."
-    
-    # Check if the document is related to Northeastern University
-    if not pdf_data.get("is_northeastern_related", False):
-        return "I do not answer questions unrelated to Northeastern University. This document does not appear to be related to Northeastern or its departments. I can only assist with Northeastern-related inquiries."
-    
-    if not pdf_data.get("chunks"):
-        return "Unable to process the document content. Please try uploading a different document."
-    
-    # Combine chunks into a single prompt if possible, or use the most relevant chunks
-    context = "\n\n".join(pdf_data["chunks"][:3])  # Use first 3 chunks as a simple approach
-    
-    prompt = f"""
+PDF_QA_PROMPT = """
     You are an assistant helping answer questions about a document related to Northeastern University.
 
-    Document: {pdf_data['filename']}
-    Content: {context}
+    Document: {filename}
+    Content (excerpts):
+    {context}
 
     User Question: {question}
 
     Please answer the question based only on the information provided in the document. 
     If the answer isn't in the document, simply state that you cannot find the information in the document.
-    Include references to specific parts of the document that support your answer.
+    Each excerpt is labelled with its page numbers; cite the pages that support your answer, e.g. (p. 4).
     """
+
+@traced("pdf.answer")
+def answer_question(question, pdf_data, stream=False):
+    """Use LLM to answer a question based on the PDF content. With stream=True, returns a generator of tokens."""
+    if not pdf_data:
+        return _as_stream("No PDF data available. Please upload a document first.", stream)
+    
+    # Check if the document is related to Northeastern University
+    if not pdf_data.get("is_northeastern_related", False):
+        return _as_stream("I do not answer questions unrelated to Northeastern University. This document does not appear to be related to Northeastern or its departments. I can only assist with Northeastern-related inquiries.", stream)
+    
+    if not pdf_data.get("chunks"):
+        return _as_stream("Unable to process the document content. Please try uploading a different document.", stream)
     
+    # Only the chunks most relevant to the question, labelled with their pages
+    excerpts = [f"[{page_label(chunk)}]\n{chunk['text']}" for chunk in select_chunks(question, pdf_data)]
+    budget = fit_prompt(
+        question, context=excerpts, fixed_text=PDF_QA_PROMPT.format(filename=pdf_data["filename"], context="", question=""),
+        history_budget=0, context_budget=PDF_CONTEXT_TOKENS
+    )
+    prompt = PDF_QA_PROMPT.format(
+        filename=pdf_data["filename"], context="\n\n".join(budget["context"]), question=budget["question"]
+    )
+    request = {
+        "model": "gpt-4",
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.3,
+        "max_tokens": budget["max_tokens"]
+    }
+
+    if stream:
+        return trace_stream(stream_with_fallback(
+            stream_chat_completion(**request),
+            "I encountered an error processing your question about the document.",
+            "LLM response"
+        ), "pdf.answer.stream")
+
     try:
-        response = openai.ChatCompletion.create(
-            model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=500
-        )
+        response = openai.ChatCompletion.create(**request)
+        record_usage(response)
         return response["choices"][0]["message"]["content"].strip()
     except Exception as e:
         print(f"Error getting LLM response: {e}")
-        return f"I encountered an error processing your question about the document: {str(e)}"
\ No newline at end of file
+        current_span().record_error(e)
+        return f"I encountered an error processing your question about the document: {str(e)}"
+
+def _as_stream(message, stream):
+    return iter([message]) if stream else message
@@ -0,0 +1,53 @@
+# pipeline.py
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared by all requests; stages are short and mostly wait on the network
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="chat-stage")
+
+
+class StageRunner:
+    """Runs the stages of one request as a small DAG on the shared thread pool.
+
+    A stage starts as soon as the stages it depends on have finished and
+    receives their results as its first arguments. Each stage's start and
+    end times are recorded so callers can tell how much work overlapped.
+    """
+
+    def __init__(self, executor=_executor):
+        self.executor = executor
+        self.futures = {}
+        self.timings = {}
+        self._lock = threading.Lock()
+
+    def start(self, name, fn, *args, deps=()):
+        dep_futures = [self.futures[dep] for dep in deps]
+
+        def run():
+            dep_results = [future.result() for future in dep_futures]
+            started = time.perf_counter()
+            try:
+                return fn(*dep_results, *args)
+            finally:
+                with self._lock:
+                    self.timings[name] = (started, time.perf_counter())
+
+        # Run in a copy of the caller's context so tracing spans nest under the request
+        self.futures[name] = self.executor.submit(contextvars.copy_context().run, run)
+        return self.futures[name]
+
+    def result(self, name):
+        return self.futures[name].result()
+
+    def duration(self, name):
+        started, finished = self.timings.get(name, (0.0, 0.0))
+        return finished - started
+
+    def discard(self, *names):
+        """Cancel stages that have not started yet; results of running ones are simply ignored."""
+        for name in names:
+            future = self.futures.get(name)
+            if future is not None:
+                future.cancel()
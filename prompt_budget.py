@@ -0,0 +1,134 @@
+# prompt_budget.py
+import threading
+
+from config import (
+    PROMPT_TOKENIZER_MODEL, MODEL_CONTEXT_TOKENS, PROMPT_QUESTION_TOKENS, PROMPT_HISTORY_TOKENS,
+    PROMPT_CONTEXT_TOKENS, ANSWER_MAX_TOKENS
+)
+from tracing import current_span
+
+# Room left for the chat format's per-message overhead and rounding
+SAFETY_TOKENS = 50
+
+budget_stats = {"prompts": 0, "trimmed": 0, "input_tokens": 0, "prompt_tokens": 0}
+_stats_lock = threading.Lock()
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def get_encoding():
+    """tiktoken encoding for the chat model, or None when tiktoken (or its BPE file) is unavailable"""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        with _encoding_lock:
+            if not _encoding_loaded:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.encoding_for_model(PROMPT_TOKENIZER_MODEL)
+                except Exception as e:
+                    print(f"[BUDGET] ⚠️ tiktoken unavailable, estimating tokens from length: {e}")
+                    _encoding = None
+                _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text):
+    encoding = get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text, max_tokens):
+    """The longest prefix of `text` that fits in max_tokens"""
+    if max_tokens <= 0:
+        return ""
+    encoding = get_encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def fit_prompt(question, context=(), history=(), fixed_text="",
+               question_budget=PROMPT_QUESTION_TOKENS, history_budget=PROMPT_HISTORY_TOKENS,
+               context_budget=PROMPT_CONTEXT_TOKENS, answer_tokens=ANSWER_MAX_TOKENS,
+               base_answer_tokens=150, context_window=MODEL_CONTEXT_TOKENS, min_context_tokens=100):
+    """Trim the parts of a prompt to their token budgets and size the answer from what remains.
+
+    - question: cut to question_budget.
+    - history: list of turns, oldest first; the most recent turns that fit
+      in history_budget are kept. Unused history budget goes to context.
+    - context: list of documents, most relevant first; documents are added
+      in order while they fit, and the first one that doesn't is cut to the
+      remaining budget (if at least min_context_tokens are left).
+    - fixed_text: instructions and system prompt, counted but never trimmed.
+
+    max_tokens grows with the context (base_answer_tokens plus the context
+    size, capped at answer_tokens) and never exceeds what is left of the
+    model's context window.
+    """
+    question_tokens = count_tokens(question)
+    if question_tokens > question_budget:
+        question = truncate_to_tokens(question, question_budget)
+    kept_question_tokens = min(question_tokens, question_budget)
+
+    history_costs = [count_tokens(turn) for turn in history]
+    kept_history, history_used = [], 0
+    for turn, cost in zip(reversed(history), reversed(history_costs)):
+        if history_used + cost > history_budget:
+            break
+        kept_history.append(turn)
+        history_used += cost
+    kept_history.reverse()
+
+    context_budget += history_budget - history_used
+    context_costs = [count_tokens(doc) for doc in context]
+    kept_context, context_used = [], 0
+    for doc, cost in zip(context, context_costs):
+        remaining = context_budget - context_used
+        if cost <= remaining:
+            kept_context.append(doc)
+            context_used += cost
+            continue
+        if remaining >= min_context_tokens:
+            kept_context.append(truncate_to_tokens(doc, remaining))
+            context_used += remaining
+        break
+
+    fixed_tokens = count_tokens(fixed_text)
+    prompt_tokens = fixed_tokens + kept_question_tokens + history_used + context_used
+    input_tokens = fixed_tokens + question_tokens + sum(history_costs) + sum(context_costs)
+    max_tokens = min(answer_tokens, base_answer_tokens + context_used)
+    max_tokens = max(1, min(max_tokens, context_window - prompt_tokens - SAFETY_TOKENS))
+
+    current_span().set(prompt_tokens=prompt_tokens, max_tokens=max_tokens)
+    with _stats_lock:
+        budget_stats["prompts"] += 1
+        budget_stats["input_tokens"] += input_tokens
+        budget_stats["prompt_tokens"] += prompt_tokens
+        if prompt_tokens < input_tokens:
+            budget_stats["trimmed"] += 1
+    if prompt_tokens < input_tokens:
+        print(f"[BUDGET] ✂️ Prompt trimmed from {input_tokens} to {prompt_tokens} tokens")
+
+    return {
+        "question": question,
+        "history": kept_history,
+        "context": kept_context,
+        "prompt_tokens": prompt_tokens,
+        "max_tokens": max_tokens,
+    }
+
+
+def budget_report():
+    """Tokens removed from prompts so far"""
+    with _stats_lock:
+        stats = dict(budget_stats)
+    saved = stats["input_tokens"] - stats["prompt_tokens"]
+    ratio = saved / stats["input_tokens"] if stats["input_tokens"] else 0.0
+    return dict(stats, saved_tokens=saved, saved_ratio=ratio)
@@ -0,0 +1,183 @@
+# session_memory.py
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+
+class SessionMemory:
+    """Question/answer history per chat session, bounded in turns, sessions and idle time.
+
+    Each session keeps its `max_turns` most recent turns. Sessions are kept
+    in least-recently-used order: beyond `max_sessions` the oldest is
+    evicted, and sessions idle for more than `ttl` seconds are dropped.
+    A session that is not in memory is rebuilt from `loader(session_id)`
+    (a list of {"role", "content"} messages), so an evicted or restarted
+    session keeps its history. The loader must return exactly the turns that
+    were appended (e.g. chat_db's chat-kind messages, not PDF Q&A), since
+    summary_turns and question numbers count appended turns.
+
+    A session can also carry a rolling summary of its first `summary_turns`
+    turns (see history_summary.py), reloaded with `summary_loader(session_id)`
+    -> (summary, summary_turns).
+    """
+
+    def __init__(self, max_turns=20, max_sessions=500, ttl=3600, loader=None, summary_loader=None):
+        self.max_turns = max_turns
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.loader = loader
+        self.summary_loader = summary_loader
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "rehydrated": 0, "evicted": 0, "expired": 0}
+
+    # ---------------- Internals ----------------
+
+    def _new_entry(self, turns=(), dropped=0, summary="", summary_turns=0):
+        return {
+            "turns": deque(turns, maxlen=self.max_turns), "dropped": dropped,
+            "summary": summary, "summary_turns": summary_turns, "last_used": time.time(),
+        }
+
+    def _expire(self, now):
+        """Drop idle sessions; LRU order means they are all at the front"""
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if now - entry["last_used"] <= self.ttl:
+                break
+            self._sessions.popitem(last=False)
+            self.stats["expired"] += 1
+
+    def _evict(self):
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.stats["evicted"] += 1
+
+    def _touch(self, session_id):
+        """The session's entry, marked as just used (None if not in memory)"""
+        now = time.time()
+        self._expire(now)
+        entry = self._sessions.get(session_id)
+        if entry is not None:
+            entry["last_used"] = now
+            self._sessions.move_to_end(session_id)
+        return entry
+
+    def _load_summary(self, session_id):
+        if self.summary_loader is None:
+            return "", 0
+        try:
+            return self.summary_loader(session_id)
+        except Exception as e:
+            print(f"Session summary load error for {session_id}: {e}")
+            return "", 0
+
+    def _load(self, session_id):
+        """Turns rebuilt from the stored messages: each user message paired with the answer after it"""
+        if self.loader is None:
+            return []
+        try:
+            messages = self.loader(session_id)
+        except Exception as e:
+            print(f"Session memory load error for {session_id}: {e}")
+            return []
+        turns, question = [], None
+        for message in messages:
+            if message["role"] == "user":
+                question = message["content"]
+            elif message["role"] == "assistant" and question is not None:
+                turns.append({"question": question, "answer": message["content"]})
+                question = None
+        if turns:
+            print(f"[MEMORY] 🧠 Rehydrated {len(turns)} turns for session {session_id}")
+        return turns
+
+    def _entry(self, session_id):
+        with self._lock:
+            entry = self._touch(session_id)
+            if entry is not None:
+                self.stats["hits"] += 1
+                return entry
+        # Read the database outside the lock; another thread may have created the entry meanwhile
+        turns = self._load(session_id)
+        summary, summary_turns = self._load_summary(session_id) if turns else ("", 0)
+        with self._lock:
+            entry = self._touch(session_id)
+            if entry is None:
+                entry = self._new_entry(turns, max(0, len(turns) - self.max_turns), summary, summary_turns)
+                self._sessions[session_id] = entry
+                self.stats["rehydrated"] += int(bool(turns))
+                self._evict()
+            return entry
+
+    # ---------------- Public API ----------------
+
+    def get(self, session_id):
+        """The session's kept turns, oldest first (a copy)"""
+        entry = self._entry(session_id)
+        with self._lock:
+            return list(entry["turns"])
+
+    def append(self, session_id, question, answer):
+        entry = self._entry(session_id)
+        with self._lock:
+            if len(entry["turns"]) == self.max_turns:
+                entry["dropped"] += 1
+            entry["turns"].append({"question": question, "answer": answer})
+
+    def context(self, session_id):
+        """(summary, turns not covered by the summary) for building a prompt"""
+        entry = self._entry(session_id)
+        with self._lock:
+            start = max(0, entry["summary_turns"] - entry["dropped"])
+            return entry["summary"], list(entry["turns"])[start:]
+
+    def pending_summary(self, session_id, keep_recent, batch):
+        """Work for the summarizer once `keep_recent + batch` turns are unsummarized.
+
+        Returns (summary, turns to fold in, summary_turns after folding them),
+        or None if there is not enough to fold yet. The `keep_recent` newest
+        turns always stay verbatim.
+        """
+        entry = self._entry(session_id)
+        with self._lock:
+            start = max(0, entry["summary_turns"] - entry["dropped"])
+            unsummarized = list(entry["turns"])[start:]
+            if len(unsummarized) < keep_recent + batch:
+                return None
+            fold = unsummarized[:len(unsummarized) - keep_recent]
+            return entry["summary"], fold, entry["dropped"] + start + len(fold)
+
+    def set_summary(self, session_id, summary, summary_turns):
+        """Store a summary if the session is still in memory and it is newer than the current one"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or summary_turns <= entry["summary_turns"]:
+                return False
+            entry["summary"] = summary
+            entry["summary_turns"] = summary_turns
+            return True
+
+    def question(self, session_id, number):
+        """The session's `number`-th question (1-based), or None if it is unknown or no longer kept"""
+        entry = self._entry(session_id)
+        with self._lock:
+            index = number - 1 - entry["dropped"]
+            if 0 <= index < len(entry["turns"]):
+                return entry["turns"][index]["question"]
+        return None
+
+    def clear(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def footprint(self):
+        """Sessions and turns held, and the approximate bytes of their text"""
+        with self._lock:
+            entries = list(self._sessions.values())
+            turns = [turn for entry in entries for turn in entry["turns"]]
+            summaries = [entry["summary"] for entry in entries]
+        text_bytes = sum(sys.getsizeof(turn["question"]) + sys.getsizeof(turn["answer"]) for turn in turns)
+        text_bytes += sum(sys.getsizeof(summary) for summary in summaries if summary)
+        return dict(self.stats, sessions=len(entries), turns=len(turns), bytes=text_bytes)
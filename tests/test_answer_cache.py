@@ -0,0 +1,45 @@
+import pytest
+
+import chatbot_backend
+import config
+from answer_cache import SemanticAnswerCache
+from fake_services import HashingEmbedder
+
+CONTEXT = ["Title: MS in Industrial Engineering\n\nContent: IE 6200 is a core course."]
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setattr(config, "_embed_model", HashingEmbedder())
+    monkeypatch.setattr(chatbot_backend, "answer_cache", SemanticAnswerCache(threshold=0.95))
+
+
+def chat(history=(), summary=""):
+    return {
+        "optimized_query": "What are the core courses of the MS in Industrial Engineering?",
+        "context_docs": CONTEXT,
+        "chat_history": chatbot_backend.format_chat_history(list(history)),
+        "history_summary": summary,
+        "sources": [],
+        "cacheable": True,
+    }
+
+
+def serve(chat_a, chat_b):
+    """Cache an answer generated for chat_a, then look it up for chat_b"""
+    chatbot_backend.cache_answer(chatbot_backend.answer_cache_key(chat_a), chat_a, "Answer for A", 1.0)
+    return chatbot_backend.answer_cache.lookup(*chatbot_backend.answer_cache_key(chat_b))
+
+
+def test_sessions_with_different_histories_do_not_share_answers():
+    session_a = chat(history=[{"question": "I'm an F-1 student on probation", "answer": "Noted."}])
+    session_b = chat(history=[{"question": "Is co-op required?", "answer": "No."}])
+    assert serve(session_a, session_b) is None
+
+
+def test_sessions_with_different_summaries_do_not_share_answers():
+    assert serve(chat(summary="The user failed IE 6200 last term."), chat(summary="")) is None
+
+
+def test_sessions_without_history_share_answers():
+    assert serve(chat(), chat()) == "Answer for A"
@@ -0,0 +1,117 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from catalog_cache import CatalogCache
+
+PAGE = "<html><body><h1>Robotics MS</h1></body></html>"
+ETAG = '"v1"'
+
+
+class CatalogStandIn:
+    """Local catalog site: one page with an ETag, optional failures and unsolicited 304s"""
+
+    def __init__(self):
+        self.requests = []
+        self.fail = False
+        self.unsolicited_304 = 0
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                site.requests.append(dict(self.headers))
+                if site.fail:
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                if site.unsolicited_304 or self.headers.get("If-None-Match") == ETAG:
+                    site.unsolicited_304 = max(0, site.unsolicited_304 - 1)
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                body = PAGE.encode("utf-8")
+                self.send_response(200)
+                self.send_header("ETag", ETAG)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/robotics-ms/"
+
+    def stop(self):
+        self.server.shutdown()
+
+
+@pytest.fixture
+def site():
+    stand_in = CatalogStandIn()
+    yield stand_in
+    stand_in.stop()
+
+
+def make_cache(tmp_path, ttl=3600):
+    parsed = []
+
+    def parse(html, url):
+        parsed.append(url)
+        return {"title": "Robotics MS" if "Robotics MS" in html else "", "url": url}
+
+    return CatalogCache(parse, cache_dir=str(tmp_path), ttl=ttl, timeout=5), parsed
+
+
+def wait_for_refresh(cache):
+    deadline = time.time() + 5
+    while cache._refreshing and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_miss_then_hit(site, tmp_path):
+    cache, parsed = make_cache(tmp_path)
+    assert cache.get(site.url)["title"] == "Robotics MS"
+    assert cache.get(site.url)["title"] == "Robotics MS"
+    assert cache.stats["misses"] == 1 and cache.stats["hits"] == 1
+    assert len(parsed) == 1 and len(site.requests) == 1
+
+
+def test_expired_entry_is_revalidated_with_304_without_reparsing(site, tmp_path):
+    cache, parsed = make_cache(tmp_path, ttl=0.05)
+    cache.get(site.url)
+    time.sleep(0.1)
+    assert cache.get(site.url)["title"] == "Robotics MS"
+    wait_for_refresh(cache)
+    assert cache.stats["stale"] == 1
+    assert cache.stats["revalidated"] == 1
+    assert site.requests[-1].get("If-None-Match") == ETAG
+    assert len(parsed) == 1
+
+
+def test_stale_entry_served_when_the_site_fails(site, tmp_path):
+    cache, parsed = make_cache(tmp_path)
+    cache.get(site.url)
+    site.fail = True
+    assert cache.refresh(site.url, force=True)["title"] == "Robotics MS"
+    assert cache.stats["errors"] == 1
+
+
+def test_miss_without_cache_fails_when_the_site_fails(site, tmp_path):
+    cache, _ = make_cache(tmp_path)
+    site.fail = True
+    with pytest.raises(Exception):
+        cache.get(site.url)
+    assert cache.stats["errors"] == 1
+
+
+def test_304_without_cached_copy_refetches_the_page(site, tmp_path):
+    cache, parsed = make_cache(tmp_path)
+    site.unsolicited_304 = 1
+    assert cache.get(site.url)["title"] == "Robotics MS"
+    assert len(site.requests) == 2
+    assert "If-None-Match" not in site.requests[-1]
+    assert len(parsed) == 1
@@ -0,0 +1,41 @@
+from urllib.parse import urlsplit
+
+import pytest
+
+import chatbot_backend
+from fake_services import synthetic_catalog_page
+
+URLS = chatbot_backend.course_catalog_urls[:3]
+
+
+def row_headings_in_content(content):
+    """Table row -> heading it falls under in the page text ("### page heading", "#### area" rows)"""
+    headings, heading, area = {}, "", None
+    for line in content.splitlines():
+        if line.startswith("### "):
+            heading, area = line[4:], None
+        elif line.startswith("#### ") and not line.endswith(" Table"):
+            area = line[5:]
+        elif " | " in line and not line.startswith(("Course Code", "---")):
+            headings[line] = f"{heading} – {area}" if area else heading
+    return headings
+
+
+def row_headings_in_sections(sections):
+    headings = {}
+    for section in sections:
+        for line in section["text"].splitlines():
+            if " | " in line and not line.startswith(("Course Code", "---")):
+                headings[line] = section["heading"]
+    return headings
+
+
+@pytest.mark.parametrize("url", URLS)
+def test_page_text_and_sections_agree_on_section_boundaries(url):
+    data = chatbot_backend.parse_catalog_page(synthetic_catalog_page(urlsplit(url).path, courses=20), url)
+    in_sections = row_headings_in_sections(data["sections"])
+
+    assert in_sections
+    assert row_headings_in_content(data["content"]) == in_sections
+    # Paragraphs after the course table stay after it in the page text
+    assert data["content"].index("Complete 16 semester hours") > data["content"].index(next(iter(in_sections)))
@@ -0,0 +1,48 @@
+import pytest
+
+import chatbot_backend
+from course_index import CourseIndex
+
+URL = "https://catalog.northeastern.edu/graduate/engineering/mechanical-industrial/operations-research-msor/"
+RECORDS = [
+    {"program": "Operations Research MSOR", "section": "Core Requirements", "code": "IE 6200",
+     "title": "Engineering Probability and Statistics", "credits": "4"},
+    {"program": "Operations Research MSOR", "section": "Electives", "code": "IE 7275",
+     "title": "Data Mining in Engineering", "credits": "4"},
+]
+
+
+@pytest.fixture(autouse=True)
+def index(monkeypatch):
+    monkeypatch.setattr(chatbot_backend.catalog_cache, "peek", lambda url: None)
+    monkeypatch.setattr(chatbot_backend, "course_index", CourseIndex())
+    chatbot_backend.course_index.update_page(URL, "Operations Research MSOR", RECORDS)
+
+
+@pytest.mark.parametrize("query", [
+    "How many credits is IE 6200?",
+    "how many credit hours does IE6200 carry",
+    "What is IE 6200?",
+    "What is ie-6200 called?",
+    "What's the title of IE 6200?",
+    "Which programs include IE 6200?",
+    "IE 6200",
+])
+def test_lookup_questions_are_answered_from_the_index(query):
+    result = chatbot_backend.lookup_course_index(query)
+    assert result is not None and "answer" in result
+    assert "IE 6200" in result["answer"] and "4 credits" in result["answer"]
+
+
+@pytest.mark.parametrize("query", [
+    "Can I take IE 6200 for credit in MSOR?",
+    "Does IE 6200 count as credit toward my thesis?",
+    "What is the name of the professor teaching IE 6200?",
+    "What are the prerequisites for IE 6200?",
+    "Is IE 6200 hard?",
+    "How many credits is IE 6200 and IE 7275?",
+])
+def test_other_course_questions_go_to_the_llm_with_the_records(query):
+    result = chatbot_backend.lookup_course_index(query)
+    assert result is not None and "answer" not in result
+    assert "IE 6200" in result["context_docs"][0]
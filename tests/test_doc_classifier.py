@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+import config
+import doc_classifier
+from config import DOC_CLASSIFY_ACCEPT_MENTIONS
+from export_index import write_reference_vectors
+from fake_services import HashingEmbedder
+
+CORPUS = [
+    "Industrial Engineering MSIE core requirements: probability, optimization and simulation courses.",
+    "Engineering Management MS electives in project management, finance and supply chain engineering.",
+    "Mechanical and Industrial Engineering graduate co-op and thesis option for MIE students.",
+]
+
+
+@pytest.fixture
+def embedder(monkeypatch):
+    model = HashingEmbedder()
+    monkeypatch.setattr(config, "_embed_model", model)
+    return model
+
+
+def test_references_come_from_the_exported_corpus(tmp_path, embedder):
+    path = str(tmp_path / "references.npy")
+    write_reference_vectors(path, embedder.encode(CORPUS))
+    references = doc_classifier.load_reference_vectors(path)
+
+    assert references.shape == (len(CORPUS), embedder.dim)
+    assert doc_classifier.classify_sample(1, [CORPUS[1]], references=references) == (True, "embedding")
+    assert doc_classifier.classify_sample(
+        0, ["Grandma's banana bread recipe with walnuts and cinnamon"], references=references
+    ) == (False, "embedding")
+
+
+def test_missing_reference_file_falls_back_to_reference_texts(tmp_path, embedder):
+    references = doc_classifier.load_reference_vectors(str(tmp_path / "missing.npy"))
+    assert references.shape == (len(doc_classifier.REFERENCE_TEXTS), embedder.dim)
+
+
+def test_stats_are_counted_across_threads():
+    before = doc_classifier.classifier_stats["lexical"]
+
+    def run():
+        for _ in range(500):
+            doc_classifier.classify_sample(DOC_CLASSIFY_ACCEPT_MENTIONS, [])
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert doc_classifier.classifier_stats["lexical"] - before == 8 * 500
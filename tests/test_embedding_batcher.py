@@ -0,0 +1,62 @@
+import threading
+
+import numpy as np
+import pytest
+
+from embedding_batcher import BatchingEncoder
+
+
+class LengthModel:
+    """Encodes each text as [len(text)]; raises for texts starting with "!" """
+
+    def encode(self, sentences, **kwargs):
+        if any(text.startswith("!") for text in sentences):
+            raise ValueError("bad text")
+        return np.array([[len(text)] for text in sentences], dtype=np.float32)
+
+
+def test_concurrent_requests_get_their_own_rows():
+    encoder = BatchingEncoder(LengthModel(), max_wait=0.02)
+    results = {}
+
+    def run(text):
+        results[text] = encoder.encode(text)
+
+    threads = [threading.Thread(target=run, args=("x" * n,)) for n in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(results["x" * n][0] == n for n in range(1, 9))
+
+
+def test_unhashable_options_are_served():
+    encoder = BatchingEncoder(LengthModel())
+    assert encoder.encode(["abc"], prompt=["unhashable"]).tolist() == [[3.0]]
+
+
+def test_failing_batch_does_not_stop_the_worker():
+    encoder = BatchingEncoder(LengthModel())
+    with pytest.raises(ValueError):
+        encoder.encode(["!boom"])
+    assert encoder.encode("ok").tolist() == [2.0]
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_dead_worker_is_restarted():
+    encoder = BatchingEncoder(LengthModel(), check_interval=0.05)
+    encoder.encode("warm")
+    # Kill the worker: a BaseException fails its batch and ends the thread
+    original = encoder._encode_batch
+
+    def explode(batch):
+        encoder._encode_batch = original
+        raise SystemExit
+
+    encoder._encode_batch = explode
+    with pytest.raises(SystemExit):
+        encoder.encode("dies")
+    encoder._worker.join(timeout=1)
+    assert not encoder._worker.is_alive()
+    assert encoder.encode("back").tolist() == [4.0]
+    assert encoder.stats["restarts"] == 1
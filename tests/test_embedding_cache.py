@@ -0,0 +1,63 @@
+import numpy as np
+
+from config import EMBEDDING_CACHE_GAUGES
+from embedding_cache import CachedEmbedder
+from fake_services import HashingEmbedder
+from tracing import Metrics
+
+
+class CountingModel(HashingEmbedder):
+    def __init__(self):
+        super().__init__(dim=8)
+        self.encoded = []
+
+    def encode(self, sentences, **kwargs):
+        self.encoded.extend([sentences] if isinstance(sentences, str) else sentences)
+        return super().encode(sentences, **kwargs)
+
+
+class OfflineModel:
+    def encode(self, sentences, **kwargs):
+        raise AssertionError("cached vectors should not be encoded again")
+
+
+def test_memory_lru_is_bounded(tmp_path):
+    model = CountingModel()
+    cache = CachedEmbedder(model, "test-model", str(tmp_path / "embeddings.sqlite"), max_items=2)
+    cache.encode(["first", "second", "third"])
+
+    stats = cache.cache_stats()
+    assert stats["memory_items"] == 2
+    assert stats["memory_bytes"] == 2 * 8 * 4
+
+    # "first" was evicted from memory but is still on disk
+    cache.encode("first")
+    cache.encode("third")
+    stats = cache.cache_stats()
+    assert (stats["hits"], stats["disk_hits"], stats["misses"]) == (1, 1, 3)
+    assert model.encoded == ["first", "second", "third"]
+    assert stats["hit_ratio"] == 2 / 5
+
+
+def test_vectors_survive_a_restart(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    texts = ["IE 6200 Engineering Probability", "co-op  policy"]
+    vectors = CachedEmbedder(CountingModel(), "test-model", path).encode(texts, normalize_embeddings=True)
+
+    restarted = CachedEmbedder(OfflineModel(), "test-model", path)
+    assert np.array_equal(restarted.encode(["IE 6200 Engineering Probability", "co-op policy"],
+                                           normalize_embeddings=True), vectors)
+    assert restarted.cache_stats()["disk_hits"] == 2
+    assert restarted.cache_stats()["disk_bytes"] > 0
+
+
+def test_stats_are_published_as_gauges(tmp_path):
+    cache = CachedEmbedder(CountingModel(), "test-model", str(tmp_path / "embeddings.sqlite"))
+    cache.encode(["a", "a"])
+    metrics = Metrics()
+    metrics.add_gauges("mie_embedding_cache", cache.cache_stats, EMBEDDING_CACHE_GAUGES, "Embedding cache.")
+
+    lines = metrics.render().splitlines()
+    assert "# TYPE mie_embedding_cache_hit_ratio gauge" in lines
+    assert "mie_embedding_cache_misses 2" in lines
+    assert "mie_embedding_cache_memory_items 1" in lines
@@ -0,0 +1,28 @@
+import threading
+
+import prompt_budget
+
+
+def fit():
+    prompt_budget.fit_prompt("What are the core courses?", context=["IE 6200 " * 50])
+
+
+def test_budget_stats_are_counted_across_threads():
+    start = prompt_budget.budget_report()
+    fit()
+    before = prompt_budget.budget_report()
+    tokens_per_prompt = before["input_tokens"] - start["input_tokens"]
+
+    def run():
+        for _ in range(200):
+            fit()
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    after = prompt_budget.budget_report()
+    assert after["prompts"] - before["prompts"] == 8 * 200
+    assert after["input_tokens"] - before["input_tokens"] == 8 * 200 * tokens_per_prompt
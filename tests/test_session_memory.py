@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+import chat_db
+from history_summary import HistoryCompactor
+from session_memory import SessionMemory
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(chat_db, "DB_FILE", os.path.join(tmp_path, "chat_history.db"))
+    chat_db.init_db()
+    yield chat_db
+    chat_db.get_pool().close()
+
+
+def make_memory(db):
+    return SessionMemory(
+        max_turns=20, max_sessions=1, ttl=3600,
+        loader=lambda sid: db.load_chat(sid, kind=db.CHAT_KIND), summary_loader=db.load_summary
+    )
+
+
+def chat_turn(db, memory, session_id, number):
+    # Same order as the app: process_chat appends to memory, then app.py saves the pair
+    question, answer = f"q{number}", f"a{number}"
+    memory.append(session_id, question, answer)
+    db.save_messages(session_id, [("user", question), ("assistant", answer)])
+
+
+def test_summary_survives_eviction_with_pdf_turn_in_between(db):
+    memory = make_memory(db)
+    compactor = HistoryCompactor(
+        memory, lambda summary, turns: summary + "".join(t["question"] for t in turns),
+        store=db.save_summary, keep_recent=2, batch=2
+    )
+    for number in range(1, 4):
+        chat_turn(db, memory, "s1", number)
+    # PDF Q&A is stored in the same session but never enters the chat memory
+    db.save_messages("s1", [("user", "pdf question"), ("assistant", "pdf answer")], kind="pdf")
+    for number in range(4, 7):
+        chat_turn(db, memory, "s1", number)
+    compactor.schedule("s1").result()
+
+    summary, recent = memory.context("s1")
+    assert summary == "q1q2q3q4"
+    assert [t["question"] for t in recent] == ["q5", "q6"]
+
+    # Evict s1 (max_sessions=1), then rebuild it from the database
+    memory.get("s2")
+    assert memory.stats["evicted"] == 1
+    summary, recent = memory.context("s1")
+    assert memory.stats["rehydrated"] == 1
+    assert summary == "q1q2q3q4"
+    assert [t["question"] for t in recent] == ["q5", "q6"]
+    assert memory.question("s1", 4) == "q4"
+    assert memory.question("s1", 6) == "q6"
+    # The full transcript still has every message
+    assert len(db.load_chat("s1")) == 14
+
+
+def test_migration_adds_kind_column(tmp_path, monkeypatch):
+    import sqlite3
+
+    path = os.path.join(tmp_path, "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE chats (session_id TEXT, role TEXT, content TEXT)")
+    conn.execute("INSERT INTO chats VALUES ('old', 'user', 'hello')")
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(chat_db, "DB_FILE", path)
+    chat_db.init_db()
+    try:
+        assert chat_db.load_chat("old", kind=chat_db.CHAT_KIND) == [{"role": "user", "content": "hello"}]
+        assert chat_db.list_sessions()[0][0]["preview"] == "hello"
+    finally:
+        chat_db.get_pool().close()
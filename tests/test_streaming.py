@@ -0,0 +1,83 @@
+import openai
+import pytest
+
+import chatbot_backend
+import config
+import pdf_qa
+from answer_cache import SemanticAnswerCache
+from chat_db import CHAT_KIND
+from fake_services import FakeOpenAIServer, HashingEmbedder
+from llm_stream import INTERRUPTED_NOTE
+from session_memory import SessionMemory
+
+QUERY = "Is co-op required for the MS in Engineering Management?"
+PDF_DATA = {
+    "filename": "handbook.pdf",
+    "is_northeastern_related": True,
+    "chunks": [{"text": "Co-op is optional for MIE graduate students.", "page_start": 3, "page_end": 3}],
+}
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    server = FakeOpenAIServer(latency=0.0, token_latency=0.0, answer_words=12).start()
+    monkeypatch.setattr(openai, "api_base", server.api_base)
+    monkeypatch.setattr(openai, "api_key", "sk-offline")
+    yield server
+    server.stop()
+
+
+@pytest.fixture(autouse=True)
+def offline_chat(monkeypatch):
+    monkeypatch.setattr(config, "_embed_model", HashingEmbedder())
+    monkeypatch.setattr(chatbot_backend, "session_memory", SessionMemory(loader=lambda session_id: []))
+    monkeypatch.setattr(chatbot_backend, "answer_cache", SemanticAnswerCache())
+    monkeypatch.setattr(chatbot_backend, "compact_history", lambda session_id: None)
+    monkeypatch.setattr(chatbot_backend, "prepare_chat", lambda query, history=(), summary="": {
+        "optimized_query": query,
+        "context_docs": ["Title: MS in Engineering Management\n\nContent: Co-op is optional."],
+        "chat_history": chatbot_backend.format_chat_history(history),
+        "history_summary": summary,
+        "sources": [],
+        "cacheable": True,
+    })
+
+
+def test_chat_answer_streams_in_pieces_and_is_remembered(llm):
+    pieces = list(chatbot_backend.process_chat(QUERY, stream=True, session_id="s1"))
+
+    assert len(pieces) > 1
+    assert chatbot_backend.session_memory.get("s1") == [{"question": QUERY, "answer": "".join(pieces).strip()}]
+    assert chatbot_backend.answer_cache.cache_stats()["entries"] == 1
+
+
+def test_pdf_answer_streams_in_pieces(llm):
+    pieces = list(pdf_qa.answer_question("Is co-op required?", PDF_DATA, stream=True))
+    assert len(pieces) > 1
+    assert llm.snapshot()["streams"] == 1
+
+
+def test_mid_stream_error_ends_with_note_and_is_not_cached(llm):
+    llm.stream_error_after = 3
+    pieces = list(chatbot_backend.process_chat(QUERY, stream=True, session_id="s1"))
+    answer = "".join(pieces).strip()
+
+    assert pieces[-1] == INTERRUPTED_NOTE
+    assert len(pieces) == 4
+    assert chatbot_backend.answer_cache.cache_stats()["entries"] == 0
+    # The turn (with its note) reached session memory, so the app stores it as a chat turn
+    assert chatbot_backend.session_memory.get("s1") == [{"question": QUERY, "answer": answer}]
+    assert chatbot_backend.chat_turn_kind(QUERY) == CHAT_KIND
+
+    pdf_pieces = list(pdf_qa.answer_question("Is co-op required?", PDF_DATA, stream=True))
+    assert pdf_pieces[-1] == INTERRUPTED_NOTE
+
+
+def test_abandoned_stream_is_not_remembered(llm):
+    stream = chatbot_backend.process_chat(QUERY, stream=True, session_id="s1")
+    next(stream)
+    stream.close()
+
+    # Nothing reached session memory, so the app stores this turn as "interrupted", outside the chat kind
+    assert chatbot_backend.session_memory.get("s1") == []
+    assert chatbot_backend.answer_cache.cache_stats()["entries"] == 0
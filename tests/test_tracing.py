@@ -0,0 +1,63 @@
+import threading
+
+import tracing
+from answer_cache import SemanticAnswerCache
+from tracing import Metrics
+
+
+def test_answer_cache_stats_are_published_as_gauges():
+    cache = SemanticAnswerCache(threshold=0.9)
+    metrics = Metrics()
+    metrics.add_gauges("mie_answer_cache", cache.cache_stats, ("hits", "misses", "hit_rate", "saved_seconds"),
+                       "Answer cache.")
+
+    assert cache.lookup([1.0, 0.0], "ctx") is None
+    cache.store([1.0, 0.0], "ctx", "answer", generation_seconds=2.0)
+    assert cache.lookup([1.0, 0.01], "ctx") == "answer"
+
+    lines = metrics.render().splitlines()
+    assert "# TYPE mie_answer_cache_hit_rate gauge" in lines
+    assert "mie_answer_cache_hits 1" in lines
+    assert "mie_answer_cache_misses 1" in lines
+    assert "mie_answer_cache_hit_rate 0.5" in lines
+    assert "mie_answer_cache_saved_seconds 2.0" in lines
+
+
+def test_concurrent_flushes_write_once_per_interval(tmp_path, monkeypatch):
+    metrics_file = tmp_path / "metrics.prom"
+    monkeypatch.setattr(tracing, "METRICS_FILE", str(metrics_file))
+    monkeypatch.setattr(tracing, "METRICS_FLUSH_INTERVAL", 60)
+    metrics = Metrics()
+    renders = []
+    render = metrics.render
+    monkeypatch.setattr(metrics, "render", lambda: renders.append(1) or render())
+
+    barrier = threading.Barrier(8)
+
+    def flush():
+        barrier.wait()
+        metrics.maybe_flush()
+
+    threads = [threading.Thread(target=flush) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(renders) == 1
+    assert metrics_file.read_text().startswith("# HELP mie_span_duration_seconds")
+    metrics.maybe_flush(force=True)
+    assert len(renders) == 2
+
+
+def test_only_amounts_are_summed_into_attribute_counters():
+    metrics = Metrics()
+    metrics.observe("router", 0.01, {"score": 0.81, "margin": 0.12, "docs": 2})
+    metrics.observe("chat.turn", 0.5, {"answer_cache_hit": True, "optimizer_skipped": True, "prompt_tokens": 900})
+    metrics.observe("chat.turn", 0.5, {"answer_cache_hit": False, "prompt_tokens": 100, "tier": "lexical"})
+
+    totals = [line for line in metrics.render().splitlines() if line.startswith("mie_span_attribute_total")]
+    assert totals == [
+        'mie_span_attribute_total{span="chat.turn",attribute="prompt_tokens"} 1000',
+        'mie_span_attribute_total{span="router",attribute="docs"} 2',
+    ]
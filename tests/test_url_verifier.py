@@ -0,0 +1,84 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from url_verifier import UrlVerifier
+
+SLOW_SECONDS = 0.6
+
+
+class LinkSite:
+    """Local site with a reachable page, a missing page and a slow page; counts requests per path"""
+
+    def __init__(self):
+        self.requests = []
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                site.requests.append(self.path)
+                if self.path == "/slow":
+                    time.sleep(SLOW_SECONDS)
+                self.send_response(404 if self.path == "/missing" else 200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def url(self, path):
+        return self.base_url + path
+
+    def stop(self):
+        self.server.shutdown()
+
+
+@pytest.fixture
+def site():
+    stand_in = LinkSite()
+    yield stand_in
+    stand_in.stop()
+
+
+def test_reachable_links_are_cached(site):
+    verifier = UrlVerifier(ttl=60)
+    ok = site.url("/ok")
+
+    assert verifier.verify([ok, ok]) == ([ok, ok], [])
+    assert verifier.verify([ok]) == ([ok], [])
+    assert site.requests == ["/ok"]
+    assert verifier.stats["hits"] == 1
+
+
+def test_broken_links_are_cached_for_the_negative_ttl(site):
+    verifier = UrlVerifier(ttl=60, negative_ttl=0.3)
+    missing = site.url("/missing")
+
+    assert verifier.verify([missing]) == ([], [(missing, 404)])
+    assert verifier.verify([missing]) == ([], [(missing, 404)])
+    assert site.requests == ["/missing"]
+
+    time.sleep(0.4)
+    assert verifier.verify([missing]) == ([], [(missing, 404)])
+    assert site.requests == ["/missing", "/missing"]
+
+
+def test_deadline_reports_slow_links_as_unknown_then_caches_them(site):
+    verifier = UrlVerifier(ttl=60, deadline=0.2)
+    ok, slow = site.url("/ok"), site.url("/slow")
+
+    started = time.perf_counter()
+    assert verifier.verify([ok, slow]) == ([ok], [])
+    assert time.perf_counter() - started < SLOW_SECONDS
+    assert verifier.stats["timeouts"] == 1
+
+    # The check kept running after the deadline and its result was cached
+    time.sleep(SLOW_SECONDS + 0.2)
+    assert verifier.verify([slow]) == ([slow], [])
+    assert site.requests.count("/slow") == 1
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+import chatbot_backend
+import config
+from fake_services import HashingEmbedder
+from vector_store import LocalIndex
+
+IDS = [f"doc-{i}" for i in range(200)]
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    return np.random.default_rng(0).normal(size=(len(IDS), 16)).astype(np.float32)
+
+
+@pytest.fixture(scope="module")
+def index_dir(tmp_path_factory, vectors):
+    path = str(tmp_path_factory.mktemp("index"))
+    LocalIndex.build(path, IDS, vectors, [{"combined_text": f"text {i}"} for i in range(len(IDS))], ivf_lists=8)
+    return path
+
+
+def brute_force(vectors, query, top_k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return [IDS[i] for i in np.argsort(-scores)[:top_k]]
+
+
+def test_exact_search_matches_brute_force(index_dir, vectors):
+    index = LocalIndex(index_dir)
+    query = np.random.default_rng(1).normal(size=16)
+    result = index.query(query, top_k=5, include_metadata=True)
+
+    assert [m["id"] for m in result["matches"]] == brute_force(vectors, query, 5)
+    scores = [m["score"] for m in result["matches"]]
+    assert scores == sorted(scores, reverse=True)
+    assert result["matches"][0]["metadata"]["combined_text"] == f"text {IDS.index(result['matches'][0]['id'])}"
+    assert "metadata" not in index.query(query, top_k=1)["matches"][0]
+
+
+def test_ivf_search_probes_lists(index_dir, vectors):
+    query = np.random.default_rng(2).normal(size=16)
+    every_list = LocalIndex(index_dir, mode="ivf", nprobe=8)
+    assert [m["id"] for m in every_list.query(query, top_k=5)["matches"]] == brute_force(vectors, query, 5)
+
+    one_list = LocalIndex(index_dir, mode="ivf", nprobe=1)
+    assert len(one_list._candidates(one_list.embeddings[0])) < len(IDS)
+    # An indexed vector is in the list of its nearest centroid, so probing one list finds it
+    for row in (0, 57, 199):
+        assert one_list.query(vectors[row], top_k=1)["matches"][0]["id"] == IDS[row]
+
+
+def test_ivf_mode_needs_ivf_lists(tmp_path, vectors):
+    path = str(tmp_path / "exact-only")
+    LocalIndex.build(path, IDS, vectors, [{}] * len(IDS))
+    with pytest.raises(ValueError):
+        LocalIndex(path, mode="ivf")
+
+
+def test_retrieve_context_reads_local_matches(tmp_path, monkeypatch):
+    embedder = HashingEmbedder()
+    texts = ["Co-op is optional for MIE graduate students.", "IE 6200 covers engineering probability."]
+    path = str(tmp_path / "corpus")
+    LocalIndex.build(path, ["coop", "ie6200"], embedder.encode(texts), [{"combined_text": t} for t in texts])
+    monkeypatch.setattr(config, "_embed_model", embedder)
+    monkeypatch.setattr(config, "_index", LocalIndex(path))
+
+    assert chatbot_backend.retrieve_context(texts[1]) == [texts[1]]
@@ -0,0 +1,354 @@
+# tracing.py
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+
+from config import (
+    TRACE_ENABLED, TRACE_FILE, TRACE_MAX_BYTES, TRACE_BACKUPS, METRICS_FILE, METRICS_FLUSH_INTERVAL, METRICS_PORT
+)
+
+# Latency histogram buckets in seconds (Prometheus "le" bounds)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Span attributes that are amounts, so their sum is a meaningful counter (not scores, limits or flags)
+COUNTED_ATTRIBUTES = frozenset({
+    "prompt_tokens", "completion_tokens", "docs", "rows", "records", "chunks", "pages", "sections", "turns", "bytes"
+})
+
+_enabled = TRACE_ENABLED
+_current = contextvars.ContextVar("current_span", default=None)
+
+
+# ---------------- Spans ----------------
+
+class _NoopSpan:
+    """Stands in for a span while tracing is off; every method does nothing"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+    def record_error(self, error):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """One timed stage of a request. Used as a context manager; spans opened inside it become its children.
+
+    With activate=False the span is timed and parented but not made current,
+    which is what generators need: their body runs in the caller's context
+    between yields.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attrs", "error",
+                 "started_at", "_start", "_activate", "_token")
+
+    def __init__(self, name, attrs, activate=True):
+        parent = _current.get()
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = attrs
+        self.error = None
+        self._activate = activate
+        self._token = None
+
+    def __enter__(self):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        if self._activate:
+            self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        if self._token is not None:
+            _current.reset(self._token)
+        if exc_type is GeneratorExit:
+            self.attrs["cancelled"] = True
+        elif exc is not None:
+            self.record_error(exc)
+        _finish(self, duration)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def record_error(self, error):
+        self.error = f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+
+
+def span(name, activate=True, **attrs):
+    """Context manager timing a stage; a shared no-op object when tracing is off"""
+    if not _enabled:
+        return NOOP_SPAN
+    return Span(name, attrs, activate)
+
+
+def current_span():
+    """The innermost active span (or the no-op span), for attaching attributes from nested code"""
+    if not _enabled:
+        return NOOP_SPAN
+    return _current.get() or NOOP_SPAN
+
+
+def traced(name):
+    """Decorator running the function inside span(name)"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def trace_stream(pieces, name, **attrs):
+    """Wrap a token generator in a span that lasts until the stream is exhausted.
+
+    The span is created now, so it is parented to the caller's span even
+    though the stream is consumed later. It is made current only while the
+    wrapped generator runs, so spans and attributes set inside it land
+    under this span; time to first piece and the piece count are recorded.
+    """
+    if not _enabled:
+        return pieces
+    return _traced_stream(pieces, Span(name, attrs, activate=False))
+
+
+def _traced_stream(pieces, stream_span):
+    with stream_span:
+        iterator = iter(pieces)
+        chunks = 0
+        while True:
+            token = _current.set(stream_span)
+            try:
+                piece = next(iterator)
+            except StopIteration:
+                break
+            finally:
+                _current.reset(token)
+            if not chunks:
+                stream_span.set(first_token_ms=round((time.perf_counter() - stream_span._start) * 1000, 1))
+            chunks += 1
+            yield piece
+        stream_span.set(chunks=chunks)
+
+
+def record_usage(response):
+    """Copy the token usage of a (non-streaming) chat completion onto the current span"""
+    usage = response.get("usage") if _enabled and hasattr(response, "get") else None
+    if usage:
+        current_span().set(
+            prompt_tokens=usage.get("prompt_tokens", 0), completion_tokens=usage.get("completion_tokens", 0)
+        )
+
+
+def set_enabled(enabled):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+# ---------------- Export ----------------
+
+_trace_logger = None
+_trace_logger_lock = threading.Lock()
+
+
+def _get_trace_logger():
+    global _trace_logger
+    if _trace_logger is None:
+        with _trace_logger_lock:
+            if _trace_logger is None:
+                directory = os.path.dirname(TRACE_FILE)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                handler = RotatingFileHandler(TRACE_FILE, maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUPS)
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger = logging.getLogger("mie.trace")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                logger.addHandler(handler)
+                _trace_logger = logger
+    return _trace_logger
+
+
+def _finish(finished, duration):
+    metrics.observe(finished.name, duration, finished.attrs, finished.error)
+    record = {
+        "trace_id": finished.trace_id,
+        "span_id": finished.span_id,
+        "parent_id": finished.parent_id,
+        "name": finished.name,
+        "start": round(finished.started_at, 6),
+        "duration_ms": round(duration * 1000, 3),
+        "attrs": finished.attrs,
+    }
+    if finished.error:
+        record["error"] = finished.error
+    try:
+        _get_trace_logger().info(json.dumps(record, default=str))
+    except OSError as e:
+        print(f"Trace write error: {e}")
+    if finished.parent_id is None:
+        metrics.maybe_flush()
+
+
+# ---------------- Metrics ----------------
+
+class Metrics:
+    """Per-span latency histograms, error counts, sums of COUNTED_ATTRIBUTES and registered gauges,
+    in Prometheus text format"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._histograms = {}
+        self._errors = {}
+        self._totals = {}
+        self._gauges = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def observe(self, name, duration, attrs, error=None):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0}
+            histogram["counts"][bisect_left(self.buckets, duration)] += 1
+            histogram["sum"] += duration
+            if error:
+                self._errors[name] = self._errors.get(name, 0) + 1
+            for key, value in attrs.items():
+                if key in COUNTED_ATTRIBUTES and isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self._totals[(name, key)] = self._totals.get((name, key), 0) + value
+
+    def add_gauges(self, prefix, collect, keys, description):
+        """Publish collect()[key] as the gauge {prefix}_{key} for each of `keys`, read on every render"""
+        with self._lock:
+            self._gauges.append((prefix, collect, tuple(keys), description))
+
+    def render(self):
+        lines = [
+            "# HELP mie_span_duration_seconds Duration of traced pipeline stages.",
+            "# TYPE mie_span_duration_seconds histogram",
+        ]
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram["counts"]):
+                    cumulative += count
+                    lines.append(f'mie_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+                total = cumulative + histogram["counts"][-1]
+                lines.append(f'mie_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {total}')
+                lines.append(f'mie_span_duration_seconds_sum{{span="{name}"}} {histogram["sum"]:.6f}')
+                lines.append(f'mie_span_duration_seconds_count{{span="{name}"}} {total}')
+
+            lines += ["# HELP mie_span_errors_total Traced stages that ended with an error.",
+                      "# TYPE mie_span_errors_total counter"]
+            for name, count in sorted(self._errors.items()):
+                lines.append(f'mie_span_errors_total{{span="{name}"}} {count}')
+
+            lines += ["# HELP mie_span_attribute_total Sum of count-like span attributes (tokens, docs, rows).",
+                      "# TYPE mie_span_attribute_total counter"]
+            for (name, key), value in sorted(self._totals.items()):
+                lines.append(f'mie_span_attribute_total{{span="{name}",attribute="{key}"}} {value}')
+            gauges = list(self._gauges)
+
+        # Collected outside the lock: each source takes its own
+        for prefix, collect, keys, description in gauges:
+            try:
+                values = collect()
+            except Exception as e:
+                print(f"Metrics gauge error ({prefix}): {e}")
+                continue
+            for key in keys:
+                lines += [f"# HELP {prefix}_{key} {description}", f"# TYPE {prefix}_{key} gauge",
+                          f"{prefix}_{key} {values.get(key, 0)}"]
+        return "\n".join(lines) + "\n"
+
+    def maybe_flush(self, force=False):
+        """Rewrite METRICS_FILE at most every METRICS_FLUSH_INTERVAL seconds"""
+        if not METRICS_FILE:
+            return
+        # Root spans end on many request threads; only one of them claims each interval
+        with self._lock:
+            now = time.time()
+            if not force and now - self._last_flush < METRICS_FLUSH_INTERVAL:
+                return
+            self._last_flush = now
+        with self._flush_lock:
+            try:
+                directory = os.path.dirname(METRICS_FILE)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                tmp_path = f"{METRICS_FILE}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    f.write(self.render())
+                os.replace(tmp_path, METRICS_FILE)
+            except OSError as e:
+                print(f"Metrics write error: {e}")
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._errors.clear()
+            self._totals.clear()
+
+
+metrics = Metrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """Serve /metrics on `port` from a daemon thread (once per process; port 0 disables it)"""
+    global _metrics_server
+    if not _enabled or not port:
+        return None
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            try:
+                _metrics_server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+            except OSError as e:
+                print(f"Metrics server error on port {port}: {e}")
+                return None
+            threading.Thread(target=_metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+            print(f"[TRACE] 📈 Serving metrics on :{port}/metrics")
+    return _metrics_server
@@ -0,0 +1,86 @@
+# url_verifier.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class UrlVerifier:
+    """Checks links concurrently over one pooled session, with a TTL cache of results.
+
+    Reachable URLs are cached for `ttl` seconds and failures (non-200 status
+    or connection errors) for `negative_ttl` seconds. A `verify` call never
+    takes longer than `deadline`; URLs still being checked at that point are
+    reported as neither valid nor invalid, and their result is cached once
+    the check finishes.
+    """
+
+    def __init__(self, ttl=3600, negative_ttl=300, deadline=3.0, timeout=3.0, max_workers=8):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.deadline = deadline
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="url-verify")
+        self._cache = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "checks": 0, "timeouts": 0}
+
+    def _check(self, url):
+        try:
+            r = self.session.head(url, allow_redirects=True, timeout=self.timeout)
+            status = r.status_code
+        except Exception as e:
+            status = str(e)
+        ttl = self.ttl if status == 200 else self.negative_ttl
+        with self._lock:
+            self._cache[url] = (status, time.time() + ttl)
+        return status
+
+    def _cached(self, url):
+        with self._lock:
+            cached = self._cache.get(url)
+            if cached is None:
+                return None
+            if cached[1] < time.time():
+                del self._cache[url]
+                return None
+            self.stats["hits"] += 1
+            return cached[0]
+
+    def verify(self, url_list):
+        """Return (valid_urls, invalid_urls) where invalid_urls holds (url, status_or_error) pairs."""
+        statuses = {}
+        pending = {}
+        for url in dict.fromkeys(url_list):
+            status = self._cached(url)
+            if status is not None:
+                statuses[url] = status
+            else:
+                pending[url] = self._executor.submit(self._check, url)
+
+        if pending:
+            with self._lock:
+                self.stats["checks"] += len(pending)
+            done, not_done = wait(pending.values(), timeout=self.deadline)
+            for url, future in pending.items():
+                if future in done:
+                    statuses[url] = future.result()
+            if not_done:
+                with self._lock:
+                    self.stats["timeouts"] += len(not_done)
+
+        valid_urls, invalid_urls = [], []
+        for url in url_list:
+            if url not in statuses:
+                continue
+            if statuses[url] == 200:
+                valid_urls.append(url)
+            else:
+                invalid_urls.append((url, statuses[url]))
+        return valid_urls, invalid_urls
@@ -0,0 +1,134 @@
+# vector_store.py
+import json
+import os
+import threading
+
+import numpy as np
+
+EMBEDDINGS_FILE = "embeddings.npy"
+METADATA_FILE = "metadata.jsonl"
+OFFSETS_FILE = "metadata_offsets.npy"
+IVF_CENTROIDS_FILE = "ivf_centroids.npy"
+IVF_ORDER_FILE = "ivf_order.npy"
+IVF_BOUNDS_FILE = "ivf_bounds.npy"
+
+
+def _normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _kmeans(vectors, n_clusters, iterations=20, sample_size=50000, seed=0):
+    """Spherical k-means on a sample of the (normalized) vectors; returns the centroids."""
+    rng = np.random.default_rng(seed)
+    sample = vectors
+    if len(vectors) > sample_size:
+        sample = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+    sample = np.asarray(sample, dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(n_clusters):
+            members = sample[assignment == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+        centroids = _normalize(centroids)
+    return centroids
+
+
+class LocalIndex:
+    """In-process replacement for a Pinecone index handle.
+
+    Embeddings are a memory-mapped float32 matrix (rows normalized, so the
+    score is cosine similarity) and metadata is a JSONL sidecar read by
+    offset. `query` returns the same shape as Pinecone:
+    {"matches": [{"id", "score", "metadata"}]}.
+
+    mode="exact" scores every row; mode="ivf" only scores the `nprobe`
+    inverted lists whose centroids are closest to the query.
+    """
+
+    def __init__(self, path, mode="exact", nprobe=8):
+        self.path = path
+        self.mode = mode
+        self.nprobe = nprobe
+        self.embeddings = np.load(os.path.join(path, EMBEDDINGS_FILE), mmap_mode="r")
+        self.offsets = np.load(os.path.join(path, OFFSETS_FILE))
+        self._metadata_file = open(os.path.join(path, METADATA_FILE), "rb")
+        self._metadata_lock = threading.Lock()
+
+        self.centroids = None
+        if mode == "ivf":
+            if not os.path.exists(os.path.join(path, IVF_CENTROIDS_FILE)):
+                raise ValueError(f"Index at {path} was built without IVF lists; rebuild with ivf_lists > 0")
+            self.centroids = np.load(os.path.join(path, IVF_CENTROIDS_FILE))
+            self.ivf_order = np.load(os.path.join(path, IVF_ORDER_FILE), mmap_mode="r")
+            self.ivf_bounds = np.load(os.path.join(path, IVF_BOUNDS_FILE))
+
+    def __len__(self):
+        return len(self.embeddings)
+
+    # ---------------- Build ----------------
+
+    @staticmethod
+    def build(path, ids, vectors, metadatas, ivf_lists=0):
+        """Write an index directory from parallel lists of ids, vectors and metadata dicts."""
+        os.makedirs(path, exist_ok=True)
+        vectors = _normalize(vectors)
+        np.save(os.path.join(path, EMBEDDINGS_FILE), vectors)
+
+        offsets = []
+        with open(os.path.join(path, METADATA_FILE), "wb") as f:
+            for record_id, metadata in zip(ids, metadatas):
+                offsets.append(f.tell())
+                f.write(json.dumps({"id": record_id, "metadata": metadata or {}}).encode("utf-8") + b"\n")
+        np.save(os.path.join(path, OFFSETS_FILE), np.asarray(offsets, dtype=np.int64))
+
+        if ivf_lists:
+            ivf_lists = min(ivf_lists, len(vectors))
+            centroids = _kmeans(vectors, ivf_lists)
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            order = np.argsort(assignment, kind="stable")
+            bounds = np.searchsorted(assignment[order], np.arange(ivf_lists + 1))
+            np.save(os.path.join(path, IVF_CENTROIDS_FILE), centroids)
+            np.save(os.path.join(path, IVF_ORDER_FILE), order.astype(np.int64))
+            np.save(os.path.join(path, IVF_BOUNDS_FILE), bounds.astype(np.int64))
+
+    # ---------------- Query ----------------
+
+    def _record(self, row):
+        with self._metadata_lock:
+            self._metadata_file.seek(int(self.offsets[row]))
+            line = self._metadata_file.readline()
+        return json.loads(line)
+
+    def _candidates(self, vector):
+        probes = np.argsort(-(self.centroids @ vector))[:self.nprobe]
+        return np.concatenate([self.ivf_order[self.ivf_bounds[p]:self.ivf_bounds[p + 1]] for p in probes])
+
+    def query(self, vector, top_k=3, include_metadata=False, **kwargs):
+        vector = _normalize(vector).ravel()
+        if self.mode == "ivf":
+            rows = np.sort(self._candidates(vector))
+            scores = self.embeddings[rows] @ vector
+        else:
+            rows = None
+            scores = self.embeddings @ vector
+
+        top_k = min(top_k, len(scores))
+        if top_k <= 0:
+            return {"matches": []}
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+
+        matches = []
+        for i in best:
+            row = int(rows[i]) if rows is not None else int(i)
+            record = self._record(row)
+            match = {"id": record["id"], "score": float(scores[i])}
+            if include_metadata:
+                match["metadata"] = record["metadata"]
+            matches.append(match)
+        return {"matches": matches}